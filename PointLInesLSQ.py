@@ -47,42 +47,178 @@ import numpy as np
 # We will assume lines specified by 2 points in 3D, and convert these to point-vector form
 # for the computation.  So (a, b) becomes (pA = a, N = (b - a)/||b - a||)
 
-A = np.array([[0, 0, 0], [2, 2, 0], [0, 2, 2]])
-B = np.array([[0, 0, 2], [2, 0, 0], [2, 2, 2]])
-
-# or can test with some random lines, from random points in unit cube
-#A = np.random.rand(10, 3)
-#B = np.random.rand(10, 3)
-
-print(A)
-print(B)
-
-# compute vectors from Ai to Bi and normalize them
-N = B - A
-norms = np.apply_along_axis(np.linalg.norm, 0, N)
-N = N/norms
-
-print("N = \n", N)
-myI = np.eye(3,3)
-def self_outerprod_minus_I(v):
-    return np.outer(v, v) - myI
-
-# Now S = sum(outer(N_i, N_i) - I) over all i
-Nouter = np.array([ self_outerprod_minus_I(n) for n in N])
-S = np.sum(Nouter, 0)
-
-print("S = \n", S)
-
-# Now C = sum((outer(N_i, N_i) - I) dot a_i) over all i
-
-C_array = np.array([np.dot(Nouter[i], A[i]) for i in range(len(A))])
-C = np.sum(C_array, axis=0)
-print("C = \n", C)
-
-# Now we have the linear equation S*p = C .  Solve it!
-p = np.linalg.solve(S, C)
-
-print("Solving this system gives: ", p)
-
-
 
+def line_directions(A, B):
+    """
+    line_directions() -- unit direction vectors of lines given by two points each
+    :param A: array_like (..., 3), first point of each line
+    :param B: array_like (..., 3), second point of each line
+    :return: ndarray (..., 3), (B - A)/||B - A|| for each line
+    """
+    N = np.asarray(B, dtype=np.float64) - np.asarray(A, dtype=np.float64)
+    # One norm per line, i.e. along the last axis
+    return N/np.linalg.norm(N, axis=-1, keepdims=True)
+
+
+def normal_sums(A, N):
+    """
+    normal_sums() -- S = SUM (n_i*trans(n_i) - I) and C = SUM (n_i*trans(n_i) - I)*a_i
+    over the lines of each set, without forming the per-line 3x3 matrices:
+    (n*trans(n) - I)*a is just n*(n.a) - a.
+    :param A: array_like (..., n, 3), a point on each line
+    :param N: array_like (..., n, 3), unit direction of each line
+    :return: (S, C) with shapes (..., 3, 3) and (..., 3)
+    """
+    A = np.asarray(A, dtype=np.float64)
+    N = np.asarray(N, dtype=np.float64)
+    count = N.shape[-2]
+    S = np.einsum("...ni,...nj->...ij", N, N) - count*np.eye(3)
+    C = np.einsum("...ni,...n->...i", N, np.einsum("...nj,...nj->...n", N, A)) - A.sum(axis=-2)
+    return S, C
+
+
+def solve_normal(S, C):
+    """
+    solve_normal() -- solve S*p = C, for one system or a stack of them
+    :param S: array_like (..., 3, 3)
+    :param C: array_like (..., 3)
+    :return: ndarray (..., 3)
+    :raises numpy.linalg.LinAlgError: if a system is singular, e.g. all its lines parallel
+    """
+    return np.linalg.solve(S, np.asarray(C)[..., None])[..., 0]
+
+
+def nearest_points(A, B):
+    """
+    nearest_points() -- least-squares point nearest to each of K sets of n lines.
+    All K systems are built with batched sums and solved in one call.
+    :param A: array_like (K, n, 3) (or (n, 3) for a single set), first point of each line
+    :param B: array_like of the same shape, second point of each line
+    :return: ndarray (K, 3) (or (3,) for a single set)
+    :raises numpy.linalg.LinAlgError: if a set has no unique nearest point
+    """
+    A = np.asarray(A, dtype=np.float64)
+    if A.shape[-1] != 3 or A.ndim < 2 or np.shape(B) != A.shape:
+        raise ValueError("lines are given as two (..., n, 3) arrays of points, not {0} and {1}".format(
+            A.shape, np.shape(B)))
+    return solve_normal(*normal_sums(A, line_directions(A, B)))
+
+
+class LineAccumulator(object):
+    """
+    LineAccumulator -- running S and C sums for the point nearest a stream of lines.
+    Only the 3x3 S, the 3-vector C and a line count are kept, so lines can be
+    fed in chunks, from an iterator or from np.memmap files of any length in
+    constant memory, and solve() gives the estimate for the lines seen so far.
+    Accumulators filled separately (e.g. in other processes; they pickle as
+    plain arrays) combine with merge() or +, in any order.
+    """
+
+    def __init__(self, chunk_size=1 << 16):
+        """
+        :param chunk_size: most lines converted at once by add(); bounds the temporaries
+        """
+        self.chunk_size = int(chunk_size)
+        self.S = np.zeros((3, 3))
+        self.C = np.zeros(3)
+        self.count = 0
+
+    def add(self, A, B):
+        """
+        add() -- take in lines given by two points each
+        :param A: array_like (n, 3), first point of each line; may be a np.memmap
+        :param B: array_like (n, 3), second point of each line
+        :return: self
+        """
+        for a, b in self._chunks(A, B):
+            self._add(a, line_directions(a, b))
+        return self
+
+    def add_rays(self, A, N):
+        """
+        add_rays() -- take in lines given as point and unit direction
+        :param A: array_like (n, 3), a point on each line
+        :param N: array_like (n, 3), unit direction of each line
+        :return: self
+        """
+        for a, n in self._chunks(A, N):
+            self._add(a, n)
+        return self
+
+    def extend(self, chunks):
+        """
+        extend() -- add() every (A, B) pair of an iterable, e.g. a generator reading from disk
+        :return: self
+        """
+        for A, B in chunks:
+            self.add(A, B)
+        return self
+
+    def merge(self, other):
+        """
+        merge() -- add the sums of another accumulator into this one
+        :param other: LineAccumulator
+        :return: self
+        """
+        self.S += other.S
+        self.C += other.C
+        self.count += other.count
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return LineAccumulator(self.chunk_size).merge(self).merge(other)
+
+    def solve(self):
+        """
+        solve() -- least-squares point nearest all the lines added so far
+        :return: ndarray (3,)
+        :raises numpy.linalg.LinAlgError: while the lines do not fix a unique point,
+                e.g. before two non-parallel lines have been added
+        """
+        return solve_normal(self.S, self.C)
+
+    def _add(self, A, N):
+        S, C = normal_sums(A, N)
+        self.S += S
+        self.C += C
+        self.count += N.shape[0]
+
+    def _chunks(self, A, B):
+        """
+        :return: generator of (A, B) row slices of at most chunk_size lines, as float64
+        """
+        if np.shape(A) != np.shape(B) or np.ndim(A) != 2 or np.shape(A)[1] != 3:
+            raise ValueError("lines are given as two (n, 3) arrays, not {0} and {1}".format(
+                np.shape(A), np.shape(B)))
+        for lo in range(0, len(A), self.chunk_size):
+            hi = lo + self.chunk_size
+            yield np.asarray(A[lo:hi], dtype=np.float64), np.asarray(B[lo:hi], dtype=np.float64)
+
+
+if __name__ == "__main__":
+    A = np.array([[0, 0, 0], [2, 2, 0], [0, 2, 2]])
+    B = np.array([[0, 0, 2], [2, 0, 0], [2, 2, 2]])
+
+    # or can test with some random lines, from random points in unit cube
+    #A = np.random.rand(10, 3)
+    #B = np.random.rand(10, 3)
+
+    print(A)
+    print(B)
+
+    # compute vectors from Ai to Bi and normalize them
+    N = line_directions(A, B)
+    print("N = \n", N)
+
+    # S = sum(outer(N_i, N_i) - I) and C = sum((outer(N_i, N_i) - I) dot a_i) over all i
+    S, C = normal_sums(A, N)
+    print("S = \n", S)
+    print("C = \n", C)
+
+    # Now we have the linear equation S*p = C .  Solve it!
+    p = solve_normal(S, C)
+
+    print("Solving this system gives: ", p)
@@ -0,0 +1,218 @@
+"""
+SimplexAsync.py -- asyncio front end for generating noise tiles on demand
+
+    service = NoiseService((256, 256), step=1.0, workers=4, max_pending=32)
+    tile = await service.agenerate_tile((3, -2), 6, 0.5, 0.01, 0.0, 255.0)
+
+Tiles follow the layout of SimplexTileCache: tile (a, b) covers sample indices
+[a*ta, (a+1)*ta) x [b*tb, (b+1)*tb), sampled at index*step.  The noise is
+computed in a bounded executor (threads by default: NumPy releases the GIL in
+the array kernels), so the event loop is never blocked.
+
+Concurrent requests for the same tile are merged: the first one starts the
+computation and every later one awaits the same result until it is done.
+Distinct computations are limited to max_pending at a time; further requests
+wait for a slot (backpressure on the callers), or fail with Busy once their
+timeout runs out.  Cancelling a request does not cancel a computation other
+requests are waiting for.
+"""
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import SimplexNoise
+
+
+class Busy(Exception):
+    """
+    Busy -- raised when a request could not get a computation slot in time.
+    """
+
+
+class NoiseService(object):
+    """
+    NoiseService -- merges, bounds and offloads tile computations for one event loop.
+    """
+
+    def __init__(self, tile_shape, step=1.0, workers=None, max_pending=64, executor=None,
+                 noise=None, cache=None):
+        """
+        :param tile_shape: samples per tile along each axis; also fixes the dimension
+        :param step: spacing between samples, a scalar or one value per axis
+        :param workers: thread pool size when no executor is given, default as ThreadPoolExecutor
+        :param max_pending: most distinct tile computations queued or running at once
+        :param executor: optional concurrent.futures executor to use instead of an own thread pool
+        :param noise: SimplexNoise instance to sample, default the module-level functions
+        :param cache: optional SimplexTileCache.TileCache to read and write tiles through;
+                      its tile_shape and step must match
+        """
+        self.tile_shape = tuple(int(n) for n in tile_shape)
+        if len(self.tile_shape) not in (2, 3, 4):
+            raise ValueError("noise tiles have 2, 3 or 4 axes, not {0}".format(len(self.tile_shape)))
+        self.step = tuple(float(s) for s in np.broadcast_to(step, (len(self.tile_shape),)))
+        if cache is not None and (cache.tile_shape, cache.step) != (self.tile_shape, self.step):
+            raise ValueError("cache tile_shape and step do not match the service")
+        self.noise = SimplexNoise._default if noise is None else noise
+        self.cache = cache
+        self.max_pending = int(max_pending)
+
+        self._owns_executor = executor is None
+        self._executor = ThreadPoolExecutor(workers) if executor is None else executor
+        # Created by the first request, inside the running loop: before Python 3.10 an
+        # asyncio.Semaphore binds to get_event_loop() when constructed, and a service
+        # built outside asyncio.run() would fail as soon as a request has to wait
+        self._slots = None
+        self._inflight = {}
+
+        self.requests = 0
+        self.merged = 0
+        self.computed = 0
+        self.rejected = 0
+
+    async def agenerate_tile(self, tile_index, octaves, persistence, scale, loBound=None, hiBound=None,
+                             dtype=np.float64, timeout=None):
+        """
+        agenerate_tile() -- one tile of octave noise, or of scaled octave noise with bounds.
+        :param tile_index: tuple of ints, one per axis
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound: optional lower bound; with hiBound, values are remapped as by
+                        scaled_octave_noise_*d()
+        :param hiBound: optional upper bound
+        :param dtype: float64 (default) or float32
+        :param timeout: seconds to wait for a computation slot before raising Busy,
+                        None to wait as long as it takes
+        :return: read-only ndarray of shape tile_shape, shared with concurrent requesters
+        """
+        tile_index = tuple(int(t) for t in tile_index)
+        if len(tile_index) != len(self.tile_shape):
+            raise ValueError("tile index {0} does not match tile shape {1}".format(tile_index, self.tile_shape))
+        bounds = None if loBound is None and hiBound is None else (float(loBound), float(hiBound))
+        dtype = np.dtype(dtype)
+        key = (tile_index, int(octaves), float(persistence), float(scale), bounds, dtype.str)
+        self.requests += 1
+
+        future = self._inflight.get(key)
+        if future is None:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_pending)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Busy("no computation slot free within {0} s ({1} pending)".format(timeout, self.max_pending))
+            # Another request may have started this tile while we waited for the slot
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._start(key)
+            else:
+                self._slots.release()
+                self.merged += 1
+        else:
+            self.merged += 1
+        return await asyncio.shield(future)
+
+    def pending(self):
+        """
+        pending() -- number of distinct tile computations queued or running
+        :return: int
+        """
+        return len(self._inflight)
+
+    def stats(self):
+        """
+        stats() -- counters for this service
+        :return: dict with requests, merged, computed, rejected and pending
+        """
+        return {"requests": self.requests, "merged": self.merged, "computed": self.computed,
+                "rejected": self.rejected, "pending": self.pending()}
+
+    def close(self):
+        """
+        close() -- shut down the executor if the service created it
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def _start(self, key):
+        """
+        submit a tile computation holding one slot, releasing the slot when it finishes
+        :return: asyncio future of the tile
+        """
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._compute, *key)
+        self._inflight[key] = future
+        self.computed += 1
+
+        def finished(f):
+            if self._inflight.get(key) is f:
+                del self._inflight[key]
+            self._slots.release()
+            if not f.cancelled():
+                f.exception()   # retrieved here, so an error nobody awaits is not logged as lost
+        future.add_done_callback(finished)
+        return future
+
+    def _compute(self, tile_index, octaves, persistence, scale, bounds, dtype):
+        """
+        executor task: compute (or read from the cache) one tile
+        :return: read-only ndarray
+        """
+        dtype = np.dtype(dtype)
+        if self.cache is not None:
+            if bounds is None:
+                return self.cache.octave_tile(tile_index, octaves, persistence, scale, dtype, self.noise)
+            return self.cache.scaled_octave_tile(tile_index, octaves, persistence, scale, bounds[0], bounds[1],
+                                                 dtype, self.noise)
+        grid = getattr(self.noise, "noise_grid_{0}d".format(len(self.tile_shape)))
+        start = [t*n for t, n in zip(tile_index, self.tile_shape)]
+        values = grid((0.0,)*len(self.tile_shape), self.step, self.tile_shape, octaves, persistence, scale,
+                      start=start, dtype=dtype)
+        if bounds is not None:
+            values = SimplexNoise._rescale(values, bounds[0], bounds[1])
+        values.flags.writeable = False
+        return values
+
+
+# Services used by agenerate_tile(), per event loop and configuration
+_services = weakref.WeakKeyDictionary()
+
+
+async def agenerate_tile(tile_index, tile_shape, octaves, persistence, scale, loBound=None, hiBound=None,
+                         step=1.0, dtype=np.float64, noise=None, timeout=None):
+    """
+    agenerate_tile() -- one noise tile through a shared NoiseService of the running loop.
+    A service is created with default limits on first use for each tile_shape,
+    step and noise seed and lattice mode; create a NoiseService directly to choose the limits.
+    :param tile_index: tuple of ints, one per axis
+    :param tile_shape: samples per tile along each axis
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param loBound: optional lower bound, see NoiseService.agenerate_tile()
+    :param hiBound: optional upper bound
+    :param step: spacing between samples, a scalar or one value per axis
+    :param dtype: float64 (default) or float32
+    :param noise: SimplexNoise instance to sample, default the module-level functions
+    :param timeout: see NoiseService.agenerate_tile()
+    :return: read-only ndarray of shape tile_shape
+    """
+    noise = SimplexNoise._default if noise is None else noise
+    tile_shape = tuple(int(n) for n in tile_shape)
+    config = (tile_shape, tuple(float(s) for s in np.broadcast_to(step, (len(tile_shape),))), noise.seed,
+              noise.lattice)
+    services = _services.setdefault(asyncio.get_running_loop(), {})
+    service = services.get(config)
+    if service is None:
+        service = services[config] = NoiseService(tile_shape, step, noise=noise)
+    return await service.agenerate_tile(tile_index, octaves, persistence, scale, loBound, hiBound,
+                                        dtype, timeout)
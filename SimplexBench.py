@@ -0,0 +1,297 @@
+"""
+SimplexBench.py -- throughput and peak-memory benchmarks for SimplexNoise.py
+
+Times every public noise function of SimplexNoise.py (scalar, array and grid
+entry points, in 2, 3 and 4 dimensions, their periodic variants and the
+octave masks, over several octave counts, batch sizes and grid shapes) and
+records samples per second and the peak memory traced by tracemalloc while
+the case runs.  Results are written as JSON; a later run can be compared
+against a saved file and fails when any case got slower, or hungrier, by
+more than a threshold.
+
+    python SimplexBench.py --output base.json
+    ... change the code ...
+    python SimplexBench.py --baseline base.json --threshold 0.10
+
+Timings are the best of several repeats, which is the least noisy estimate on
+a shared machine; memory is measured in one extra, separately traced run so
+that tracing does not slow the timed runs down.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import SimplexNoise
+
+OCTAVES = (1, 4, 8)
+PERSISTENCE = 0.5
+SCALE = 0.01
+# Thresholds for the octave_mask_*d_array functions: near 0 most samples need
+# several octaves, at 0.5 about 80% settle within the first two
+MASK_THRESHOLDS = (0.0, 0.5)
+# Period along every axis for the *_periodic functions, in input coordinates
+PERIOD = 256.0
+
+# Points per call of the scalar functions, which run a Python loop per sample
+SCALAR_POINTS = 2000
+# Points per call of the *_array functions
+BATCH_SIZES = (1 << 10, 1 << 16, 1 << 20)
+# Grid shapes per dimension for the noise_grid_*d functions
+GRID_SHAPES = {2: ((64, 64), (512, 512), (2048, 2048)),
+               3: ((16, 16, 16), (64, 64, 64), (128, 128, 128)),
+               4: ((8, 8, 8, 8), (16, 16, 16, 16), (32, 32, 32, 32))}
+
+# Reduced sizes for --quick runs
+QUICK_BATCH_SIZES = (1 << 10, 1 << 14)
+QUICK_GRID_SHAPES = {2: ((64, 64), (256, 256)),
+                     3: ((16, 16, 16), (32, 32, 32)),
+                     4: ((8, 8, 8, 8), (12, 12, 12, 12))}
+
+
+def cases(quick=False):
+    """
+    cases() -- every benchmark case, each with its own pre-generated inputs.
+    :param quick: use the smaller batch sizes and grid shapes
+    :return: list of (name, samples per call, zero-argument callable)
+    """
+    batch_sizes = QUICK_BATCH_SIZES if quick else BATCH_SIZES
+    grid_shapes = QUICK_GRID_SHAPES if quick else GRID_SHAPES
+    rng = np.random.RandomState(0)
+    result = []
+
+    points = [tuple(float(v) for v in p) for p in rng.uniform(-100.0, 100.0, (SCALAR_POINTS, 4))]
+    floor = SimplexNoise.fastfloor
+    result.append(("fastfloor", SCALAR_POINTS, lambda: [floor(p[0]) for p in points]))
+
+    for dims in (2, 3, 4):
+        pts = [p[:dims] for p in points]
+        raw = getattr(SimplexNoise, "raw_noise_{0}d".format(dims))
+        scaled_raw = getattr(SimplexNoise, "scaled_raw_noise_{0}d".format(dims))
+        octave = getattr(SimplexNoise, "octave_noise_{0}d".format(dims))
+        scaled_octave = getattr(SimplexNoise, "scaled_octave_noise_{0}d".format(dims))
+
+        result.append((raw.__name__, SCALAR_POINTS, _scalar(raw, (), pts)))
+        result.append((scaled_raw.__name__, SCALAR_POINTS, _scalar(scaled_raw, (-1.0, 1.0), pts)))
+        for octaves in OCTAVES:
+            tag = "[octaves={0}]".format(octaves)
+            result.append((octave.__name__ + tag, SCALAR_POINTS,
+                           _scalar(octave, (octaves, PERSISTENCE, SCALE), pts)))
+            result.append((scaled_octave.__name__ + tag, SCALAR_POINTS,
+                           _scalar(scaled_octave, (octaves, PERSISTENCE, SCALE, -1.0, 1.0), pts)))
+
+    for dims in (2, 3):
+        pts = [p[:dims] for p in points]
+        periods = (PERIOD,)*dims
+        raw = getattr(SimplexNoise, "raw_noise_{0}d_periodic".format(dims))
+        octave = getattr(SimplexNoise, "octave_noise_{0}d_periodic".format(dims))
+        result.append((raw.__name__, SCALAR_POINTS, _scalar(raw, (), pts, periods)))
+        for octaves in OCTAVES:
+            result.append((octave.__name__ + "[octaves={0}]".format(octaves), SCALAR_POINTS,
+                           _scalar(octave, (octaves, PERSISTENCE, SCALE), pts, periods)))
+
+    for dims in (2, 3, 4):
+        raw = getattr(SimplexNoise, "raw_noise_{0}d_array".format(dims))
+        scaled_raw = getattr(SimplexNoise, "scaled_raw_noise_{0}d_array".format(dims))
+        octave = getattr(SimplexNoise, "octave_noise_{0}d_array".format(dims))
+        scaled_octave = getattr(SimplexNoise, "scaled_octave_noise_{0}d_array".format(dims))
+        for size in batch_sizes:
+            coords = tuple(rng.uniform(-100.0, 100.0, size) for _ in range(dims))
+            tag = "[n={0}]".format(size)
+            result.append((raw.__name__ + tag, size, _call(raw, coords)))
+            result.append((scaled_raw.__name__ + tag, size, _call(scaled_raw, (-1.0, 1.0) + coords)))
+            for octaves in OCTAVES:
+                tag = "[n={0},octaves={1}]".format(size, octaves)
+                result.append((octave.__name__ + tag, size,
+                               _call(octave, (octaves, PERSISTENCE, SCALE) + coords)))
+                result.append((scaled_octave.__name__ + tag, size,
+                               _call(scaled_octave, (octaves, PERSISTENCE, SCALE, -1.0, 1.0) + coords)))
+
+    for dims in (2, 3, 4):
+        mask = getattr(SimplexNoise, "octave_mask_{0}d_array".format(dims))
+        for size in batch_sizes:
+            coords = tuple(rng.uniform(-100.0, 100.0, size) for _ in range(dims))
+            for octaves in OCTAVES:
+                for threshold in MASK_THRESHOLDS:
+                    tag = "[n={0},octaves={1},threshold={2}]".format(size, octaves, threshold)
+                    result.append((mask.__name__ + tag, size,
+                                   _call(mask, (octaves, PERSISTENCE, SCALE, threshold) + coords)))
+
+    for dims in (2, 3):
+        periods = (PERIOD,)*dims
+        raw = getattr(SimplexNoise, "raw_noise_{0}d_periodic_array".format(dims))
+        octave = getattr(SimplexNoise, "octave_noise_{0}d_periodic_array".format(dims))
+        for size in batch_sizes:
+            coords = tuple(rng.uniform(-100.0, 100.0, size) for _ in range(dims))
+            result.append((raw.__name__ + "[n={0}]".format(size), size, _call(raw, coords + periods)))
+            for octaves in OCTAVES:
+                tag = "[n={0},octaves={1}]".format(size, octaves)
+                result.append((octave.__name__ + tag, size,
+                               _call(octave, (octaves, PERSISTENCE, SCALE) + coords + periods)))
+
+    for dims in (2, 3, 4):
+        grid = getattr(SimplexNoise, "noise_grid_{0}d".format(dims))
+        for shape in grid_shapes[dims]:
+            for octaves in OCTAVES:
+                name = "{0}[{1},octaves={2}]".format(grid.__name__, "x".join(str(n) for n in shape), octaves)
+                result.append((name, int(np.prod(shape)),
+                               _call(grid, ((0.0,)*dims, 1.0, shape, octaves, PERSISTENCE, SCALE))))
+
+    for dims in (2, 3):
+        grid = getattr(SimplexNoise, "noise_grid_{0}d_periodic".format(dims))
+        for shape in grid_shapes[dims]:
+            # One period per grid, the seamless tile the function is meant for
+            step = tuple(PERIOD/n for n in shape)
+            for octaves in OCTAVES:
+                name = "{0}[{1},octaves={2}]".format(grid.__name__, "x".join(str(n) for n in shape), octaves)
+                result.append((name, int(np.prod(shape)),
+                               _call(grid, ((0.0,)*dims, step, shape, PERIOD, octaves, PERSISTENCE, SCALE))))
+
+    return result
+
+
+def _scalar(function, args, points, periods=()):
+    """
+    :return: callable evaluating function(*args, *point, *periods) for every point
+    """
+    def run():
+        for p in points:
+            function(*(args + p + periods))
+    return run
+
+
+def _call(function, args):
+    """
+    :return: callable evaluating function(*args) once
+    """
+    return lambda: function(*args)
+
+
+def measure(run, samples, repeat=5, min_time=0.2):
+    """
+    measure() -- time one case and trace its peak memory.
+    :param run: zero-argument callable
+    :param samples: samples computed per call of run
+    :param repeat: timed repeats; the fastest one is reported
+    :param min_time: each repeat loops over run until it has taken at least this long
+    :return: dict with samples, seconds (per call), samples_per_s and peak_bytes
+    """
+    run()   # warm up the table caches and the allocator
+
+    loops = 1
+    while True:
+        seconds = _timed(run, loops)
+        if seconds >= min_time:
+            break
+        loops *= 2
+    best = min([seconds] + [_timed(run, loops) for _ in range(repeat - 1)])/loops
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"samples": samples, "seconds": best, "samples_per_s": samples/best, "peak_bytes": peak}
+
+
+def _timed(run, loops):
+    """
+    :return: wall-clock seconds for loops calls of run
+    """
+    start = time.perf_counter()
+    for _ in range(loops):
+        run()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(quick=False, select=None, repeat=5, min_time=0.2, log=None):
+    """
+    run_benchmarks() -- measure every case.
+    :param quick: smaller batches and grids, see cases()
+    :param select: only run the cases whose name contains this string
+    :param repeat: see measure()
+    :param min_time: see measure()
+    :param log: optional file to print one line per case to
+    :return: JSON-serialisable dict with "meta" and per-case "results"
+    """
+    results = {}
+    for name, samples, run in cases(quick):
+        if select and select not in name:
+            continue
+        results[name] = measure(run, samples, repeat, min_time)
+        if log is not None:
+            r = results[name]
+            print("{0:<60} {1:>14,.0f} samples/s {2:>12,} bytes peak".format(
+                name, r["samples_per_s"], r["peak_bytes"]), file=log)
+
+    meta = {"python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick}
+    return {"meta": meta, "results": results}
+
+
+def compare(current, baseline, threshold=0.1, min_bytes=1 << 16):
+    """
+    compare() -- find the cases that regressed against a baseline run.
+    A case regresses when its throughput dropped, or its peak memory grew, by
+    more than threshold (a fraction).  Cases present in only one run are ignored.
+    :param current: dict from run_benchmarks()
+    :param baseline: dict from run_benchmarks(), e.g. loaded from a saved JSON file
+    :param threshold: allowed relative change, e.g. 0.1 for 10%
+    :param min_bytes: peak memory growth below this many bytes is never a regression,
+                      so the few bytes traced by the scalar cases do not trip the check
+    :return: list of (name, metric, baseline value, current value, relative change)
+    """
+    regressions = []
+    for name, now in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        speed = now["samples_per_s"]/before["samples_per_s"] - 1.0
+        if speed < -threshold:
+            regressions.append((name, "samples_per_s", before["samples_per_s"], now["samples_per_s"], speed))
+        if now["peak_bytes"] - before["peak_bytes"] > min_bytes:
+            memory = now["peak_bytes"]/float(max(before["peak_bytes"], 1)) - 1.0
+            if memory > threshold:
+                regressions.append((name, "peak_bytes", before["peak_bytes"], now["peak_bytes"], memory))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SimplexNoise.py entry points.")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown or memory growth that counts as a regression (default 0.1)")
+    parser.add_argument("--select", help="only run cases whose name contains this string")
+    parser.add_argument("--quick", action="store_true", help="smaller batches and grids")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repeats per case (default 5)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per repeat (default 0.2)")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.quick, args.select, args.repeat, args.min_time, log=sys.stdout)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for name, metric, before, now, change in regressions:
+            print("REGRESSION {0} {1}: {2:,.0f} -> {3:,.0f} ({4:+.1%})".format(name, metric, before, now, change))
+        if regressions:
+            return 1
+        print("no regressions beyond {0:.0%}".format(args.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+SimplexChannels.py -- several independent noise channels at the same coordinates
+
+For fields sampled together, such as temperature, moisture and erosion for a
+biome map, each from its own seed:
+
+    temperature, moisture, erosion = octave_noise_2d_channels([11, 12, 13], 6, 0.5, 0.01, xs, ys)
+
+Channels differ only in the gradient chosen at each lattice point, so the
+skew, the cell and corner offsets and the falloff terms are the same for all
+of them.  These functions compute that geometry once per octave and then only
+hash and shade the corners for each channel, instead of redoing all of it in a
+separate octave_noise_2d_array() call per channel.  Each channel is identical
+to octave_noise_*d_array() of its own generator.
+
+Channels are given as seeds, or as SimplexNoise instances (which carry the
+permutation table and lattice mode); the two can be mixed.
+"""
+
+import numpy as np
+
+import SimplexNoise
+
+
+def raw_noise_2d_channels(channels, xs, ys, dtype=None, out=None):
+    """
+    raw_noise_2d_channels() -- 2D raw Simplex noise of several generators over whole arrays
+    :param channels: sequence of seeds or SimplexNoise instances
+    :param xs: array_like of x coordinates
+    :param ys: array_like of y coordinates, broadcastable against xs
+    :param dtype: float64 (default) or float32
+    :param out: optional ndarray of shape (len(channels),) + broadcast shape for the result
+    :return: ndarray of shape (len(channels),) + broadcast shape, values in [-1, 1]
+    """
+    # One octave at scale 1 adds nothing to the raw kernel's arithmetic
+    return _octave_channels(channels, 1, 1.0, 1.0, (xs, ys), dtype, out)
+
+
+def raw_noise_3d_channels(channels, xs, ys, zs, dtype=None, out=None):
+    """
+    raw_noise_3d_channels() -- 3D raw Simplex noise of several generators over whole arrays
+    :param channels: sequence of seeds or SimplexNoise instances
+    :return: ndarray of shape (len(channels),) + broadcast shape, values in [-1, 1]
+    """
+    return _octave_channels(channels, 1, 1.0, 1.0, (xs, ys, zs), dtype, out)
+
+
+def raw_noise_4d_channels(channels, xs, ys, zs, ws, dtype=None, out=None):
+    """
+    raw_noise_4d_channels() -- 4D raw Simplex noise of several generators over whole arrays
+    :param channels: sequence of seeds or SimplexNoise instances
+    :return: ndarray of shape (len(channels),) + broadcast shape, values in [-1, 1]
+    """
+    return _octave_channels(channels, 1, 1.0, 1.0, (xs, ys, zs, ws), dtype, out)
+
+
+def octave_noise_2d_channels(channels, octaves, persistence, scale, xs, ys, dtype=None, out=None):
+    """
+    octave_noise_2d_channels() -- 2D multi-octave Simplex noise of several generators over whole arrays
+    :param channels: sequence of seeds or SimplexNoise instances
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param xs: array_like of x coordinates
+    :param ys: array_like of y coordinates, broadcastable against xs
+    :param dtype: float64 (default) or float32
+    :param out: optional ndarray of shape (len(channels),) + broadcast shape for the result
+    :return: ndarray of shape (len(channels),) + broadcast shape, values in [-1, 1];
+             entry [c] equals channel c's octave_noise_2d_array()
+    """
+    return _octave_channels(channels, octaves, persistence, scale, (xs, ys), dtype, out)
+
+
+def octave_noise_3d_channels(channels, octaves, persistence, scale, xs, ys, zs, dtype=None, out=None):
+    """
+    octave_noise_3d_channels() -- 3D multi-octave Simplex noise of several generators over whole arrays
+    :param channels: sequence of seeds or SimplexNoise instances
+    :return: ndarray of shape (len(channels),) + broadcast shape, values in [-1, 1]
+    """
+    return _octave_channels(channels, octaves, persistence, scale, (xs, ys, zs), dtype, out)
+
+
+def octave_noise_4d_channels(channels, octaves, persistence, scale, xs, ys, zs, ws, dtype=None, out=None):
+    """
+    octave_noise_4d_channels() -- 4D multi-octave Simplex noise of several generators over whole arrays
+    :param channels: sequence of seeds or SimplexNoise instances
+    :return: ndarray of shape (len(channels),) + broadcast shape, values in [-1, 1]
+    """
+    return _octave_channels(channels, octaves, persistence, scale, (xs, ys, zs, ws), dtype, out)
+
+
+def _generator(channel):
+    """
+    :param channel: seed or SimplexNoise instance
+    :return: SimplexNoise instance
+    """
+    if isinstance(channel, SimplexNoise.SimplexNoise):
+        return channel
+    return SimplexNoise.SimplexNoise(channel)
+
+
+def _octave_channels(channels, octaves, persistence, scale, coords, dtype=None, out=None):
+    """
+    octave loop of _octave_array() with the geometry of each block and octave
+    computed once and shaded for every channel
+    :param channels: sequence of seeds or SimplexNoise instances
+    :param coords: tuple of array_like coordinates, one per dimension
+    :param dtype: float32 or float64 for the result and every temporary
+    :param out: optional ndarray for the result
+    :return: ndarray of shape (len(channels),) + broadcast shape of coords
+    """
+    dims = len(coords)
+    corners = getattr(SimplexNoise, "_corners_{0}d".format(dims))
+    table, factor = SimplexNoise._kernel_shading[dims]
+    hashes = [getattr(_generator(c), "_hash_{0}d".format(dims)) for c in channels]
+
+    frequencies, amplitudes, maxAmplitude = SimplexNoise._octave_schedule(octaves, persistence, scale)
+    coords = np.broadcast_arrays(*[SimplexNoise._float_array(c) for c in coords])
+    shape = coords[0].shape
+    coords = [c.ravel() for c in coords]
+    size = coords[0].size
+
+    out = SimplexNoise._output((len(hashes),) + shape, dtype, out)
+    result = out if out.flags.c_contiguous else np.empty(out.shape, out.dtype)
+    flat = result.reshape(len(hashes), size)
+    block = SimplexNoise._OCTAVE_BLOCK
+    scaled = [np.empty(min(size, block), out.dtype) for _ in coords]
+    for lo in range(0, size, block):
+        hi = min(lo + block, size)
+        totals = flat[:, lo:hi]
+        totals.fill(0.0)
+        for frequency, amplitude in zip(frequencies, amplitudes):
+            xs = [np.multiply(c[lo:hi], frequency, out=buf[:hi - lo]) for c, buf in zip(coords, scaled)]
+            geometry = _weighted(corners(*xs))
+            for total, corner_hash in zip(totals, hashes):
+                total += _shade(geometry, corner_hash, table, factor)*amplitude
+        totals /= maxAmplitude
+
+    if result is not out:
+        out[...] = result
+    return out
+
+
+def _weighted(corners):
+    """
+    replace the falloff term of each corner by its weight t^4, zero outside the
+    falloff radius, which is the same for every channel
+    :param corners: from SimplexNoise._corners_2d/3d/4d()
+    :return: list of (lattice point, offsets, weight)
+    """
+    weighted = []
+    for point, d, t in corners:
+        t2 = t*t
+        weighted.append((point, d, np.where(t < 0, 0.0, t2*t2)))
+    return weighted
+
+
+def _shade(corners, corner_hash, table, factor):
+    """
+    SimplexNoise._shade() for corners from _weighted(); the same values, as
+    weight*(g.d) rounds like the kernel's t^4*(g.d)
+    :return: ndarray of one channel's noise values
+    """
+    total = None
+    for point, d, weight in corners:
+        gi = corner_hash(*point)
+        dot = table[0][gi]*d[0]
+        for n in range(1, len(d)):
+            dot = dot + table[n][gi]*d[n]
+        value = dot*weight
+        total = value if total is None else total + value
+    return total*factor
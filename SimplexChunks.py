@@ -0,0 +1,145 @@
+"""
+SimplexChunks.py -- streaming, chunk-at-a-time generation of Simplex noise fields
+
+For worlds that do not fit in memory: iter_chunks() walks a regular grid one
+chunk at a time and yields each chunk as soon as it is computed, so a consumer
+that writes chunks out and drops them keeps only one chunk alive.  Chunks can
+be visited in row-major or Z-order (Morton order, which keeps neighbouring
+chunks close together in the stream), and a walk can be resumed from any chunk
+index after a crash.  Both orders are generated as the walk goes, so even a
+region of billions of chunks starts streaming at once.  Every chunk is
+identical to the matching slice of a single noise_grid_*d() call over the
+whole region.
+"""
+
+import numpy as np
+
+import SimplexNoise
+
+
+def iter_chunks(origin, step, shape, chunk_shape, octaves, persistence, scale,
+                order="row", resume_from=None, noise=None):
+    """
+    iter_chunks() -- lazily generate a multi-octave noise grid chunk by chunk.
+    :param origin: coordinates of the first sample of the region
+    :param step: spacing between samples, a scalar or one value per axis
+    :param shape: number of samples along each axis of the region (2, 3 or 4 axes)
+    :param chunk_shape: samples per chunk along each axis, scalar or per axis;
+                        chunks on the far edges are clipped to the region
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param order: "row" for row-major traversal (last axis fastest), "z" for Z-order
+    :param resume_from: chunk index to restart at; chunks before it in the chosen
+                        order are skipped without being computed or listed
+    :param noise: SimplexNoise instance to sample, default the module-level functions
+    :return: generator of (chunk_index, ndarray) pairs, chunk_index a tuple of ints
+    """
+    shape = tuple(int(n) for n in shape)
+    if len(shape) not in (2, 3, 4):
+        raise ValueError("noise grids have 2, 3 or 4 axes, not {0}".format(len(shape)))
+    chunk_shape = tuple(int(n) for n in np.broadcast_to(chunk_shape, (len(shape),)))
+    if min(chunk_shape) < 1:
+        raise ValueError("chunk_shape must be positive")
+    grid = getattr(SimplexNoise._default if noise is None else noise, "noise_grid_{0}d".format(len(shape)))
+
+    indices = chunk_indices(shape, chunk_shape, order, resume_from)
+    return _generate(grid, origin, step, shape, chunk_shape, octaves, persistence, scale, indices)
+
+
+def chunk_indices(shape, chunk_shape, order="row", resume_from=None):
+    """
+    chunk_indices() -- chunk indices of a region in traversal order, generated lazily.
+    :param shape: samples per axis of the region
+    :param chunk_shape: samples per chunk along each axis
+    :param order: "row" or "z", see iter_chunks()
+    :param resume_from: optional chunk index to start at, see iter_chunks()
+    :return: iterator of tuples of int
+    """
+    counts = [-(-int(n) // int(c)) for n, c in zip(shape, chunk_shape)]
+    if order not in ("row", "z"):
+        raise ValueError("unknown chunk order {0!r}".format(order))
+    if resume_from is not None:
+        resume_from = tuple(int(c) for c in resume_from)
+        if len(resume_from) != len(counts) or not all(0 <= c < n for c, n in zip(resume_from, counts)):
+            raise ValueError("chunk {0} is not in the region".format(resume_from))
+    if min(counts) == 0:
+        return iter(())
+    if order == "row":
+        return _row_indices(counts, resume_from)
+    bits = max(n - 1 for n in counts).bit_length()
+    first = 0 if resume_from is None else _morton_code(resume_from)
+    return _z_indices(counts, bits, first, 0, (0,)*len(counts))
+
+
+def _row_indices(counts, resume_from):
+    """
+    row-major chunk indices (last axis fastest), from resume_from on
+    """
+    position = 0
+    if resume_from is not None:
+        for c, n in zip(resume_from, counts):
+            position = position*n + c
+    total = 1
+    for n in counts:
+        total *= n
+    for position in range(position, total):
+        index = []
+        for n in reversed(counts):
+            position, c = divmod(position, n)
+            index.append(c)
+        yield tuple(reversed(index))
+
+
+def _z_indices(counts, bits, first, prefix, corner):
+    """
+    Z-order chunk indices by depth-first descent of the 2**D-ary tree over the
+    region padded to 2**bits chunks per axis: a node is split on the next bit of
+    every axis, its children visited in the order of their Morton codes.  Nodes
+    wholly outside the region, or wholly before the code first, are skipped
+    without being descended into.
+    :param counts: chunks per axis of the region
+    :param bits: levels below this node
+    :param first: Morton code of the first index to yield
+    :param prefix: Morton code bits of this node
+    :param corner: lowest chunk index of this node
+    :return: generator of tuples of int
+    """
+    dims = len(counts)
+    if bits == 0:
+        yield corner
+        return
+    bits -= 1
+    for child in range(1 << dims):
+        code = (prefix << dims) | child
+        # Codes below this child span [code << bits*dims, (code + 1) << bits*dims)
+        if (code + 1) << (bits*dims) <= first:
+            continue
+        low = tuple(c | (((child >> (dims - 1 - d)) & 1) << bits) for d, c in enumerate(corner))
+        if any(c >= n for c, n in zip(low, counts)):
+            continue
+        yield from _z_indices(counts, bits, first, code, low)
+
+
+def _morton_code(index):
+    """
+    interleave the bits of a chunk index, first axis in the highest bit of each group
+    :param index: tuple of non-negative ints
+    :return: int
+    """
+    code = 0
+    dims = len(index)
+    for bit in range(max(index).bit_length()):
+        for d, c in enumerate(index):
+            code |= ((c >> bit) & 1) << (bit*dims + dims - 1 - d)
+    return code
+
+
+def _generate(grid, origin, step, shape, chunk_shape, octaves, persistence, scale, indices):
+    """
+    generator body of iter_chunks(), computing one chunk per step
+    """
+    for index in indices:
+        start = [c*n for c, n in zip(index, chunk_shape)]
+        size = [min(n, total - a) for a, n, total in zip(start, chunk_shape, shape)]
+        yield index, grid(origin, step, size, octaves, persistence, scale, start=start)
@@ -0,0 +1,423 @@
+"""
+SimplexExpr.py -- lazy, memoized expressions over Simplex noise fields
+
+Noise fields are built as expressions and only computed when evaluated over a
+region (a regular grid, as for noise_grid_2d/3d/4d()):
+
+    import SimplexExpr as E
+
+    base = E.octave(6, 0.5, 0.01)
+    ridged = 1.0 - abs(base)
+    terrain = 0.7*ridged + E.scaled_octave(4, 0.5, 0.05, 0.0, 0.3)
+    land = E.where(terrain > 0.4, terrain, 0.0)
+
+    memo = E.Memo()
+    heights = land.evaluate((0.0, 0.0), 1.0, (1024, 1024), memo=memo)
+
+Expressions are hash-consed: building a node equal to one that already exists
+(two octave(6, 0.5, 0.01) leaves, a + b and b + a) returns the existing node,
+so equal sub-expressions are computed once per evaluation.  Each node has a
+small integer id, and its key holds its operation, parameters and the ids of
+its operands, so keys stay flat however deep an expression is.  Evaluation
+walks the expression iteratively, so depth is not limited by the recursion
+limit.  A Memo passed to evaluate() keeps the
+results per region across calls, up to a byte budget, so a later expression
+sharing layers with an earlier one only computes what is new.  Results are
+read-only arrays that may be shared with the memo.
+"""
+
+from collections import OrderedDict
+from itertools import count
+import threading
+import weakref
+
+import numpy as np
+
+import SimplexNoise
+
+
+# Live expression nodes by key, so that equal expressions share one node
+_nodes = weakref.WeakValueDictionary()
+_ids = count()
+_nodes_lock = threading.Lock()
+
+
+class Expr(object):
+    """
+    Expr -- a lazily evaluated noise expression.
+    Supports +, -, *, /, **, unary -, abs() and the comparisons <, <=, >, >=
+    (giving boolean masks), with other expressions or numbers.
+    """
+
+    # Operand expressions, evaluated before this one
+    args = ()
+    # Whether results are worth keeping in a Memo
+    memoize = True
+
+    def __new__(cls, key, *args):
+        """
+        :param key: hashable flat tuple identifying the expression, equal for equal
+                    expressions; operands appear in it by id
+        :return: the existing node with this key, or a new one
+        """
+        with _nodes_lock:
+            node = _nodes.get(key)
+            if node is None:
+                node = object.__new__(cls)
+                node.key = key
+                node.id = next(_ids)
+                node._init(*args)
+                _nodes[key] = node
+        return node
+
+    def _init(self, *args):
+        pass
+
+    def evaluate(self, origin, step, shape, start=None, dtype=None, memo=None):
+        """
+        evaluate() -- compute the expression over a regular grid.
+        :param origin: coordinates of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: number of samples along each axis (2, 3 or 4 axes)
+        :param start: optional index of the first sample per axis, as for noise_grid_2d()
+        :param dtype: float64 (default) or float32 for the noise layers
+        :param memo: optional Memo keeping results for later evaluations
+        :return: read-only ndarray of the given shape
+        """
+        shape = tuple(int(n) for n in shape)
+        dims = len(shape)
+        if dims not in (2, 3, 4):
+            raise ValueError("noise grids have 2, 3 or 4 axes, not {0}".format(dims))
+        region = (tuple(float(o) for o in np.broadcast_to(origin, (dims,))),
+                  tuple(float(s) for s in np.broadcast_to(step, (dims,))),
+                  shape,
+                  (0,)*dims if start is None else tuple(int(a) for a in start),
+                  np.dtype(np.float64 if dtype is None else dtype).str)
+        return np.broadcast_to(self._evaluate(region, memo), shape)
+
+    def _evaluate(self, region, memo):
+        """
+        value over a region, each node computed at most once.  Nodes are visited
+        depth first with an explicit stack; a node found in the memo is not
+        expanded, and a node is computed once all of its operands are known.
+        :param region: normalised (origin, step, shape, start, dtype) tuple
+        :param memo: Memo or None
+        :return: read-only ndarray
+        """
+        # Values computed or found in this evaluation, by node id
+        seen = {}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.id in seen:
+                continue
+            if expanded:
+                value = np.asarray(node._compute(region, [seen[a.id] for a in node.args]))
+                value.flags.writeable = False
+                if memo is not None and node.memoize:
+                    memo.put((node, region), value)
+                seen[node.id] = value
+                continue
+            value = memo.get((node, region)) if memo is not None and node.memoize else None
+            if value is not None:
+                seen[node.id] = value
+                continue
+            stack.append((node, True))
+            stack.extend((a, False) for a in reversed(node.args) if a.id not in seen)
+        return seen[self.id]
+
+    def _compute(self, region, values):
+        """
+        :param region: normalised (origin, step, shape, start, dtype) tuple
+        :param values: values of self.args over the region
+        :return: ndarray or scalar
+        """
+        raise NotImplementedError
+
+    def __add__(self, other):
+        return _apply("add", self, other)
+
+    def __radd__(self, other):
+        return _apply("add", other, self)
+
+    def __sub__(self, other):
+        return _apply("subtract", self, other)
+
+    def __rsub__(self, other):
+        return _apply("subtract", other, self)
+
+    def __mul__(self, other):
+        return _apply("multiply", self, other)
+
+    def __rmul__(self, other):
+        return _apply("multiply", other, self)
+
+    def __truediv__(self, other):
+        return _apply("true_divide", self, other)
+
+    def __rtruediv__(self, other):
+        return _apply("true_divide", other, self)
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, other):
+        return _apply("power", self, other)
+
+    def __rpow__(self, other):
+        return _apply("power", other, self)
+
+    def __neg__(self):
+        return _apply("negative", self)
+
+    def __abs__(self):
+        return _apply("absolute", self)
+
+    def __gt__(self, other):
+        return _apply("greater", self, other)
+
+    def __ge__(self, other):
+        return _apply("greater_equal", self, other)
+
+    def __lt__(self, other):
+        return _apply("less", self, other)
+
+    def __le__(self, other):
+        return _apply("less_equal", self, other)
+
+    def __repr__(self):
+        return "Expr({0!r})".format(self.key)
+
+
+class _Noise(Expr):
+    """
+    leaf: octave noise on the region, optionally remapped to [lo, hi]
+    """
+
+    def __new__(cls, noise, octaves, persistence, scale, bounds):
+        noise = SimplexNoise._default if noise is None else noise
+        params = (int(octaves), float(persistence), float(scale))
+        return Expr.__new__(cls, ("noise", noise.seed, noise.lattice) + params + (bounds,), noise, params, bounds)
+
+    def _init(self, noise, params, bounds):
+        self.noise = noise
+        self.params = params
+        self.bounds = bounds
+
+    def _compute(self, region, values):
+        origin, step, shape, start, dtype = region
+        grid = getattr(self.noise, "noise_grid_{0}d".format(len(shape)))
+        values = grid(origin, step, shape, *self.params, start=start, dtype=dtype)
+        if self.bounds is not None:
+            values = SimplexNoise._rescale(values, *self.bounds)
+        return values
+
+
+class _Constant(Expr):
+    """
+    leaf: a number, broadcast against the other operands
+    """
+
+    # Nothing worth memoising
+    memoize = False
+
+    def __new__(cls, value):
+        # The type is part of the key, as True == 1 == 1.0 would otherwise share one
+        return Expr.__new__(cls, ("constant", type(value).__name__, value), value)
+
+    def _init(self, value):
+        self.value = value
+
+    def _compute(self, region, values):
+        return np.asarray(self.value)
+
+
+class _Apply(Expr):
+    """
+    node: a NumPy ufunc (or np.where / np.clip) applied to other expressions
+    """
+
+    def __new__(cls, name, args):
+        return Expr.__new__(cls, (name,) + tuple(a.id for a in args), name, args)
+
+    def _init(self, name, args):
+        self.name = name
+        self.args = args
+
+    def _compute(self, region, values):
+        return _OPERATIONS[self.name](*values)
+
+
+_OPERATIONS = {
+    "add": np.add, "subtract": np.subtract, "multiply": np.multiply, "true_divide": np.true_divide,
+    "power": np.power, "negative": np.negative, "absolute": np.absolute,
+    "minimum": np.minimum, "maximum": np.maximum,
+    "greater": np.greater, "greater_equal": np.greater_equal, "less": np.less, "less_equal": np.less_equal,
+    "where": np.where, "clip": np.clip,
+}
+
+# Operations whose result does not depend on the order of their operands
+_COMMUTATIVE = frozenset(["add", "multiply", "minimum", "maximum"])
+
+
+def _expr(value):
+    """
+    :param value: Expr or number
+    :return: Expr
+    """
+    if isinstance(value, Expr):
+        return value
+    if isinstance(value, (bool, int, float, np.number)):
+        return _Constant(value.item() if isinstance(value, np.number) else value)
+    raise TypeError("cannot use {0!r} in a noise expression".format(value))
+
+
+def _apply(name, *args):
+    """
+    :return: Expr applying operation name to args, operands of commutative
+             operations put in a canonical order so that a + b and b + a share a node
+    """
+    args = [_expr(a) for a in args]
+    if name in _COMMUTATIVE:
+        args.sort(key=lambda a: a.id)
+    return _Apply(name, tuple(args))
+
+
+def octave(octaves, persistence, scale, noise=None):
+    """
+    octave() -- expression for octave_noise_*d() over the region.
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param noise: SimplexNoise instance, default the module-level functions
+    :return: Expr with values in [-1, 1]
+    """
+    return _Noise(noise, octaves, persistence, scale, None)
+
+
+def scaled_octave(octaves, persistence, scale, loBound, hiBound, noise=None):
+    """
+    scaled_octave() -- expression for scaled_octave_noise_*d() over the region.
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param loBound:
+    :param hiBound:
+    :param noise: SimplexNoise instance, default the module-level functions
+    :return: Expr with values between loBound and hiBound
+    """
+    return _Noise(noise, octaves, persistence, scale, (float(loBound), float(hiBound)))
+
+
+def raw(noise=None):
+    """
+    raw() -- expression for raw_noise_*d() over the region (one octave at scale 1).
+    :param noise: SimplexNoise instance, default the module-level functions
+    :return: Expr with values in [-1, 1]
+    """
+    return _Noise(noise, 1, 1.0, 1.0, None)
+
+
+def scaled_raw(loBound, hiBound, noise=None):
+    """
+    scaled_raw() -- expression for scaled_raw_noise_*d() over the region.
+    :param loBound:
+    :param hiBound:
+    :param noise: SimplexNoise instance, default the module-level functions
+    :return: Expr with values between loBound and hiBound
+    """
+    return _Noise(noise, 1, 1.0, 1.0, (float(loBound), float(hiBound)))
+
+
+def minimum(a, b):
+    """
+    minimum() -- element-wise minimum of two expressions or numbers
+    :return: Expr
+    """
+    return _apply("minimum", a, b)
+
+
+def maximum(a, b):
+    """
+    maximum() -- element-wise maximum of two expressions or numbers
+    :return: Expr
+    """
+    return _apply("maximum", a, b)
+
+
+def clip(a, lo, hi):
+    """
+    clip() -- a limited to [lo, hi]
+    :return: Expr
+    """
+    return _apply("clip", a, lo, hi)
+
+
+def where(mask, a, b):
+    """
+    where() -- a where mask is true, b elsewhere
+    :param mask: boolean Expr, e.g. a comparison
+    :return: Expr
+    """
+    return _apply("where", mask, a, b)
+
+
+class Memo(object):
+    """
+    Memo -- results of evaluated expressions, per expression and region, with LRU eviction.
+    """
+
+    def __init__(self, max_bytes=1 << 28):
+        """
+        :param max_bytes: total size of the kept arrays
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key):
+        """
+        get() -- a kept result, marking it recently used
+        :param key: (expression, region)
+        :return: ndarray, or None if not kept
+        """
+        value = self._values.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._values.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        put() -- keep a result, evicting the least recently used ones beyond max_bytes
+        :param key: (expression, region)
+        :param value: ndarray
+        """
+        if value.nbytes > self.max_bytes:
+            return
+        old = self._values.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._values[key] = value
+        self._bytes += value.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._values.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+    def clear(self):
+        """
+        clear() -- drop every kept result
+        """
+        self._values.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """
+        stats() -- counters for this memo
+        :return: dict with hits, misses, entries and bytes
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._values), "bytes": self._bytes}
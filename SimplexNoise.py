@@ -1,6 +1,6 @@
 """
  * SimplexNoise.py -- Perlin-style simplex noise for Python
- *    Should work with python 2 or 3
+ *    Requires Python 3.8 or later and NumPy
  *
  * Andrew Thall (based on Java/C++ versions by Stefan Gustavson and
  *               Eliot Eshelman respectively.)
@@ -45,497 +45,1917 @@ dimension, you can ensure that each gets a unique noise value and they don't
 all look identical.
 """
 
+from functools import lru_cache
+from itertools import product
 from math import sqrt
+from random import Random
 
-def octave_noise_2d(octaves, persistence, scale, x, y):
-    """
-    octave_noise_2d() -- 2D multi-octave Simplex noise.
-    For each octave, a higher frequency/lower amplitude function will be added to the original.
-    The higher the persistence [0-1], the more of each succeeding octave will be added.
-    :param octaves:
-    :param persistence:
-    :param scale:
-    :param x:
-    :param y:
-    :return:
-    """
-    total = 0.0
-    frequency = scale
-    amplitude = 1.0
+import numpy as np
 
-    # We have to keep track of the largest possible amplitude,
-    # because each octave adds more, and we need a value in [-1, 1].
-    maxAmplitude = 0.0
-    for i in range(octaves):
-        total += raw_noise_2d(x*frequency, y*frequency)*amplitude
-        frequency *= 2
-        maxAmplitude += amplitude
-        amplitude *= persistence
+# Skewing and unskewing factors.  2D is hairy, 3D very nice and simple,
+# and the 4D factors are hairy again.
+F2 = 0.5*(sqrt(3.0) - 1.0)
+G2 = (3.0 - sqrt(3.0))/6.0
+F3 = 1.0/3.0
+G3 = 1.0/6.0
+F4 = (sqrt(5.0) - 1.0)/4.0
+G4 = (5.0 - sqrt(5.0))/20.0
 
-    return total/maxAmplitude
 
-def octave_noise_3d(octaves, persistence, scale, x, y, z):
+class SimplexNoise(object):
     """
-    octave_noise_3d() -- 2D multi-octave Simplex noise.
-    For each octave, a higher frequency/lower amplitude function will be added to the original.
-    The higher the persistence [0-1], the more of each succeeding octave will be added.
-    :param octaves:
-    :param persistence:
-    :param scale:
-    :param x:
-    :param y:
-    :param z:
-    :return:
+    SimplexNoise -- Simplex noise generator with its own permutation table.
+    Each instance carries a permutation table built from its seed, together
+    with the perm[...] % 12 and % 32 gradient-index tables precomputed from it.
+    Tables are kept in an LRU cache keyed by seed, so creating an instance for
+    a recently used seed costs no more than the lookup.
+
+    The module-level functions are the methods of an instance built without a
+    seed, which uses the classic permutation table below.
+
+    Lattice modes: with lattice="table" (the default) the gradient of each
+    lattice point is picked by chained permutation lookups on the coordinates
+    & 255, so the field repeats every 256 lattice cells (in 3D, every 128 units
+    along the diagonal: f(x + 128, y + 128, z + 128) = f(x, y, z)).  With
+    lattice="hash" it is picked by a 64-bit integer hash of the coordinates
+    (a multiply-add per axis and one xorshift-multiply round, keyed by the
+    seed) that does not repeat within any practical range and needs no table
+    lookups.  Hash mode gives a different field with the same statistics; it is
+    made for the array and grid methods, the scalar methods evaluate it through
+    them.  Instances are cheap, so the mode can also be chosen for a single call
+    with SimplexNoise(seed, lattice="hash").octave_noise_2d_array(...).
+
+    Precision: the *_array and noise_grid_* methods take dtype=float32 to do all
+    of their arithmetic and temporaries in single precision, and out= to write
+    into a caller-supplied array or np.memmap.  float64 (the default) matches the
+    scalar methods bit-for-bit.  float32 loses accuracy as the scaled coordinates
+    (coordinate*frequency) grow: the largest difference from float64 seen for
+    2D/3D octave noise is about 1e-6 for coordinates near 1, 2e-4 near 100 and
+    6e-3 near 1e4.  The 3D and 4D kernels are themselves discontinuous across
+    simplex faces (their 0.6 falloff radius reaches past them), so a sample
+    within rounding distance of a face can land on the other side of the jump
+    and differ by up to a few 1e-3.  This is rare for scattered points, but
+    grids whose step is a simple fraction of the lattice (e.g. 1.0, 0.25 or 0.1
+    in noise units) put whole rows of samples on faces: there, 1-6% of the
+    samples of 3D grids, and up to 3% in 4D, differ by more than 1e-4.  2D
+    noise is continuous and has no such jumps.
+
+    Level of detail: the octave functions and grids take footprint=, the
+    distance between neighbouring samples in input units (a scalar, or for the
+    array and grid methods one value per sample, e.g. growing with distance
+    from the camera).  An octave of frequency f has detail about 1/f input units
+    across; it is kept whole while f*footprint <= 0.25, faded out linearly up to
+    the Nyquist limit f*footprint = 0.5 and skipped beyond it.  As the footprint
+    grows each octave fades out smoothly instead of popping.  The sum is still
+    divided by maxAmplitude of all the octaves, so culling only removes detail
+    and does not rescale what is left; a footprint small enough to keep every
+    octave gives the same values as no footprint.
     """
-    total = 0.0
-    frequency = scale
-    amplitude = 1.0
 
-    # We have to keep track of the largest possible amplitude,
-    # because each octave adds more, and we need a value in [-1, 1].
-    maxAmplitude = 0.0
+    def __init__(self, seed=None, lattice="table"):
+        """
+        :param seed: None for the classic permutation table, otherwise an int, str or
+                     bytes seed from which a shuffled table is built
+        :param lattice: "table" for permutation-table gradients, or "hash" for integer-hash
+                        gradients without the 256-unit period, see "Lattice modes" above
+        """
+        if lattice not in ("table", "hash"):
+            raise ValueError("lattice must be 'table' or 'hash', not {0!r}".format(lattice))
+        self.seed = seed
+        self.lattice = lattice
+        (self._perm, self._permMod12, self._permMod32,
+         self._perm_array, self._permMod12_array, self._permMod32_array) = _build_tables(seed)
+        self._hash_key = _hash_key(seed) if lattice == "hash" else None
+
+    def __reduce__(self):
+        # Pickle by seed and mode only; the receiving process rebuilds (or finds cached) tables
+        return SimplexNoise, (self.seed, self.lattice)
+
+    def octave_noise_2d(self, octaves, persistence, scale, x, y, derivatives=False, footprint=None):
+        """
+        octave_noise_2d() -- 2D multi-octave Simplex noise.
+        For each octave, a higher frequency/lower amplitude function will be added to the original.
+        The higher the persistence [0-1], the more of each succeeding octave will be added.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param x:
+        :param y:
+        :param derivatives: also return the analytic partial derivatives
+        :param footprint: optional distance between neighbouring samples, in input units;
+                          octaves too fine to be resolved at that spacing are faded out
+                          and skipped, see "Level of detail" in the class docstring
+        :return: value in [-1, 1], or the tuple of floats (value, d/dx, d/dy) if derivatives
+        """
+        if derivatives:
+            return _floats(self.octave_noise_2d_array(octaves, persistence, scale, x, y, derivatives=True,
+                                                         footprint=footprint))
+        frequencies, amplitudes, maxAmplitude = _octave_schedule(octaves, persistence, scale)
+        if footprint is not None:
+            frequencies, amplitudes = _lod_schedule(frequencies, amplitudes, footprint)
+        raw_noise = self.raw_noise_2d
+
+        total = 0.0
+        for frequency, amplitude in zip(frequencies, amplitudes):
+            total += raw_noise(x*frequency, y*frequency)*amplitude
+
+        return total/maxAmplitude
+
+    def octave_noise_3d(self, octaves, persistence, scale, x, y, z, derivatives=False, footprint=None):
+        """
+        octave_noise_3d() -- 2D multi-octave Simplex noise.
+        For each octave, a higher frequency/lower amplitude function will be added to the original.
+        The higher the persistence [0-1], the more of each succeeding octave will be added.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param x:
+        :param y:
+        :param z:
+        :param derivatives: also return the analytic partial derivatives
+        :param footprint: optional distance between neighbouring samples, in input units;
+                          octaves too fine to be resolved at that spacing are faded out
+                          and skipped, see "Level of detail" in the class docstring
+        :return: value in [-1, 1], or the tuple of floats (value, d/dx, d/dy, d/dz) if derivatives
+        """
+        if derivatives:
+            return _floats(self.octave_noise_3d_array(octaves, persistence, scale, x, y, z, derivatives=True,
+                                                         footprint=footprint))
+        frequencies, amplitudes, maxAmplitude = _octave_schedule(octaves, persistence, scale)
+        if footprint is not None:
+            frequencies, amplitudes = _lod_schedule(frequencies, amplitudes, footprint)
+        raw_noise = self.raw_noise_3d
+
+        total = 0.0
+        for frequency, amplitude in zip(frequencies, amplitudes):
+            total += raw_noise(x*frequency, y*frequency, z*frequency)*amplitude
+
+        return total/maxAmplitude
+
+    def octave_noise_4d(self, octaves, persistence, scale, x, y, z, w, derivatives=False, footprint=None):
+        """
+        octave_noise_4d() -- 4D multi-octave Simplex noise.
+        For each octave, a higher frequency/lower amplitude function will be added to the original.
+        The higher the persistence [0-1], the more of each succeeding octave will be added.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param x:
+        :param y:
+        :param z:
+        :param w:
+        :param derivatives: also return the analytic partial derivatives
+        :param footprint: optional distance between neighbouring samples, in input units;
+                          octaves too fine to be resolved at that spacing are faded out
+                          and skipped, see "Level of detail" in the class docstring
+        :return: value in [-1, 1], or the tuple of floats (value, d/dx, d/dy, d/dz, d/dw) if derivatives
+        """
+        if derivatives:
+            return _floats(self.octave_noise_4d_array(octaves, persistence, scale, x, y, z, w, derivatives=True,
+                                                         footprint=footprint))
+        frequencies, amplitudes, maxAmplitude = _octave_schedule(octaves, persistence, scale)
+        if footprint is not None:
+            frequencies, amplitudes = _lod_schedule(frequencies, amplitudes, footprint)
+        raw_noise = self.raw_noise_4d
+
+        total = 0.0
+        for frequency, amplitude in zip(frequencies, amplitudes):
+            total += raw_noise(x*frequency, y*frequency, z*frequency, w*frequency)*amplitude
+
+        return total/maxAmplitude
+
+    def scaled_octave_noise_2d(self, octaves, persistence, scale, loBound, hiBound, x, y, footprint=None):
+        """
+        scaled_octave_noise_2d() -- 2D Scaled Multi-octave Simplex noise.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param x:
+        :param y:
+        :param footprint: optional sample spacing for level of detail, see octave_noise_2d()
+        :return: value between loBound and hiBound
+        """
+        return self.octave_noise_2d(octaves, persistence, scale, x, y,
+                                    footprint=footprint)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+
+    def scaled_octave_noise_3d(self, octaves, persistence, scale, loBound, hiBound, x, y, z, footprint=None):
+        """
+        scaled_octave_noise_3d() -- 3D Scaled Multi-octave Simplex noise.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param x:
+        :param y:
+        :param z:
+        :param footprint: optional sample spacing for level of detail, see octave_noise_3d()
+        :return: value between loBound and hiBound
+        """
+        return self.octave_noise_3d(octaves, persistence, scale, x, y, z,
+                                    footprint=footprint)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+
+    def scaled_octave_noise_4d(self, octaves, persistence, scale, loBound, hiBound, x, y, z, w, footprint=None):
+        """
+        scaled_octave_noise_4d() -- 4D Scaled Multi-octave Simplex noise.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param x:
+        :param y:
+        :param z:
+        :param w:
+        :param footprint: optional sample spacing for level of detail, see octave_noise_4d()
+        :return: value will be between loBound and hiBound
+        """
+        return self.octave_noise_4d(octaves, persistence, scale, x, y, z, w,
+                                    footprint=footprint)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+
+    def scaled_raw_noise_2d(self, loBound, hiBound, x, y):
+        """
+        scaled_raw_noise_2d() -- 2D Scaled Simplex raw noise
+        :param loBound:
+        :param hiBound:
+        :param x:
+        :param y:
+        :return: value will be between loBound and hiBound
+        """
+        return self.raw_noise_2d(x, y)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+
+    def scaled_raw_noise_3d(self, loBound, hiBound, x, y, z):
+        """
+        scaled_raw_noise_3d() -- 3D Scaled Simplex raw noise
+        :param loBound:
+        :param hiBound:
+        :param x:
+        :param y:
+        :param z:
+        :return: value will be between loBound and hiBound
+        """
+        return self.raw_noise_3d(x, y, z)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+
+    def scaled_raw_noise_4d(self, loBound, hiBound, x, y, z, w):
+        """
+        scaled_raw_noise_4d() -- 4D Scaled Simplex raw noise
+        :param loBound:
+        :param hiBound:
+        :param x:
+        :param y:
+        :return: value will be between loBound and hiBound
+        """
+        return self.raw_noise_4d(x, y, z, w)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+
+    def raw_noise_2d(self, x, y, derivatives=False):
+        """
+        raw_noise_2d() -- 2D raw Simplex noise
+        :param x:
+        :param y:
+        :param derivatives: also return the analytic partial derivatives
+        :return: value will be between [-1, 1]; with derivatives, the tuple of floats (value, d/dx, d/dy)
+        """
+        if derivatives:
+            return _floats(self.raw_noise_2d_array(x, y, derivatives=True))
+        if self._hash_key is not None:
+            return float(self.raw_noise_2d_array(x, y))
+        perm, permMod12 = self._perm, self._permMod12
+        gx, gy = _grad3_columns[:2]
+        # Noise contributions from the three corners
+        n0, n1, n2 = 0.0, 0.0, 0.0
+
+        # Skew the input space to determine which simplex cell we're in
+        # Hairy factor for 2D
+        s = (x + y) * F2
+        i = fastfloor( x + s )
+        j = fastfloor( y + s )
+
+        t = (i + j)*G2
+        # Unskew the cell origin back to (x,y) space
+        X0 = i-t
+        Y0 = j-t
+        # The x,y distances from the cell origin
+        x0 = x-X0
+        y0 = y-Y0
+
+        # For the 2D case, the simplex shape is an equilateral triangle.
+        # Determine which simplex we are in.
+        # Offsets for second (middle) corner of simplex in (i,j) coords
+        if x0>y0:  # lower triangle, XY order: (0,0)->(1,0)->(1,1)
+            i1=1
+            j1=0
+        else:  # upper triangle, YX order: (0,0)->(0,1)->(1,1)
+            i1=0
+            j1=1
+
+        # A step of (1,0) in (i,j) means a step of (1-c,-c) in (x,y), and
+        # a step of (0,1) in (i,j) means a step of (-c,1-c) in (x,y), where
+        # c = (3-sqrt(3))/6
+        x1 = x0 - i1 + G2     # Offsets for middle corner in (x,y) unskewed coords
+        y1 = y0 - j1 + G2
+        x2 = x0 - 1.0 + 2.0*G2    # Offsets for last corner in (x,y) unskewed coords
+        y2 = y0 - 1.0 + 2.0*G2
+
+        # Work out the hashed gradient indices of the three simplex corners
+        ii = i & 255
+        jj = j & 255
+        gi0 = permMod12[ii+perm[jj]]
+        gi1 = permMod12[ii+i1+perm[jj+j1]]
+        gi2 = permMod12[ii+1+perm[jj+1]]
+
+        # Calculate the contribution from the three corners
+        t0 = 0.5 - x0*x0 - y0*y0
+        if t0 < 0:
+            n0 = 0.0
+        else:
+            t0 *= t0
+            # (x,y) of grad3 used for 2D gradient
+            n0 = t0 * t0 * (gx[gi0]*x0 + gy[gi0]*y0)
 
-    for i in range(octaves):
-        total += raw_noise_3d(x*frequency, y*frequency, z*frequency )*amplitude
-        frequency *= 2
-        maxAmplitude += amplitude
-        amplitude *= persistence
+        t1 = 0.5 - x1*x1 - y1*y1
+        if t1 < 0:
+            n1 = 0.0
+        else:
+            t1 *= t1
+            n1 = t1 * t1 * (gx[gi1]*x1 + gy[gi1]*y1)
 
-    return total/maxAmplitude
+        t2 = 0.5 - x2*x2 - y2*y2
+        if t2 < 0:
+            n2 = 0.0
+        else:
+            t2 *= t2
+            n2 = t2 * t2 * (gx[gi2]*x2 + gy[gi2]*y2)
+
+        # Add contributions from each corner to get the final noise value.
+        # The result is scaled to return values in the interval [-1,1].
+        return 70.0*(n0 + n1 + n2)
+
+    def raw_noise_3d(self, x, y, z, derivatives=False):
+        """
+        raw_noise_3d() -- 3D raw Simplex noise
+        :param x: float
+        :param y: float
+        :param z: float
+        :param derivatives: also return the analytic partial derivatives
+        :return: value will be between [-1, 1]; with derivatives, the tuple of floats (value, d/dx, d/dy, d/dz)
+        """
+        if derivatives:
+            return _floats(self.raw_noise_3d_array(x, y, z, derivatives=True))
+        if self._hash_key is not None:
+            return float(self.raw_noise_3d_array(x, y, z))
+        perm, permMod12 = self._perm, self._permMod12
+        gx, gy, gz = _grad3_columns
+        # Noise contributions from the four corners
+        n0, n1, n2, n3 = 0.0, 0.0, 0.0, 0.0
+
+        # Skew the input space to determine which simplex cell we're in
+        s = (x+y+z)*F3   # Very nice and simple skew factor for 3D
+        i = fastfloor(x+s)
+        j = fastfloor(y+s)
+        k = fastfloor(z+s)
+
+        t = (i+j+k)*G3
+        X0 = i-t         # Unskew the cell origin back to (x,y,z) space
+        Y0 = j-t
+        Z0 = k-t
+        x0 = x-X0        # The x,y,z distances from the cell origin
+        y0 = y-Y0
+        z0 = z-Z0
+
+        # For the 3D case, the simplex shape is a slightly irregular tetrahedron.
+        # Determine which simplex we are in.
+        # i1, j1, k1  Offsets for second corner of simplex in (i,j,k) coords
+        # i2, j2, k2  Offsets for third corner of simplex in (i,j,k) coords
+
+        if x0 >= y0:
+            if y0>=z0:
+                i1, j1, k1, i2, j2, k2 = 1, 0, 0, 1, 1, 0   # X Y Z order
+            elif x0>=z0:
+                i1, j1, k1, i2, j2, k2 = 1, 0, 0, 1, 0, 1   # X Z Y order
+            else:
+                i1, j1, k1, i2, j2, k2 = 0, 0, 1, 1, 0, 1   # Z X Y order
+        else:  # x0 < y0
+            if y0 < z0:
+                i1, j1, k1, i2, j2, k2 = 0, 0, 1, 0, 1, 1   # Z Y X order
+            elif x0 < z0:
+                i1, j1, k1, i2, j2, k2 = 0, 1, 0, 0, 1, 1   # Y Z X order
+            else:
+                i1, j1, k1, i2, j2, k2 = 0, 1, 0, 1, 1, 0   # Y X Z order
+
+        # A step of (1,0,0) in (i,j,k) means a step of (1-c,-c,-c) in (x,y,z),
+        # a step of (0,1,0) in (i,j,k) means a step of (-c,1-c,-c) in (x,y,z), and
+        # a step of (0,0,1) in (i,j,k) means a step of (-c,-c,1-c) in (x,y,z), where
+        # c = 1/6.
+        x1 = x0 - i1 + G3 # Offsets for second corner in (x,y,z) coords
+        y1 = y0 - j1 + G3
+        z1 = z0 - k1 + G3
+        x2 = x0 - i2 + 2.0*G3 # Offsets for third corner in (x,y,z) coords
+        y2 = y0 - j2 + 2.0*G3
+        z2 = z0 - k2 + 2.0*G3
+        x3 = x0 - 1.0 + 3.0*G3 # Offsets for last corner in (x,y,z) coords
+        y3 = y0 - 1.0 + 3.0*G3
+        z3 = z0 - 1.0 + 3.0*G3
+
+        # Work out the hashed gradient indices of the four simplex corners
+        ii = i & 255
+        jj = j & 255
+        kk = k & 255
+        gi0 = permMod12[ii+perm[jj+perm[kk]]]
+        gi1 = permMod12[ii+i1+perm[jj+j1+perm[kk+k1]]]
+        gi2 = permMod12[ii+i2+perm[jj+j2+perm[kk+k2]]]
+        gi3 = permMod12[ii+1+perm[jj+1+perm[kk+1]]]
+
+        # Calculate the contribution from the four corners
+        t0 = 0.6 - x0*x0 - y0*y0 - z0*z0
+        if t0 < 0:
+            n0 = 0.0
+        else:
+            t0 *= t0
+            n0 = t0 * t0 * (gx[gi0]*x0 + gy[gi0]*y0 + gz[gi0]*z0)
 
-def octave_noise_4d(octaves, persistence, scale, x, y, z, w):
-    """
-    octave_noise_4d() -- 4D multi-octave Simplex noise.
-    For each octave, a higher frequency/lower amplitude function will be added to the original.
-    The higher the persistence [0-1], the more of each succeeding octave will be added.
-    :param octaves:
-    :param persistence:
-    :param scale:
-    :param x:
-    :param y:
-    :param z:
-    :param w:
-    :return:
-    """
-    total = 0.0
-    frequency = scale
-    amplitude = 1.0
+        t1 = 0.6 - x1*x1 - y1*y1 - z1*z1;
+        if t1 < 0:
+            n1 = 0.0
+        else:
+            t1 *= t1
+            n1 = t1 * t1 * (gx[gi1]*x1 + gy[gi1]*y1 + gz[gi1]*z1)
 
-    # We have to keep track of the largest possible amplitude,
-    # because each octave adds more, and we need a value in [-1, 1].
-    maxAmplitude = 0.0
+        t2 = 0.6 - x2*x2 - y2*y2 - z2*z2;
+        if t2 < 0:
+            n2 = 0.0
+        else:
+            t2 *= t2
+            n2 = t2 * t2 * (gx[gi2]*x2 + gy[gi2]*y2 + gz[gi2]*z2)
 
-    for i in range(octaves):
-        total += SimplexNoise.raw_noise_4d(x*frequency, y*frequency, z*frequency, w*frequency)*amplitude
-        frequency *= 2
-        maxAmplitude += amplitude
-        amplitude *= persistence
+        t3 = 0.6 - x3*x3 - y3*y3 - z3*z3;
+        if t3 < 0:
+            n3 = 0.0
+        else:
+            t3 *= t3
+            n3 = t3 * t3 * (gx[gi3]*x3 + gy[gi3]*y3 + gz[gi3]*z3)
+
+        # Add contributions from each corner to get the final noise value.
+        # The result is scaled to stay just inside [-1,1]
+        return 32.0*(n0 + n1 + n2 + n3)
+
+    def raw_noise_4d(self, x, y, z, w, derivatives=False):
+        """
+        raw_noise_4d() -- 4D raw Simplex noise
+        :param x:
+        :param y:
+        :param z:
+        :param w:
+        :param derivatives: also return the analytic partial derivatives
+        :return: value will be between [-1, 1]; with derivatives, the tuple of floats (value, d/dx, d/dy, d/dz, d/dw)
+        """
+        if derivatives:
+            return _floats(self.raw_noise_4d_array(x, y, z, w, derivatives=True))
+        if self._hash_key is not None:
+            return float(self.raw_noise_4d_array(x, y, z, w))
+        perm, permMod32 = self._perm, self._permMod32
+        gx, gy, gz, gw = _grad4_columns
+        n0, n1, n2, n3, n4 = 0.0, 0.0, 0.0, 0.0, 0.0 # Noise contributions from the five corners
+
+        # Skew the (x,y,z,w) space to determine which cell of 24 simplices we're in
+        s = (x + y + z + w)*F4    # Factor for 4D skewing
+        i = fastfloor(x + s)
+        j = fastfloor(y + s)
+        k = fastfloor(z + s)
+        l = fastfloor(w + s)
+        t = (i + j + k + l)*G4    # Factor for 4D unskewing
+        X0 = i - t         # Unskew the cell origin back to (x,y,z,w) space
+        Y0 = j - t
+        Z0 = k - t
+        W0 = l - t
+        x0 = x - X0        # The x,y,z,w distances from the cell origin
+        y0 = y - Y0
+        z0 = z - Z0
+        w0 = w - W0
+
+        """
+        For the 4D case, the simplex is a 4D shape I won t even try to describe.
+        To find out which of the 24 possible simplices we're in, we need to
+        determine the magnitude ordering of x0, y0, z0 and w0.
+        The method below is a good way of finding the ordering of x,y,z,w and
+        then find the correct traversal order for the simplex we're in.
+        First, six pair-wise comparisons are performed between each possible pair
+        of the four coordinates, and the results are used to add up binary bits
+        for an integer index.
+        """
+        c = ((32 if x0 > y0 else 0) + (16 if x0 > z0 else 0) + (8 if y0 > z0 else 0) +
+             (4 if x0 > w0 else 0) + (2 if y0 > w0 else 0) + (1 if z0 > w0 else 0))
+
+        # i1, j1, k1, l1   The integer offsets for the second simplex corner
+        # i2, j2, k2, l2   The integer offsets for the third simplex corner
+        # i3, j3, k3, l3   The integer offsets for the fourth simplex corner
+        # simplex4_offsets[c] holds all twelve, precomputed from the simplex table.
+        # The fifth corner has all coordinate offsets = 1, so no need to look that up.
+        i1, j1, k1, l1, i2, j2, k2, l2, i3, j3, k3, l3 = simplex4_offsets[c]
+
+        x1 = x0 - i1 + G4 # Offsets for second corner in (x,y,z,w) coords
+        y1 = y0 - j1 + G4
+        z1 = z0 - k1 + G4
+        w1 = w0 - l1 + G4
+        x2 = x0 - i2 + 2.0*G4 # Offsets for third corner in (x,y,z,w) coords
+        y2 = y0 - j2 + 2.0*G4
+        z2 = z0 - k2 + 2.0*G4
+        w2 = w0 - l2 + 2.0*G4
+        x3 = x0 - i3 + 3.0*G4 # Offsets for fourth corner in (x,y,z,w) coords
+        y3 = y0 - j3 + 3.0*G4
+        z3 = z0 - k3 + 3.0*G4
+        w3 = w0 - l3 + 3.0*G4
+        x4 = x0 - 1.0 + 4.0*G4 # Offsets for last corner in (x,y,z,w) coords
+        y4 = y0 - 1.0 + 4.0*G4
+        z4 = z0 - 1.0 + 4.0*G4
+        w4 = w0 - 1.0 + 4.0*G4
+
+        # Work out the hashed gradient indices of the five simplex corners
+        ii = i & 255
+        jj = j & 255
+        kk = k & 255
+        ll = l & 255
+        gi0 = permMod32[ii+perm[jj+perm[kk+perm[ll]]]]
+        gi1 = permMod32[ii+i1+perm[jj+j1+perm[kk+k1+perm[ll+l1]]]]
+        gi2 = permMod32[ii+i2+perm[jj+j2+perm[kk+k2+perm[ll+l2]]]]
+        gi3 = permMod32[ii+i3+perm[jj+j3+perm[kk+k3+perm[ll+l3]]]]
+        gi4 = permMod32[ii+1+perm[jj+1+perm[kk+1+perm[ll+1]]]]
+
+        # Calculate the contribution from the five corners
+        t0 = 0.6 - x0*x0 - y0*y0 - z0*z0 - w0*w0
+        if t0 < 0:
+            n0 = 0.0
+        else:
+            t0 *= t0
+            n0 = t0 * t0 * (gx[gi0]*x0 + gy[gi0]*y0 + gz[gi0]*z0 + gw[gi0]*w0)
 
-    return total/maxAmplitude
+        t1 = 0.6 - x1*x1 - y1*y1 - z1*z1 - w1*w1
+        if t1 < 0:
+            n1 = 0.0
+        else:
+            t1 *= t1
+            n1 = t1 * t1 * (gx[gi1]*x1 + gy[gi1]*y1 + gz[gi1]*z1 + gw[gi1]*w1)
 
-def scaled_octave_noise_2d(octaves, persistence, scale, loBound, hiBound, x, y):
-    """
-    scaled_octave_noise_2d() -- 2D Scaled Multi-octave Simplex noise.
-    :param octaves:
-    :param persistence:
-    :param scale:
-    :param loBound:
-    :param hiBound:
-    :param x:
-    :param y:
-    :return: value between loBound and hiBound
-    """
-    return octave_noise_2d(octaves, persistence, scale, x, y)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+        t2 = 0.6 - x2*x2 - y2*y2 - z2*z2 - w2*w2
+        if t2 < 0:
+            n2 = 0.0
+        else:
+            t2 *= t2
+            n2 = t2 * t2 * (gx[gi2]*x2 + gy[gi2]*y2 + gz[gi2]*z2 + gw[gi2]*w2)
 
-def scaled_octave_noise_3d(octaves, persistence, scale, loBound, hiBound, x, y, z):
-    """
-    scaled_octave_noise_3d() -- 3D Scaled Multi-octave Simplex noise.
-    :param octaves:
-    :param persistence:
-    :param scale:
-    :param loBound:
-    :param hiBound:
-    :param x:
-    :param y:
-    :param z:
-    :return: value between loBound and hiBound
-    """
-    return octave_noise_3d(octaves, persistence, scale, x, y, z)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+        t3 = 0.6 - x3*x3 - y3*y3 - z3*z3 - w3*w3
+        if t3 < 0:
+            n3 = 0.0
+        else:
+            t3 *= t3
+            n3 = t3 * t3 * (gx[gi3]*x3 + gy[gi3]*y3 + gz[gi3]*z3 + gw[gi3]*w3)
 
-def scaled_octave_noise_4d(octaves, persistence, scale, loBound, hiBound, x, y, z, w):
+        t4 = 0.6 - x4*x4 - y4*y4 - z4*z4 - w4*w4
+        if t4 < 0:
+            n4 = 0.0
+        else:
+            t4 *= t4
+            n4 = t4 * t4 * (gx[gi4]*x4 + gy[gi4]*y4 + gz[gi4]*z4 + gw[gi4]*w4)
+
+        # Sum up and scale the result to cover the range [-1,1]
+        return 27.0*(n0 + n1 + n2 + n3 + n4)
+
+    def raw_noise_2d_array(self, xs, ys, dtype=None, out=None, derivatives=False):
+        """
+        raw_noise_2d_array() -- 2D raw Simplex noise over whole NumPy arrays
+        Same algorithm as raw_noise_2d(), but every step (skew, simplex selection,
+        hashed gradient lookup, falloff) is a whole-array operation.  The result
+        matches raw_noise_2d() bit-for-bit at every sample.
+        :param xs: array_like of float
+        :param ys: array_like of float, broadcastable against xs
+        :param dtype: float64 (default) or float32, see "Precision" in the class docstring
+        :param out: optional ndarray of the broadcast shape to write the result into,
+                    e.g. a np.memmap; its dtype is used when dtype is not given
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy) of arrays
+        :return: ndarray with the broadcast shape of xs and ys, values in [-1, 1]
+        """
+        coords = _coordinates((xs, ys), dtype, out)
+        return _noise_2d_array(*coords, corner_hash=self._hash_2d, out=out, derivatives=derivatives)
+
+    def raw_noise_3d_array(self, xs, ys, zs, dtype=None, out=None, derivatives=False):
+        """
+        raw_noise_3d_array() -- 3D raw Simplex noise over whole NumPy arrays
+        Array counterpart of raw_noise_3d(); matches it bit-for-bit at every sample.
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float; xs, ys and zs must broadcast together
+        :param dtype: float64 (default) or float32, see "Precision" in the class docstring
+        :param out: optional ndarray of the broadcast shape to write the result into,
+                    e.g. a np.memmap; its dtype is used when dtype is not given
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy, d/dz) of arrays
+        :return: ndarray with the broadcast shape of the inputs, values in [-1, 1]
+        """
+        coords = _coordinates((xs, ys, zs), dtype, out)
+        return _noise_3d_array(*coords, corner_hash=self._hash_3d, out=out, derivatives=derivatives)
+
+    def raw_noise_4d_array(self, xs, ys, zs, ws, dtype=None, out=None, derivatives=False):
+        """
+        raw_noise_4d_array() -- 4D raw Simplex noise over whole NumPy arrays
+        Array counterpart of raw_noise_4d(); matches it bit-for-bit at every sample.
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param ws: array_like of float; xs, ys, zs and ws must broadcast together
+        :param dtype: float64 (default) or float32, see "Precision" in the class docstring
+        :param out: optional ndarray of the broadcast shape to write the result into,
+                    e.g. a np.memmap; its dtype is used when dtype is not given
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy, d/dz, d/dw) of arrays
+        :return: ndarray with the broadcast shape of the inputs, values in [-1, 1]
+        """
+        coords = _coordinates((xs, ys, zs, ws), dtype, out)
+        return _noise_4d_array(*coords, corner_hash=self._hash_4d, out=out, derivatives=derivatives)
+
+    def octave_noise_2d_array(self, octaves, persistence, scale, xs, ys, dtype=None, out=None,
+                              derivatives=False, footprint=None):
+        """
+        octave_noise_2d_array() -- 2D multi-octave Simplex noise over whole NumPy arrays
+        Fused version of octave_noise_2d(): the points are processed in cache-sized
+        blocks, and all octaves of a block are summed before moving to the next one.
+        Matches octave_noise_2d() bit-for-bit at every sample.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param xs: array_like of float
+        :param ys: array_like of float, broadcastable against xs
+        :param dtype: float64 (default) or float32, see "Precision" in the class docstring
+        :param out: optional ndarray of the broadcast shape to write the result into,
+                    e.g. a np.memmap; its dtype is used when dtype is not given
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy) of arrays
+        :param footprint: optional sample spacing for level of detail, a scalar or an array
+                          broadcastable to the coordinates, see "Level of detail" in the class docstring
+        :return: ndarray with the broadcast shape of xs and ys, values in [-1, 1]
+        """
+        return _octave_array(_noise_2d_array, self._hash_2d, octaves, persistence, scale, (xs, ys),
+                             dtype, out, derivatives, footprint=footprint)
+
+    def octave_noise_3d_array(self, octaves, persistence, scale, xs, ys, zs, dtype=None, out=None,
+                              derivatives=False, footprint=None):
+        """
+        octave_noise_3d_array() -- 3D multi-octave Simplex noise over whole NumPy arrays
+        Fused counterpart of octave_noise_3d(), see octave_noise_2d_array().
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float; xs, ys and zs must broadcast together
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy, d/dz) of arrays
+        :param footprint: optional sample spacing for level of detail, a scalar or an array
+                          broadcastable to the coordinates, see "Level of detail" in the class docstring
+        :return: ndarray with the broadcast shape of the inputs, values in [-1, 1]
+        """
+        return _octave_array(_noise_3d_array, self._hash_3d, octaves, persistence, scale, (xs, ys, zs),
+                             dtype, out, derivatives, footprint=footprint)
+
+    def octave_noise_4d_array(self, octaves, persistence, scale, xs, ys, zs, ws, dtype=None, out=None,
+                              derivatives=False, footprint=None):
+        """
+        octave_noise_4d_array() -- 4D multi-octave Simplex noise over whole NumPy arrays
+        Fused counterpart of octave_noise_4d(), see octave_noise_2d_array().
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param ws: array_like of float; xs, ys, zs and ws must broadcast together
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy, d/dz, d/dw) of arrays
+        :param footprint: optional sample spacing for level of detail, a scalar or an array
+                          broadcastable to the coordinates, see "Level of detail" in the class docstring
+        :return: ndarray with the broadcast shape of the inputs, values in [-1, 1]
+        """
+        return _octave_array(_noise_4d_array, self._hash_4d, octaves, persistence, scale, (xs, ys, zs, ws),
+                             dtype, out, derivatives, footprint=footprint)
+
+    def scaled_octave_noise_2d_array(self, octaves, persistence, scale, loBound, hiBound, xs, ys,
+                                 dtype=None, out=None, footprint=None):
+        """
+        scaled_octave_noise_2d_array() -- 2D Scaled Multi-octave Simplex noise over whole arrays
+        The lo/hi remapping is applied in place on the result (or on out), so no
+        second full-size array is allocated.  Matches scaled_octave_noise_2d() bit-for-bit.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :param footprint: optional sample spacing for level of detail, see octave_noise_2d_array()
+        :return: ndarray with the broadcast shape of the inputs, values between loBound and hiBound
+        """
+        values = self.octave_noise_2d_array(octaves, persistence, scale, xs, ys, dtype, out,
+                                             footprint=footprint)
+        return _rescale(values, loBound, hiBound)
+
+    def scaled_octave_noise_3d_array(self, octaves, persistence, scale, loBound, hiBound, xs, ys, zs,
+                                 dtype=None, out=None, footprint=None):
+        """
+        scaled_octave_noise_3d_array() -- 3D Scaled Multi-octave Simplex noise over whole arrays
+        The lo/hi remapping is applied in place on the result (or on out), so no
+        second full-size array is allocated.  Matches scaled_octave_noise_3d() bit-for-bit.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :param footprint: optional sample spacing for level of detail, see octave_noise_3d_array()
+        :return: ndarray with the broadcast shape of the inputs, values between loBound and hiBound
+        """
+        values = self.octave_noise_3d_array(octaves, persistence, scale, xs, ys, zs, dtype, out,
+                                             footprint=footprint)
+        return _rescale(values, loBound, hiBound)
+
+    def scaled_octave_noise_4d_array(self, octaves, persistence, scale, loBound, hiBound, xs, ys, zs, ws,
+                                 dtype=None, out=None, footprint=None):
+        """
+        scaled_octave_noise_4d_array() -- 4D Scaled Multi-octave Simplex noise over whole arrays
+        The lo/hi remapping is applied in place on the result (or on out), so no
+        second full-size array is allocated.  Matches scaled_octave_noise_4d() bit-for-bit.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param ws: array_like of float
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :param footprint: optional sample spacing for level of detail, see octave_noise_4d_array()
+        :return: ndarray with the broadcast shape of the inputs, values between loBound and hiBound
+        """
+        values = self.octave_noise_4d_array(octaves, persistence, scale, xs, ys, zs, ws, dtype, out,
+                                             footprint=footprint)
+        return _rescale(values, loBound, hiBound)
+
+    def scaled_raw_noise_2d_array(self, loBound, hiBound, xs, ys, dtype=None, out=None):
+        """
+        scaled_raw_noise_2d_array() -- 2D Scaled Simplex raw noise over whole arrays
+        Remaps in place like scaled_octave_noise_2d_array(); matches scaled_raw_noise_2d() bit-for-bit.
+        :param loBound:
+        :param hiBound:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of the inputs, values between loBound and hiBound
+        """
+        return _rescale(self.raw_noise_2d_array(xs, ys, dtype, out), loBound, hiBound)
+
+    def scaled_raw_noise_3d_array(self, loBound, hiBound, xs, ys, zs, dtype=None, out=None):
+        """
+        scaled_raw_noise_3d_array() -- 3D Scaled Simplex raw noise over whole arrays
+        Remaps in place like scaled_octave_noise_3d_array(); matches scaled_raw_noise_3d() bit-for-bit.
+        :param loBound:
+        :param hiBound:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of the inputs, values between loBound and hiBound
+        """
+        return _rescale(self.raw_noise_3d_array(xs, ys, zs, dtype, out), loBound, hiBound)
+
+    def scaled_raw_noise_4d_array(self, loBound, hiBound, xs, ys, zs, ws, dtype=None, out=None):
+        """
+        scaled_raw_noise_4d_array() -- 4D Scaled Simplex raw noise over whole arrays
+        Remaps in place like scaled_octave_noise_4d_array(); matches scaled_raw_noise_4d() bit-for-bit.
+        :param loBound:
+        :param hiBound:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param ws: array_like of float
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of the inputs, values between loBound and hiBound
+        """
+        return _rescale(self.raw_noise_4d_array(xs, ys, zs, ws, dtype, out), loBound, hiBound)
+
+    def octave_mask_2d_array(self, octaves, persistence, scale, threshold, xs, ys, dtype=None):
+        """
+        octave_mask_2d_array() -- where 2D multi-octave noise is above a threshold.
+        Same answer as octave_noise_2d_array(...) > threshold, but each point stops
+        evaluating octaves as soon as the octaves still to come, whose amplitudes
+        sum to at most what is left of maxAmplitude, can no longer carry it across
+        the threshold.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param threshold: value in [-1, 1] to compare against
+        :param xs: array_like of float
+        :param ys: array_like of float, broadcastable against xs
+        :param dtype: float64 (default) or float32 for the noise arithmetic
+        :return: (mask, evaluated): bool ndarray with the broadcast shape of the inputs,
+                 and an ndarray of the same shape with the number of octaves
+                 evaluated at each point
+        """
+        return _octave_mask(_noise_2d_array, self._hash_2d, octaves, persistence, scale, threshold, (xs, ys), dtype)
+
+    def octave_mask_3d_array(self, octaves, persistence, scale, threshold, xs, ys, zs, dtype=None):
+        """
+        octave_mask_3d_array() -- where 3D multi-octave noise is above a threshold,
+        see octave_mask_2d_array().
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param threshold: value in [-1, 1] to compare against
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float; xs, ys and zs must broadcast together
+        :param dtype: float64 (default) or float32
+        :return: (mask, evaluated), see octave_mask_2d_array()
+        """
+        return _octave_mask(_noise_3d_array, self._hash_3d, octaves, persistence, scale, threshold,
+                            (xs, ys, zs), dtype)
+
+    def octave_mask_4d_array(self, octaves, persistence, scale, threshold, xs, ys, zs, ws, dtype=None):
+        """
+        octave_mask_4d_array() -- where 4D multi-octave noise is above a threshold,
+        see octave_mask_2d_array().
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param threshold: value in [-1, 1] to compare against
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float
+        :param ws: array_like of float; xs, ys, zs and ws must broadcast together
+        :param dtype: float64 (default) or float32
+        :return: (mask, evaluated), see octave_mask_2d_array()
+        """
+        return _octave_mask(_noise_4d_array, self._hash_4d, octaves, persistence, scale, threshold,
+                            (xs, ys, zs, ws), dtype)
+
+    def noise_grid_2d(self, origin, step, shape, octaves, persistence, scale, start=None,
+                      dtype=None, out=None, derivatives=False, footprint=None):
+        """
+        noise_grid_2d() -- 2D multi-octave Simplex noise sampled on a regular grid.
+        Element [a, b] of the result equals
+            octave_noise_2d(octaves, persistence, scale, origin[0] + a*step[0], origin[1] + b*step[1])
+        bit-for-bit.  The coordinates of each axis are computed once and broadcast
+        block by block, so no meshgrid of the full grid is built.
+        :param origin: (x, y) of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: (nx, ny) number of samples along each axis
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param start: optional (a0, b0) index of the first sample, so that element [a, b]
+                      is taken at origin + (start + (a, b))*step.  Tiles of a larger grid
+                      computed this way are identical to the matching slices of the whole.
+        :param dtype: float64 (default) or float32, see "Precision" in the class docstring
+        :param out: optional ndarray of the given shape to write the result into,
+                    e.g. a np.memmap; its dtype is used when dtype is not given
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy) of arrays
+        :param footprint: optional sample spacing for level of detail, a scalar or an array
+                          broadcastable to shape; step gives every octave the grid can resolve
+        :return: ndarray of the given shape, values in [-1, 1]
+        """
+        return _octave_grid(_noise_2d_array, self._hash_2d, origin, step, shape, octaves, persistence, scale,
+                            start, dtype, out, derivatives, footprint=footprint)
+
+    def noise_grid_3d(self, origin, step, shape, octaves, persistence, scale, start=None,
+                      dtype=None, out=None, derivatives=False, footprint=None):
+        """
+        noise_grid_3d() -- 3D multi-octave Simplex noise sampled on a regular grid.
+        Element [a, b, c] equals octave_noise_3d() at origin + (a, b, c)*step; see noise_grid_2d().
+        :param origin: (x, y, z) of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: (nx, ny, nz) number of samples along each axis
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param start: optional index of the first sample along each axis, as for noise_grid_2d()
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the given shape to write the result into
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy, d/dz) of arrays
+        :param footprint: optional sample spacing for level of detail, a scalar or an array
+                          broadcastable to shape; step gives every octave the grid can resolve
+        :return: ndarray of the given shape, values in [-1, 1]
+        """
+        return _octave_grid(_noise_3d_array, self._hash_3d, origin, step, shape, octaves, persistence, scale,
+                            start, dtype, out, derivatives, footprint=footprint)
+
+    def noise_grid_4d(self, origin, step, shape, octaves, persistence, scale, start=None,
+                      dtype=None, out=None, derivatives=False, footprint=None):
+        """
+        noise_grid_4d() -- 4D multi-octave Simplex noise sampled on a regular grid.
+        Element [a, b, c, d] equals octave_noise_4d() at origin + (a, b, c, d)*step; see noise_grid_2d().
+        :param origin: (x, y, z, w) of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: (nx, ny, nz, nw) number of samples along each axis
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param start: optional index of the first sample along each axis, as for noise_grid_2d()
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the given shape to write the result into
+        :param derivatives: also return the analytic partial derivatives; the result is then
+                            the tuple (values, d/dx, d/dy, d/dz, d/dw) of arrays
+        :param footprint: optional sample spacing for level of detail, a scalar or an array
+                          broadcastable to shape; step gives every octave the grid can resolve
+        :return: ndarray of the given shape, values in [-1, 1]
+        """
+        return _octave_grid(_noise_4d_array, self._hash_4d, origin, step, shape, octaves, persistence, scale,
+                            start, dtype, out, derivatives, footprint=footprint)
+
+    def raw_noise_2d_periodic(self, x, y, px, py):
+        """
+        raw_noise_2d_periodic() -- 2D raw Simplex noise that repeats every px along x and py along y.
+        The 2D simplex lattice has no rectangular periods, so this is the z=0 slice of
+        raw_noise_3d_periodic(): it costs a 3D evaluation and looks like 3D noise, not
+        like raw_noise_2d().  Evaluated through the array kernel; use
+        raw_noise_2d_periodic_array() for many points.
+        :param x:
+        :param y:
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :return: value will be between [-1, 1]
+        """
+        return float(self.raw_noise_2d_periodic_array(x, y, px, py))
+
+    def raw_noise_3d_periodic(self, x, y, z, px, py, pz):
+        """
+        raw_noise_3d_periodic() -- 3D raw Simplex noise that repeats every px, py and pz.
+        See raw_noise_3d_periodic_array(); use that for many points.
+        :param x:
+        :param y:
+        :param z:
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :param pz: period along z, or None
+        :return: value will be between [-1, 1]
+        """
+        return float(self.raw_noise_3d_periodic_array(x, y, z, px, py, pz))
+
+    def octave_noise_2d_periodic(self, octaves, persistence, scale, x, y, px, py):
+        """
+        octave_noise_2d_periodic() -- 2D multi-octave Simplex noise that repeats every px and py.
+        See octave_noise_2d_periodic_array(); use that for many points.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param x:
+        :param y:
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :return: value in [-1, 1]
+        """
+        return float(self.octave_noise_2d_periodic_array(octaves, persistence, scale, x, y, px, py))
+
+    def octave_noise_3d_periodic(self, octaves, persistence, scale, x, y, z, px, py, pz):
+        """
+        octave_noise_3d_periodic() -- 3D multi-octave Simplex noise that repeats every px, py and pz.
+        See octave_noise_3d_periodic_array(); use that for many points.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param x:
+        :param y:
+        :param z:
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :param pz: period along z, or None
+        :return: value in [-1, 1]
+        """
+        return float(self.octave_noise_3d_periodic_array(octaves, persistence, scale, x, y, z, px, py, pz))
+
+    def raw_noise_2d_periodic_array(self, xs, ys, px, py, dtype=None, out=None):
+        """
+        raw_noise_2d_periodic_array() -- raw_noise_2d_periodic() over whole NumPy arrays
+        :param xs: array_like of float
+        :param ys: array_like of float, broadcastable against xs
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of xs and ys, values in [-1, 1]
+        """
+        return self.raw_noise_3d_periodic_array(xs, ys, 0.0, px, py, None, dtype, out)
+
+    def raw_noise_3d_periodic_array(self, xs, ys, zs, px, py, pz, dtype=None, out=None):
+        """
+        raw_noise_3d_periodic_array() -- 3D raw Simplex noise, periodic along each axis
+        The gradient hash of every lattice point is taken at its image in the base
+        period [0, px) x [0, py) x [0, pz), so the noise at (x + px, y, z) equals the
+        noise at (x, y, z) and a texture sampled over one period tiles seamlessly.
+        The 3D simplex lattice only repeats every 3 units along an axis: a period
+        that is a multiple of 3 is used as is, any other period p is met by
+        stretching that axis by a factor 3*round(p/3)/p (3/p below 4.5), which is
+        within 5% of 1 for periods of 30 and more.  Coordinates are reduced into
+        [0, p) before they are scaled, which is exact, so points exactly a period
+        apart (such as x and x + p when both are exact) give identical values.
+        Points only nearly a period apart can still differ by a few 1e-3 where
+        they sit on a simplex face, across which the 3D kernel jumps (see
+        "Precision" in the class docstring).
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float; xs, ys and zs must broadcast together
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :param pz: period along z, or None; e.g. only pz for a looping animation of 2D noise
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of the inputs, values in [-1, 1]
+        """
+        factors, cells = _lattice_periods((px, py, pz))
+        coords = _wrap_coordinates(_coordinates((xs, ys, zs), dtype, out), (px, py, pz))
+        coords = [c*f for c, f in zip(coords, factors)]
+        return _noise_3d_array(*coords, corner_hash=_periodic_hash(self._hash_3d, cells), out=out)
+
+    def octave_noise_2d_periodic_array(self, octaves, persistence, scale, xs, ys, px, py,
+                                       dtype=None, out=None):
+        """
+        octave_noise_2d_periodic_array() -- 2D multi-octave Simplex noise, periodic in x and y
+        The z=0 slice of octave_noise_3d_periodic_array(), see raw_noise_2d_periodic().
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param xs: array_like of float
+        :param ys: array_like of float, broadcastable against xs
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of xs and ys, values in [-1, 1]
+        """
+        return _octave_array(_noise_3d_array, self._hash_3d, octaves, persistence, scale, (xs, ys, 0.0),
+                             dtype, out, periods=(px, py, None))
+
+    def octave_noise_3d_periodic_array(self, octaves, persistence, scale, xs, ys, zs, px, py, pz,
+                                       dtype=None, out=None):
+        """
+        octave_noise_3d_periodic_array() -- 3D multi-octave Simplex noise, periodic along each axis
+        The periods are in input coordinates: octave n samples its noise at
+        frequency scale*2**n, so its lattice wraps at period*scale*2**n, fitted to
+        the lattice as described for raw_noise_3d_periodic_array().  Every octave,
+        and so the sum, repeats with the same period.
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param xs: array_like of float
+        :param ys: array_like of float
+        :param zs: array_like of float; xs, ys and zs must broadcast together
+        :param px: period along x, or None for no repetition along x
+        :param py: period along y, or None
+        :param pz: period along z, or None
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the broadcast shape to write the result into
+        :return: ndarray with the broadcast shape of the inputs, values in [-1, 1]
+        """
+        return _octave_array(_noise_3d_array, self._hash_3d, octaves, persistence, scale, (xs, ys, zs),
+                             dtype, out, periods=(px, py, pz))
+
+    def noise_grid_2d_periodic(self, origin, step, shape, period, octaves, persistence, scale,
+                               start=None, dtype=None, out=None):
+        """
+        noise_grid_2d_periodic() -- octave_noise_2d_periodic() sampled on a regular grid.
+        With step = period/shape the grid covers exactly one period and tiles seamlessly:
+        when a period is a whole number of steps, sample indices are wrapped too,
+        so samples one period apart are computed from identical coordinates.
+        :param origin: (x, y) of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: (nx, ny) number of samples along each axis
+        :param period: period along each axis, a scalar or (px, py); None for no repetition
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param start: optional index of the first sample along each axis, as for noise_grid_2d()
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the given shape to write the result into
+        :return: ndarray of the given shape, values in [-1, 1]
+        """
+        origin = tuple(np.broadcast_to(np.asarray(origin, dtype=np.float64), (2,))) + (0.0,)
+        step = tuple(np.broadcast_to(np.asarray(step, dtype=np.float64), (2,))) + (1.0,)
+        shape = tuple(int(n) for n in shape) + (1,)
+        start = None if start is None else [int(a) for a in start] + [0]
+        periods = _periods(period, 2) + (None,)
+        values = _octave_grid(_noise_3d_array, self._hash_3d, origin, step, shape, octaves, persistence, scale,
+                              start, dtype, None if out is None else out[..., np.newaxis], periods=periods)
+        return values[..., 0] if out is None else out
+
+    def noise_grid_3d_periodic(self, origin, step, shape, period, octaves, persistence, scale,
+                               start=None, dtype=None, out=None):
+        """
+        noise_grid_3d_periodic() -- octave_noise_3d_periodic() sampled on a regular grid.
+        With step = period/shape the grid covers exactly one period and tiles seamlessly,
+        see noise_grid_2d_periodic().
+        :param origin: (x, y, z) of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: (nx, ny, nz) number of samples along each axis
+        :param period: period along each axis, a scalar or (px, py, pz); None for no repetition
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param start: optional index of the first sample along each axis, as for noise_grid_2d()
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the given shape to write the result into
+        :return: ndarray of the given shape, values in [-1, 1]
+        """
+        return _octave_grid(_noise_3d_array, self._hash_3d, origin, step, shape, octaves, persistence, scale,
+                            start, dtype, out, periods=_periods(period, 3))
+
+    def _hash_2d(self, i, j):
+        """
+        gradient index of the 2D lattice point (i, j), as computed in raw_noise_2d()
+        :param i: ndarray of int
+        :param j: ndarray of int
+        :return: ndarray of int in [0, 12)
+        """
+        if self._hash_key is not None:
+            return _integer_hash(self._hash_key, 12, i, j)
+        p = self._perm_array
+        return self._permMod12_array[(i & 255) + p[j & 255]]
+
+    def _hash_3d(self, i, j, k):
+        """
+        gradient index of the 3D lattice point (i, j, k), as computed in raw_noise_3d()
+        :return: ndarray of int in [0, 12)
+        """
+        if self._hash_key is not None:
+            return _integer_hash(self._hash_key, 12, i, j, k)
+        p = self._perm_array
+        return self._permMod12_array[(i & 255) + p[(j & 255) + p[k & 255]]]
+
+    def _hash_4d(self, i, j, k, l):
+        """
+        gradient index of the 4D lattice point (i, j, k, l), as computed in raw_noise_4d()
+        :return: ndarray of int in [0, 32)
+        """
+        if self._hash_key is not None:
+            return _integer_hash(self._hash_key, 32, i, j, k, l)
+        p = self._perm_array
+        return self._permMod32_array[(i & 255) + p[(j & 255) + p[(k & 255) + p[l & 255]]]]
+
+
+# Odd 64-bit multipliers of the lattice coordinates in _integer_hash(), one per
+# axis, and the multiplier of its finaliser (from SplitMix64)
+_HASH_MULTIPLIERS = tuple(np.uint64(m) for m in (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F,
+                                                 0x165667B19E3779F9, 0xD6E8FEB86659FD93))
+_HASH_FINAL = np.uint64(0xBF58476D1CE4E5B9)
+
+
+def _hash_key(seed):
     """
-    scaled_octave_noise_4d() -- 4D Scaled Multi-octave Simplex noise.
-    :param octaves:
-    :param persistence:
-    :param scale:
-    :param loBound:
-    :param hiBound:
-    :param x:
-    :param y:
-    :param z:
-    :param w:
-    :return: value will be between loBound and hiBound
+    :param seed: seed of a SimplexNoise instance
+    :return: 64-bit key of its lattice="hash" gradients, the same in every process
     """
-    return octave_noise_4d(octaves, persistence, scale, x, y, z, w)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+    return np.uint64(0 if seed is None else Random(seed).getrandbits(64))
 
-def scaled_raw_noise_2d(loBound, hiBound, x, y):
-    """
-    scaled_raw_noise_2d() -- 2D Scaled Simplex raw noise
-    :param loBound:
-    :param hiBound:
-    :param x:
-    :param y:
-    :return: value will be between loBound and hiBound
-    """
-    return raw_noise_2d(x, y)*(hiBound - loBound)/2 + (hiBound + loBound)/2
 
-def scaled_raw_noise_3d(loBound, hiBound, x, y, z):
+def _integer_hash(key, modulus, *coords):
     """
-    scaled_raw_noise_3d() -- 3D Scaled Simplex raw noise
-    :param loBound:
-    :param hiBound:
-    :param x:
-    :param y:
-    :param z:
-    :return: value will be between loBound and hiBound
+    gradient index of lattice points for lattice="hash": the coordinates are
+    mixed as key + sum(c*multiplier) modulo 2**64, then an xorshift-multiply
+    round spreads every input bit over the high half, whose product with the
+    modulus picks the gradient (a multiply-shift instead of a division)
+    :param key: 64-bit key from _hash_key()
+    :param modulus: number of gradients, 12 or 32
+    :param coords: ndarrays of int, one per axis
+    :return: ndarray of gradient indices in [0, modulus)
     """
-    return raw_noise_3d(x, y, z)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+    # uint64 arithmetic wraps on purpose; 0-d inputs would otherwise warn about it
+    with np.errstate(over="ignore"):
+        h = key
+        for c, m in zip(coords, _HASH_MULTIPLIERS):
+            h = h + np.asarray(c, dtype=np.int64).view(np.uint64)*m
+        h ^= h >> np.uint64(32)
+        h *= _HASH_FINAL
+    return ((h >> np.uint64(32))*np.uint64(modulus)) >> np.uint64(32)
+
 
-def scaled_raw_noise_4d(loBound, hiBound, x, y, z, w):
+def _noise_2d_array(x, y, corner_hash, out=None, derivatives=False):
     """
-    scaled_raw_noise_4d() -- 4D Scaled Simplex raw noise
-    :param loBound:
-    :param hiBound:
-    :param x:
-    :param y:
-    :return: value will be between loBound and hiBound
+    2D simplex kernel shared by the array entry points
+    :param x: ndarray of float
+    :param y: ndarray of float, broadcastable against x
+    :param corner_hash: corner_hash(i, j) gives the gradient index of lattice point (i, j)
+    :param out: optional ndarray for the result
+    :param derivatives: also return the analytic partial derivatives
+    :return: ndarray of values in [-1, 1], or (values, d/dx, d/dy) with derivatives.
+             Arithmetic is done in the dtype of x and y (float32 or float64), with
+             every temporary in that dtype.
     """
-    return raw_noise_4d(x, y, z, w)*(hiBound - loBound)/2 + (hiBound + loBound)/2
+    return _shade(_corners_2d(x, y), corner_hash, *_kernel_shading[2], out=out,
+                  derivatives=derivatives)
 
 
-def raw_noise_2d(x, y):
+def _corners_2d(x, y):
     """
-    raw_noise_2d() -- 2D raw Simplex noise
-    :param x:
-    :param y:
-    :return: value will be between [-1, 1]
+    geometry of the 2D kernel, which does not depend on the permutation table
+    :param x: ndarray of float
+    :param y: ndarray of float, broadcastable against x
+    :return: list of (lattice point, offsets, falloff) for the three simplex corners, see _shade()
     """
-    # Noise contributions from the three corners
-    n0, n1, n2 = 0.0, 0.0, 0.0
-
     # Skew the input space to determine which simplex cell we're in
-    F2 = 0.5*(sqrt(3.0) - 1.0)
-    # Hairy factor for 2D
-    s = (x + y) * F2
-    i = fastfloor( x + s )
-    j = fastfloor( y + s )
-
-    G2 = (3.0 - sqrt(3.0))/6.0
-    t = (i + j)*G2
-    # Unskew the cell origin back to (x,y) space
-    X0 = i-t
-    Y0 = j-t
-    # The x,y distances from the cell origin
-    x0 = x-X0
-    y0 = y-Y0
-
-    # For the 2D case, the simplex shape is an equilateral triangle.
-    # Determine which simplex we are in.
-    # Offsets for second (middle) corner of simplex in (i,j) coords
-    if x0>y0:  # lower triangle, XY order: (0,0)->(1,0)->(1,1)
-        i1=1
-        j1=0
-    else:  # upper triangle, YX order: (0,0)->(0,1)->(1,1)
-        i1=0
-        j1=1
-
-    # A step of (1,0) in (i,j) means a step of (1-c,-c) in (x,y), and
-    # a step of (0,1) in (i,j) means a step of (-c,1-c) in (x,y), where
-    # c = (3-sqrt(3))/6
-    x1 = x0 - i1 + G2     # Offsets for middle corner in (x,y) unskewed coords
+    s = (x + y)*F2
+    i = _fastfloor_array(x + s)
+    j = _fastfloor_array(y + s)
+
+    fi = i.astype(x.dtype)
+    fj = j.astype(x.dtype)
+    t = (fi + fj)*G2
+    # The x,y distances from the unskewed cell origin
+    x0 = x - (fi - t)
+    y0 = y - (fj - t)
+
+    # Offsets for the middle corner: (1,0) in the lower triangle, (0,1) in the upper
+    i1 = (x0 > y0).astype(np.int8)
+    j1 = 1 - i1
+
+    x1 = x0 - i1 + G2
     y1 = y0 - j1 + G2
-    x2 = x0 - 1.0 + 2.0*G2    # Offsets for last corner in (x,y) unskewed coords
+    x2 = x0 - 1.0 + 2.0*G2
     y2 = y0 - 1.0 + 2.0*G2
 
-    # Work out the hashed gradient indices of the three simplex corners
-    ii = i & 255
-    jj = j & 255
-    gi0 = perm[ii+perm[jj]] % 12
-    gi1 = perm[ii+i1+perm[jj+j1]] % 12
-    gi2 = perm[ii+1+perm[jj+1]] % 12
-
-    # Calculate the contribution from the three corners
-    t0 = 0.5 - x0*x0 - y0*y0
-    if t0 < 0:
-        n0 = 0.0
-    else:
-        t0 *= t0
-        # (x,y) of grad3 used for 2D gradient
-        n0 = t0 * t0 * dot2(grad3[gi0][0], grad3[gi0][1], x0, y0)
+    return [((i, j), (x0, y0), 0.5 - x0*x0 - y0*y0),
+            ((i + i1, j + j1), (x1, y1), 0.5 - x1*x1 - y1*y1),
+            ((i + 1, j + 1), (x2, y2), 0.5 - x2*x2 - y2*y2)]
 
-    t1 = 0.5 - x1*x1 - y1*y1
-    if t1 < 0:
-        n1 = 0.0
-    else:
-        t1 *= t1
-        n1 = t1 * t1 * dot2(grad3[gi1][0], grad3[gi1][1], x1, y1)
 
-    t2 = 0.5 - x2*x2 - y2*y2
-    if t2 < 0:
-        n2 = 0.0
-    else:
-        t2 *= t2
-        n2 = t2 * t2 * dot2(grad3[gi2][0], grad3[gi2][1], x2, y2)
-
-    # Add contributions from each corner to get the final noise value.
-    # The result is scaled to return values in the interval [-1,1].
-    return 70.0*(n0 + n1 + n2)
+def _noise_3d_array(x, y, z, corner_hash, out=None, derivatives=False):
+    """
+    3D simplex kernel shared by the array entry points
+    :param x: ndarray of float
+    :param y: ndarray of float
+    :param z: ndarray of float
+    :param corner_hash: gradient index of lattice points, as for _noise_2d_array()
+    :param out: optional ndarray for the result
+    :param derivatives: also return the partial derivatives, as for _noise_2d_array()
+    :return: ndarray of values in [-1, 1], computed in the dtype of the inputs
+    """
+    return _shade(_corners_3d(x, y, z), corner_hash, *_kernel_shading[3], out=out,
+                  derivatives=derivatives)
 
 
-def raw_noise_3d(x, y, z):
+def _corners_3d(x, y, z):
     """
-    raw_noise_3d() -- 3D raw Simplex noise
-    :param x: float
-    :param y: float
-    :param z: float
-    :return: value will be between [-1, 1]
+    geometry of the 3D kernel, see _corners_2d()
+    :return: list of (lattice point, offsets, falloff) for the four simplex corners
     """
-    # Noise contributions from the four corners
-    n0, n1, n2, n3 = 0.0, 0.0, 0.0, 0.0
-
     # Skew the input space to determine which simplex cell we're in
-    F3 = 1.0/3.0
-    s = (x+y+z)*F3   # Very nice and simple skew factor for 3D
-    i = fastfloor(x+s)
-    j = fastfloor(y+s)
-    k = fastfloor(z+s)
-
-    G3 = 1.0/6.0    # Very nice and simple unskew factor, too
-    t = (i+j+k)*G3
-    X0 = i-t         # Unskew the cell origin back to (x,y,z) space
-    Y0 = j-t
-    Z0 = k-t
-    x0 = x-X0        # The x,y,z distances from the cell origin
-    y0 = y-Y0
-    z0 = z-Z0
-
-    # For the 3D case, the simplex shape is a slightly irregular tetrahedron.
-    # Determine which simplex we are in.
-    # i1, j1, k1  Offsets for second corner of simplex in (i,j,k) coords
-    # i2, j2, k2  Offsets for third corner of simplex in (i,j,k) coords
-
-    if x0 >= y0:
-        if y0>=z0:
-            i1, j1, k1, i2, j2, k2 = 1, 0, 0, 1, 1, 0   # X Y Z order
-        elif x0>=z0:
-            i1, j1, k1, i2, j2, k2 = 1, 0, 0, 1, 0, 1   # X Z Y order
-        else:
-            i1, j1, k1, i2, j2, k2 = 0, 0, 1, 1, 0, 1   # Z X Y order
-    else:  # x0 < y0
-        if y0 < z0:
-            i1, j1, k1, i2, j2, k2 = 0, 0, 1, 0, 1, 1   # Z Y X order
-        elif x0 < z0:
-            i1, j1, k1, i2, j2, k2 = 0, 1, 0, 0, 1, 1   # Y Z X order
-        else:
-            i1, j1, k1, i2, j2, k2 = 0, 1, 0, 1, 1, 0   # Y X Z order
-
-    # A step of (1,0,0) in (i,j,k) means a step of (1-c,-c,-c) in (x,y,z),
-    # a step of (0,1,0) in (i,j,k) means a step of (-c,1-c,-c) in (x,y,z), and
-    # a step of (0,0,1) in (i,j,k) means a step of (-c,-c,1-c) in (x,y,z), where
-    # c = 1/6.
-    x1 = x0 - i1 + G3 # Offsets for second corner in (x,y,z) coords
+    s = (x + y + z)*F3
+    i = _fastfloor_array(x + s)
+    j = _fastfloor_array(y + s)
+    k = _fastfloor_array(z + s)
+
+    fi = i.astype(x.dtype)
+    fj = j.astype(x.dtype)
+    fk = k.astype(x.dtype)
+    t = (fi + fj + fk)*G3
+    x0 = x - (fi - t)
+    y0 = y - (fj - t)
+    z0 = z - (fk - t)
+
+    # The six-way ordering of x0, y0, z0 in raw_noise_3d() reduces to three
+    # comparisons; these expressions reproduce its branch table exactly.
+    xy = x0 >= y0
+    yz = y0 >= z0
+    xz = x0 >= z0
+    i1 = (xy & (yz | xz)).astype(np.int8)
+    j1 = (~xy & yz).astype(np.int8)
+    k1 = 1 - i1 - j1
+    i2 = (xy | (yz & xz)).astype(np.int8)
+    j2 = (~xy | yz).astype(np.int8)
+    k2 = (~yz | (~xy & ~xz)).astype(np.int8)
+
+    x1 = x0 - i1 + G3
     y1 = y0 - j1 + G3
     z1 = z0 - k1 + G3
-    x2 = x0 - i2 + 2.0*G3 # Offsets for third corner in (x,y,z) coords
+    x2 = x0 - i2 + 2.0*G3
     y2 = y0 - j2 + 2.0*G3
     z2 = z0 - k2 + 2.0*G3
-    x3 = x0 - 1.0 + 3.0*G3 # Offsets for last corner in (x,y,z) coords
+    x3 = x0 - 1.0 + 3.0*G3
     y3 = y0 - 1.0 + 3.0*G3
     z3 = z0 - 1.0 + 3.0*G3
 
-    # Work out the hashed gradient indices of the four simplex corners
-    ii = i & 255
-    jj = j & 255
-    kk = k & 255
-    gi0 = perm[ii+perm[jj+perm[kk]]] % 12
-    gi1 = perm[ii+i1+perm[jj+j1+perm[kk+k1]]] % 12
-    gi2 = perm[ii+i2+perm[jj+j2+perm[kk+k2]]] % 12
-    gi3 = perm[ii+1+perm[jj+1+perm[kk+1]]] % 12
-
-    # Calculate the contribution from the four corners
-    t0 = 0.6 - x0*x0 - y0*y0 - z0*z0
-    if t0 < 0:
-        n0 = 0.0
-    else:
-        t0 *= t0
-        n0 = t0 * t0 * dot3(grad3[gi0][0], grad3[gi0][1], grad3[gi0][2], x0, y0, z0)
+    return [((i, j, k), (x0, y0, z0), 0.6 - x0*x0 - y0*y0 - z0*z0),
+            ((i + i1, j + j1, k + k1), (x1, y1, z1), 0.6 - x1*x1 - y1*y1 - z1*z1),
+            ((i + i2, j + j2, k + k2), (x2, y2, z2), 0.6 - x2*x2 - y2*y2 - z2*z2),
+            ((i + 1, j + 1, k + 1), (x3, y3, z3), 0.6 - x3*x3 - y3*y3 - z3*z3)]
 
-    t1 = 0.6 - x1*x1 - y1*y1 - z1*z1;
-    if t1 < 0:
-        n1 = 0.0
-    else:
-        t1 *= t1
-        n1 = t1 * t1 * dot3(grad3[gi1][0], grad3[gi1][1], grad3[gi1][2], x1, y1, z1)
 
-    t2 = 0.6 - x2*x2 - y2*y2 - z2*z2;
-    if t2 < 0:
-        n2 = 0.0
-    else:
-        t2 *= t2
-        n2 = t2 * t2 * dot3(grad3[gi2][0], grad3[gi2][1], grad3[gi2][2], x2, y2, z2)
-
-    t3 = 0.6 - x3*x3 - y3*y3 - z3*z3;
-    if t3 < 0:
-        n3 = 0.0
-    else:
-        t3 *= t3
-        n3 = t3 * t3 * dot3(grad3[gi3][0], grad3[gi3][1], grad3[gi3][2], x3, y3, z3)
+def _noise_4d_array(x, y, z, w, corner_hash, out=None, derivatives=False):
+    """
+    4D simplex kernel shared by the array entry points
+    :param x: ndarray of float
+    :param y: ndarray of float
+    :param z: ndarray of float
+    :param w: ndarray of float
+    :param corner_hash: gradient index of lattice points, as for _noise_2d_array()
+    :param out: optional ndarray for the result
+    :param derivatives: also return the partial derivatives, as for _noise_2d_array()
+    :return: ndarray of values in [-1, 1], computed in the dtype of the inputs
+    """
+    return _shade(_corners_4d(x, y, z, w), corner_hash, *_kernel_shading[4], out=out,
+                  derivatives=derivatives)
 
-    # Add contributions from each corner to get the final noise value.
-    # The result is scaled to stay just inside [-1,1]
-    return 32.0*(n0 + n1 + n2 + n3)
 
-def raw_noise_4d(x, y, z, w ):
+def _corners_4d(x, y, z, w):
     """
-    raw_noise_4d() -- 4D raw Simplex noise
-    :param x:
-    :param y:
-    :param z:
-    :param w:
-    :return: value will be between [-1, 1]
+    geometry of the 4D kernel, see _corners_2d()
+    :return: list of (lattice point, offsets, falloff) for the five simplex corners
     """
-    # The skewing and unskewing factors are hairy again for the 4D case
-    F4 = (sqrt(5.0) - 1.0)/4.0
-    G4 = (5.0 - sqrt(5.0))/20.0
-    n0, n1, n2, n3, n4 = 0.0, 0.0, 0.0, 0.0, 0.0 # Noise contributions from the five corners
-
     # Skew the (x,y,z,w) space to determine which cell of 24 simplices we're in
-    s = (x + y + z + w)*F4    # Factor for 4D skewing
-    i = fastfloor(x + s)
-    j = fastfloor(y + s)
-    k = fastfloor(z + s)
-    l = fastfloor(w + s)
-    t = (i + j + k + l)*G4    # Factor for 4D unskewing
-    X0 = i - t         # Unskew the cell origin back to (x,y,z,w) space
-    Y0 = j - t
-    Z0 = k - t
-    W0 = l - t
-    x0 = x - X0        # The x,y,z,w distances from the cell origin
-    y0 = y - Y0
-    z0 = z - Z0
-    w0 = w - W0
-
-    """
-    For the 4D case, the simplex is a 4D shape I won t even try to describe.
-    To find out which of the 24 possible simplices we're in, we need to
-    determine the magnitude ordering of x0, y0, z0 and w0.
-    The method below is a good way of finding the ordering of x,y,z,w and
-    then find the correct traversal order for the simplex we're in.
-    First, six pair-wise comparisons are performed between each possible pair
-    of the four coordinates, and the results are used to add up binary bits
-    for an integer index.
-    """
-    c1 = 23 if x0 > y0 else 0
-    c2 = 16 if x0 > z0 else 0
-    c3 =  8 if y0 > z0 else 0
-    c4 =  4 if x0 > w0 else 0
-    c5 =  2 if y0 > w0 else 0
-    c6 =  1 if z0 > w0 else 0
-    c = c1 + c2 + c3 + c4 + c5 + c6;
-
-    # i1, j1, k1, l1   The integer offsets for the second simplex corner
-    # i2, j2, k2, l2   The integer offsets for the third simplex corner
-    # i3, j3, k3, l3   The integer offsets for the fourth simplex corner
-
-    """
-    simplex[c] is a 4-vector with the numbers 0, 1, 2 and 3 in some order.
-    Many values of c will never occur, since e.g. x>y>z>w makes x<z, y<w and x<w
-    impossible. Only the 24 indices which have non-zero entries make any sense.
-    We use a thresholding to set the coordinates in turn from the largest magnitude.
-    The number 3 in the "simplex" array is at the position of the largest coordinate.
-    """
-    i1 = 1 if simplex[c][0] >=3 else 0
-    j1 = 1 if simplex[c][1] >=3 else 0
-    k1 = 1 if simplex[c][2] >=3 else 0
-    l1 = 1 if simplex[c][3] >=3 else 0
-    # The number 2 in the "simplex" array is at the second largest coordinate.
-    i2 = 1 if simplex[c][0] >=2 else 0
-    j2 = 1 if simplex[c][1] >=2 else 0
-    k2 = 1 if simplex[c][2] >=2 else 0
-    l2 = 1 if simplex[c][3] >=2 else 0
-    # The number 1 in the "simplex" array is at the second smallest coordinate.
-    i3 = 1 if simplex[c][0] >=1 else 0
-    j3 = 1 if simplex[c][1] >=1 else 0
-    k3 = 1 if simplex[c][2] >=1 else 0
-    l3 = 1 if simplex[c][3] >=1 else 0
-    # The fifth corner has all coordinate offsets = 1, so no need to look that up.
-
-    x1 = x0 - i1 + G4 # Offsets for second corner in (x,y,z,w) coords
+    s = (x + y + z + w)*F4
+    i = _fastfloor_array(x + s)
+    j = _fastfloor_array(y + s)
+    k = _fastfloor_array(z + s)
+    l = _fastfloor_array(w + s)
+    fi = i.astype(x.dtype)
+    fj = j.astype(x.dtype)
+    fk = k.astype(x.dtype)
+    fl = l.astype(x.dtype)
+    t = (fi + fj + fk + fl)*G4
+    x0 = x - (fi - t)
+    y0 = y - (fj - t)
+    z0 = z - (fk - t)
+    w0 = w - (fl - t)
+
+    # Same pair-wise comparison index as raw_noise_4d(), packed as uint8 bits;
+    # one gather from the offset table then yields all twelve corner offsets
+    c = np.left_shift(x0 > y0, 5, dtype=np.uint8)
+    c |= np.left_shift(x0 > z0, 4, dtype=np.uint8)
+    c |= np.left_shift(y0 > z0, 3, dtype=np.uint8)
+    c |= np.left_shift(x0 > w0, 2, dtype=np.uint8)
+    c |= np.left_shift(y0 > w0, 1, dtype=np.uint8)
+    c |= z0 > w0
+    i1, j1, k1, l1, i2, j2, k2, l2, i3, j3, k3, l3 = _simplex4_offsets_array[:, c]
+
+    x1 = x0 - i1 + G4
     y1 = y0 - j1 + G4
     z1 = z0 - k1 + G4
     w1 = w0 - l1 + G4
-    x2 = x0 - i2 + 2.0*G4 # Offsets for third corner in (x,y,z,w) coords
+    x2 = x0 - i2 + 2.0*G4
     y2 = y0 - j2 + 2.0*G4
     z2 = z0 - k2 + 2.0*G4
     w2 = w0 - l2 + 2.0*G4
-    x3 = x0 - i3 + 3.0*G4 # Offsets for fourth corner in (x,y,z,w) coords
+    x3 = x0 - i3 + 3.0*G4
     y3 = y0 - j3 + 3.0*G4
     z3 = z0 - k3 + 3.0*G4
     w3 = w0 - l3 + 3.0*G4
-    x4 = x0 - 1.0 + 4.0*G4 # Offsets for last corner in (x,y,z,w) coords
+    x4 = x0 - 1.0 + 4.0*G4
     y4 = y0 - 1.0 + 4.0*G4
     z4 = z0 - 1.0 + 4.0*G4
     w4 = w0 - 1.0 + 4.0*G4
 
-    # Work out the hashed gradient indices of the five simplex corners
-    ii = i & 255
-    jj = j & 255
-    kk = k & 255
-    ll = l & 255
-    gi0 = perm[ii+perm[jj+perm[kk+perm[ll]]]] % 32
-    gi1 = perm[ii+i1+perm[jj+j1+perm[kk+k1+perm[ll+l1]]]] % 32
-    gi2 = perm[ii+i2+perm[jj+j2+perm[kk+k2+perm[ll+l2]]]] % 32
-    gi3 = perm[ii+i3+perm[jj+j3+perm[kk+k3+perm[ll+l3]]]] % 32
-    gi4 = perm[ii+1+perm[jj+1+perm[kk+1+perm[ll+1]]]] % 32
-
-    # Calculate the contribution from the five corners
-    t0 = 0.6 - x0*x0 - y0*y0 - z0*z0 - w0*w0
-    if t0 < 0:
-        n0 = 0.0
-    else:
-        t0 *= t0
-        n0 = t0 * t0 * dot4(grad4[gi0][0], grad4[gi0][1], grad4[gi0][2], grad4[gi0][3], x0, y0, z0, w0)
+    return [((i, j, k, l), (x0, y0, z0, w0), 0.6 - x0*x0 - y0*y0 - z0*z0 - w0*w0),
+            ((i + i1, j + j1, k + k1, l + l1), (x1, y1, z1, w1), 0.6 - x1*x1 - y1*y1 - z1*z1 - w1*w1),
+            ((i + i2, j + j2, k + k2, l + l2), (x2, y2, z2, w2), 0.6 - x2*x2 - y2*y2 - z2*z2 - w2*w2),
+            ((i + i3, j + j3, k + k3, l + l3), (x3, y3, z3, w3), 0.6 - x3*x3 - y3*y3 - z3*z3 - w3*w3),
+            ((i + 1, j + 1, k + 1, l + 1), (x4, y4, z4, w4), 0.6 - x4*x4 - y4*y4 - z4*z4 - w4*w4)]
 
-    t1 = 0.6 - x1*x1 - y1*y1 - z1*z1 - w1*w1
-    if t1 < 0:
-        n1 = 0.0
-    else:
-        t1 *= t1
-        n1 = t1 * t1 * dot4(grad4[gi1][0], grad4[gi1][1], grad4[gi1][2], grad4[gi1][3], x1, y1, z1, w1)
 
-    t2 = 0.6 - x2*x2 - y2*y2 - z2*z2 - w2*w2
-    if t2 < 0:
-        n2 = 0.0
-    else:
-        t2 *= t2
-        n2 = t2 * t2 * dot4(grad4[gi2][0], grad4[gi2][1], grad4[gi2][2], grad4[gi2][3], x2, y2, z2, w2)
+def _shade(corners, corner_hash, table, factor, out=None, derivatives=False):
+    """
+    the part of a kernel that depends on the permutation table: hash each corner's
+    lattice point to a gradient and sum the falloff-weighted contributions.  The
+    corners of one _corners_*d() call can be shaded for several corner hashes.
+    :param corners: from _corners_2d/3d/4d()
+    :param corner_hash: gradient index of lattice points, as for _noise_2d_array()
+    :param table: _grad3_arrays or _grad4_arrays
+    :param factor: final scale of the sum, 70, 32 or 27
+    :param out: optional ndarray for the result
+    :param derivatives: also return the partial derivatives, as for _noise_2d_array()
+    :return: ndarray of values in [-1, 1], or (values, d/dx, ...) with derivatives
+    """
+    grad = [0.0]*len(corners[0][1]) if derivatives else None
+    total = None
+    for point, d, t in corners:
+        n = _corner_array(t, table, corner_hash(*point), d, grad)
+        total = n if total is None else total + n
 
-    t3 = 0.6 - x3*x3 - y3*y3 - z3*z3 - w3*w3
-    if t3 < 0:
-        n3 = 0.0
-    else:
-        t3 *= t3
-        n3 = t3 * t3 * dot4(grad4[gi3][0], grad4[gi3][1], grad4[gi3][2], grad4[gi3][3], x3, y3, z3, w3)
+    value = np.multiply(total, factor, out=out)
+    if grad is None:
+        return value
+    return (value,) + tuple(g*factor for g in grad)
 
-    t4 = 0.6 - x4*x4 - y4*y4 - z4*z4 - w4*w4
-    if t4 < 0:
-        n4 = 0.0
-    else:
-        t4 *= t4
-        n4 = t4 * t4 * dot4(grad4[gi4][0], grad4[gi4][1], grad4[gi4][2], grad4[gi4][3], x4, y4, z4, w4)
 
-    # Sum up and scale the result to cover the range [-1,1]
-    return 27.0*(n0 + n1 + n2 + n3 + n4)
+def _octave_grid(noise, corner_hash, origin, step, shape, octaves, persistence, scale, start=None,
+                 dtype=None, out=None, derivatives=False, periods=None, footprint=None):
+    """
+    octave loop behind noise_grid_2d/3d/4d()
+    :param noise: one of the _noise_*d_array kernels
+    :param corner_hash: lattice point hash of the generator, e.g. SimplexNoise._hash_2d
+    :param origin: first sample, one coordinate per axis
+    :param step: sample spacing, scalar or one value per axis
+    :param shape: samples per axis
+    :param start: index of the first sample per axis, default all zero
+    :param dtype: float32 or float64 for the result and every temporary
+    :param out: optional ndarray of the given shape for the result
+    :param derivatives: also return the partial derivatives along each axis
+    :param periods: optional period per axis for periodic noise, see _octave_layers()
+    :param footprint: optional sample spacing for level of detail, scalar or broadcastable to shape
+    :return: ndarray of the given shape, or (values, d/dx, d/dy, ...) if derivatives
+    """
+    shape = tuple(int(n) for n in shape)
+    dims = len(shape)
+    out = _output(shape, dtype, out)
+    origin = np.broadcast_to(np.asarray(origin, dtype=np.float64), (dims,))
+    step = np.broadcast_to(np.asarray(step, dtype=np.float64), (dims,))
+    start = [0]*dims if start is None else [int(a) for a in start]
+    frequencies, amplitudes, maxAmplitude = _octave_schedule(octaves, persistence, scale)
+    if footprint is not None and np.ndim(footprint) == 0:
+        frequencies, amplitudes = _lod_schedule(frequencies, amplitudes, footprint)
+        footprint = None
+    if footprint is not None:
+        footprint = np.broadcast_to(np.asarray(footprint, dtype=np.float64), shape)
+    layers = _octave_layers(corner_hash, frequencies, dims, periods)
+
+    # One float64 coordinate vector per axis.  Each block below takes its slice of
+    # every axis, shaped to broadcast against the others, so no full-size meshgrid
+    # of coordinates is ever built.
+    indices = [np.arange(start[d], start[d] + shape[d]) for d in range(dims)]
+    if periods is not None:
+        for d, p in enumerate(periods):
+            # A period of a whole number of steps wraps the sample index, so that
+            # samples that many steps apart get the very same coordinate
+            m = p/step[d] if p and step[d] else 0.0
+            if m >= 1.0 and abs(m - round(m)) <= 1e-9*m:
+                indices[d] = indices[d] % int(round(m))
+    axes = [origin[d] + indices[d]*step[d] for d in range(dims)]
+    axes = _wrap_coordinates(axes, periods)
+    grads = [np.empty(shape, out.dtype) for _ in range(dims)] if derivatives else []
+
+    for block in _grid_blocks(shape):
+        coords = []
+        for d, (a, n) in enumerate(block):
+            view = [1]*dims
+            view[d] = n
+            coords.append(axes[d][a:a + n].reshape(view))
+
+        region = tuple(slice(a, a + n) for a, n in block)
+        total = out[region]
+        total.fill(0.0)
+        gtotals = [g[region] for g in grads]
+        for g in gtotals:
+            g.fill(0.0)
+        for (factors, layer_hash), frequency, amplitude in zip(layers, frequencies, amplitudes):
+            active = None
+            if footprint is not None:
+                active, amplitude = _lod_block(frequency, amplitude, footprint[region])
+                if active is False:
+                    continue
+            scaled = [(c*f).astype(out.dtype, copy=False) for c, f in zip(coords, factors)]
+            if active is not None:
+                scaled = [np.broadcast_to(c, total.shape)[active] for c in scaled]
+            if derivatives or active is not None:
+                octave = noise(*scaled, corner_hash=layer_hash, derivatives=derivatives)
+                _accumulate(total, gtotals, octave if derivatives else (octave,), factors, amplitude, active)
+            else:
+                total += noise(*scaled, corner_hash=layer_hash)*amplitude
+        total /= maxAmplitude
+        for g in gtotals:
+            g /= maxAmplitude
+
+    if derivatives:
+        return (out,) + tuple(grads)
+    return out
+
+
+def _accumulate(total, gtotals, octave, factors, amplitude, active=None):
+    """
+    add one octave of (value, derivatives) from a kernel into running sums;
+    by the chain rule the derivatives of noise(f*x) pick up a factor f
+    :param total: running sum of values, updated in place
+    :param gtotals: running sums of derivatives, one per axis, updated in place
+    :param octave: (value, d/dx, ...) from a _noise_*d_array kernel
+    :param factors: the octave's coordinate factor (frequency) on each axis
+    :param amplitude: scalar, or one weight per evaluated sample
+    :param active: optional boolean mask of the samples the octave was evaluated at
+    """
+    if active is None:
+        total += octave[0]*amplitude
+        for g, d, f in zip(gtotals, octave[1:], factors):
+            g += d*(amplitude*f)
+        return
+    total[active] += octave[0]*amplitude
+    for g, d, f in zip(gtotals, octave[1:], factors):
+        g[active] += d*(amplitude*f)
+
+
+# Level of detail: an octave of frequency f is kept whole while f*footprint is at
+# most _LOD_FULL, faded out linearly above that and dropped at _LOD_CUT, the
+# Nyquist limit of half a cycle per sample.  Successive octaves double f, so at
+# most one octave is fading at any footprint.
+_LOD_FULL = 0.25
+_LOD_CUT = 0.5
+
+
+def _lod_schedule(frequencies, amplitudes, footprint):
+    """
+    octave schedule for one footprint: octaves beyond the Nyquist limit are left
+    out and the fading one gets its amplitude scaled down
+    :param frequencies: octave frequencies from _octave_schedule()
+    :param amplitudes: octave amplitudes from _octave_schedule()
+    :param footprint: sample spacing in input units
+    :return: (frequencies, amplitudes) of the octaves that are kept
+    """
+    kept_frequencies = []
+    kept_amplitudes = []
+    for frequency, amplitude in zip(frequencies, amplitudes):
+        weight = min(1.0, (_LOD_CUT - abs(frequency)*footprint)/(_LOD_CUT - _LOD_FULL))
+        if weight > 0.0:
+            kept_frequencies.append(frequency)
+            kept_amplitudes.append(amplitude*weight)
+    return kept_frequencies, kept_amplitudes
+
+
+def _lod_block(frequency, amplitude, footprint):
+    """
+    per-sample level of detail of one octave over a block
+    :param frequency: octave frequency
+    :param amplitude: octave amplitude
+    :param footprint: ndarray of sample spacings of the block
+    :return: (active, amplitudes): active is False if no sample needs the octave, None
+             if all do, else a boolean mask of those that do; amplitudes holds the
+             weighted amplitude of each sample that needs it
+    """
+    weight = np.clip((_LOD_CUT - abs(frequency)*footprint)/(_LOD_CUT - _LOD_FULL), None, 1.0)
+    active = weight > 0.0
+    if not active.any():
+        return False, None
+    if active.all():
+        return None, amplitude*weight
+    return active, amplitude*weight[active]
+
+
+def _octave_layers(corner_hash, frequencies, dims, periods=None):
+    """
+    per-octave coordinate factors and corner hashes of the octave loops.  With
+    periods, each octave wraps its own lattice at period*frequency (see
+    _lattice_periods()), so every octave, and hence the sum, repeats with the
+    same period in input coordinates.
+    :param corner_hash: lattice point hash of the generator
+    :param frequencies: octave frequencies from _octave_schedule()
+    :param dims: number of coordinate axes
+    :param periods: None, or a period per axis (None for an axis that does not repeat);
+                    only supported with the 3D kernel
+    :return: list of (factors, corner_hash), factors holding one frequency per axis
+    """
+    if periods is None:
+        return [((f,)*dims, corner_hash) for f in frequencies]
+    layers = []
+    for f in frequencies:
+        factors, cells = _lattice_periods(periods, f)
+        layers.append((factors, _periodic_hash(corner_hash, cells)))
+    return layers
+
+
+def _lattice_periods(periods, frequency=1.0):
+    """
+    fit periods to the 3D simplex lattice.  The skewed lattice only repeats along
+    an axis every 3 units (the lattice point (4, 1, 1) unskews to (3, 0, 0)), so
+    a period p, in noise units p*frequency, is rounded to the nearest multiple of
+    3 cells and the axis is stretched to match.
+    :param periods: period per axis in input units, None (or 0) for no wrapping
+    :param frequency: factor from input units to noise units
+    :return: (factors, cells): per-axis coordinate factor, and lattice period per
+             axis in cells (a multiple of 3, or 0 for no wrapping)
+    """
+    factors = []
+    cells = []
+    for p in periods:
+        if not p:
+            factors.append(frequency)
+            cells.append(0)
+            continue
+        if p < 0:
+            raise ValueError("noise periods must be positive, not {0}".format(p))
+        q = p*frequency
+        n = 3*max(1, int(round(q/3.0)))
+        factors.append(frequency*n/q)
+        cells.append(n)
+    return tuple(factors), tuple(cells)
+
+
+def _wrap_coordinates(coords, periods):
+    """
+    reduce coordinates into the base period [0, p) of each periodic axis.  The
+    remainder is exact in floating point, so points an exact period apart reach
+    the kernel with identical coordinates; wrapping only through the lattice
+    hash would leave them a rounding error apart, enough to land on opposite
+    sides of a 3D simplex face, where the kernel jumps.
+    :param coords: list of ndarrays, one per axis
+    :param periods: None, or a period (or None) per axis
+    :return: list of ndarrays, the periodic axes replaced by their remainders
+    """
+    if periods is None:
+        return coords
+    return [c if not p else np.mod(c, np.asarray(p, c.dtype)) for c, p in zip(coords, periods)]
+
+
+def _periodic_hash(corner_hash, cells):
+    """
+    wrap a 3D corner hash so that lattice points one period apart share a gradient
+    :param corner_hash: lattice point hash, e.g. SimplexNoise._hash_3d
+    :param cells: lattice period per axis from _lattice_periods(), 0 for no wrapping
+    :return: callable with the signature of corner_hash
+    """
+    def periodic(i, j, k):
+        # Six times the unskewed position of a lattice point, 6*i - (i + j + k), is an
+        # integer; wrap it into the base period and skew the result back
+        s = i + j + k
+        X, Y, Z = [6*c - s if n == 0 else (6*c - s) % (6*n) for c, n in zip((i, j, k), cells)]
+        s = (X + Y + Z)//3
+        return corner_hash((X + s)//6, (Y + s)//6, (Z + s)//6)
+    return periodic
+
+
+# Samples per block in _octave_array() and _octave_grid(); small enough that a
+# block's temporaries stay in cache across all of its octaves
+_OCTAVE_BLOCK = 1 << 13
+
+
+def _grid_blocks(shape):
+    """
+    split a grid into row-major blocks of about _OCTAVE_BLOCK samples, whole rows first
+    :param shape: samples per axis
+    :return: generator of blocks, each a list of (start, size) per axis
+    """
+    tile = []
+    remaining = _OCTAVE_BLOCK
+    for n in reversed(shape):
+        t = max(1, min(n, remaining))
+        tile.insert(0, t)
+        remaining //= t
+    for begin in product(*[range(0, n, t) for n, t in zip(shape, tile)]):
+        yield [(a, min(t, n - a)) for a, t, n in zip(begin, tile, shape)]
+
+
+def _octave_array(noise, corner_hash, octaves, persistence, scale, coords, dtype=None, out=None,
+                  derivatives=False, periods=None, footprint=None):
+    """
+    fused multi-octave loop behind the octave_noise_*d_array() methods
+    :param noise: one of the _noise_*d_array kernels
+    :param corner_hash: lattice point hash of the generator, e.g. SimplexNoise._hash_2d
+    :param coords: tuple of array_like coordinates, one per dimension
+    :param dtype: float32 or float64 for the result and every temporary
+    :param out: optional ndarray with the broadcast shape of coords for the result
+    :param derivatives: also return the partial derivatives along each axis
+    :param periods: optional period per axis for periodic noise, see _octave_layers()
+    :param footprint: optional sample spacing for level of detail, scalar or broadcastable to coords
+    :return: ndarray with the broadcast shape of coords, or (values, d/dx, ...) if derivatives
+    """
+    frequencies, amplitudes, maxAmplitude = _octave_schedule(octaves, persistence, scale)
+    if footprint is not None and np.ndim(footprint) == 0:
+        frequencies, amplitudes = _lod_schedule(frequencies, amplitudes, footprint)
+        footprint = None
+    layers = _octave_layers(corner_hash, frequencies, len(coords), periods)
+    coords = np.broadcast_arrays(*[_float_array(c) for c in coords])
+    shape = coords[0].shape
+    coords = [c.ravel() for c in coords]
+    size = coords[0].size
+    if footprint is not None:
+        footprint = np.broadcast_to(np.asarray(footprint, dtype=np.float64), shape).ravel()
+
+    out = _output(shape, dtype, out)
+    # Blocks are written through a flat view; a non-contiguous out gets one copy at the end
+    result = out if out.flags.c_contiguous else np.empty(shape, out.dtype)
+    flat = result.reshape(-1)
+    # Coordinates are scaled by the octave frequency in their own precision and
+    # rounded once into these buffers
+    scaled = [np.empty(min(size, _OCTAVE_BLOCK), out.dtype) for _ in coords]
+    grads = [np.empty(size, out.dtype) for _ in coords] if derivatives else []
+    for lo in range(0, size, _OCTAVE_BLOCK):
+        hi = min(lo + _OCTAVE_BLOCK, size)
+        total = flat[lo:hi]
+        total.fill(0.0)
+        gtotals = [g[lo:hi] for g in grads]
+        for g in gtotals:
+            g.fill(0.0)
+        block = _wrap_coordinates([c[lo:hi] for c in coords], periods)
+        for (factors, layer_hash), frequency, amplitude in zip(layers, frequencies, amplitudes):
+            xs = [np.multiply(c, f, out=buf[:hi - lo]) for c, f, buf in zip(block, factors, scaled)]
+            if footprint is not None:
+                active, amplitude = _lod_block(frequency, amplitude, footprint[lo:hi])
+                if active is False:
+                    continue
+                if active is not None:
+                    xs = [x[active] for x in xs]
+                octave = noise(*xs, corner_hash=layer_hash, derivatives=derivatives)
+                _accumulate(total, gtotals, octave if derivatives else (octave,), factors, amplitude, active)
+            elif derivatives:
+                _accumulate(total, gtotals, noise(*xs, corner_hash=layer_hash, derivatives=True),
+                            factors, amplitude)
+            else:
+                total += noise(*xs, corner_hash=layer_hash)*amplitude
+        total /= maxAmplitude
+        for g in gtotals:
+            g /= maxAmplitude
+
+    if result is not out:
+        out[...] = result
+    if derivatives:
+        return (out,) + tuple(g.reshape(shape) for g in grads)
+    return out
+
+
+# Largest magnitude of raw noise assumed by _octave_mask().  The kernels are
+# scaled to stay within [-1, 1]; the largest values found by search are about
+# 0.998 (2D), 0.979 (3D) and 0.992 (4D).
+_RAW_BOUND = 1.0
+
+
+def _octave_mask(noise, corner_hash, octaves, persistence, scale, threshold, coords, dtype=None):
+    """
+    octave loop behind the octave_mask_*d_array() methods.  After each octave, a
+    point whose running total is further from threshold*maxAmplitude than the
+    remaining octaves can reach is settled and drops out of the later octaves.
+    Points that are never settled early see every octave, summed in the same
+    order as _octave_array(), so their answer is exactly its value > threshold.
+    :param noise: one of the _noise_*d_array kernels
+    :param corner_hash: lattice point hash of the generator
+    :param threshold: value to compare the normalised noise against
+    :param coords: tuple of array_like coordinates, one per dimension
+    :param dtype: float32 or float64 for the noise arithmetic
+    :return: (mask, evaluated) with the broadcast shape of coords
+    """
+    frequencies, amplitudes, maxAmplitude = _octave_schedule(octaves, persistence, scale)
+    layers = _octave_layers(corner_hash, frequencies, len(coords))
+    coords = np.broadcast_arrays(*[_float_array(c) for c in coords])
+    shape = coords[0].shape
+    coords = [c.ravel() for c in coords]
+    size = coords[0].size
+    dtype = _result_dtype(dtype, None)
+
+    # Reach of the octaves after each one, widened by a margin above the rounding
+    # error of the sum in the compute dtype so that an early answer is never a near miss
+    limit = threshold*maxAmplitude
+    margin = 4*len(amplitudes)*np.finfo(dtype).eps*maxAmplitude
+    reach = [_RAW_BOUND*sum(amplitudes[k + 1:]) + margin for k in range(len(amplitudes))]
+
+    mask = np.zeros(size, bool)
+    evaluated = np.zeros(size, np.min_scalar_type(len(amplitudes)))
+    total = np.empty(min(size, _OCTAVE_BLOCK), dtype)
+    for lo in range(0, size, _OCTAVE_BLOCK):
+        hi = min(lo + _OCTAVE_BLOCK, size)
+        # Block positions of the points that are still open, and their running totals
+        open_ = np.arange(hi - lo)
+        sums = total[:hi - lo]
+        sums.fill(0.0)
+        block = [c[lo:hi] for c in coords]
+        for k, ((factors, layer_hash), amplitude) in enumerate(zip(layers, amplitudes)):
+            if open_.size == hi - lo:
+                xs = [(c*f).astype(dtype, copy=False) for c, f in zip(block, factors)]
+            else:
+                xs = [(c[open_]*f).astype(dtype, copy=False) for c, f in zip(block, factors)]
+            sums += noise(*xs, corner_hash=layer_hash)*amplitude
+            evaluated[lo:hi][open_] += 1
+            if k == len(amplitudes) - 1:
+                mask[lo:hi][open_] = sums/maxAmplitude > threshold
+                break
+            above = sums > limit + reach[k]
+            below = sums < limit - reach[k]
+            mask[lo:hi][open_[above]] = True
+            still = ~(above | below)
+            if not still.all():
+                open_ = open_[still]
+                sums = sums[still]
+                if open_.size == 0:
+                    break
+
+    return mask.reshape(shape), evaluated.reshape(shape)
+
+
+def _periods(period, dims):
+    """
+    :param period: None, a scalar, or one period (or None) per axis
+    :param dims: number of axes
+    :return: tuple with one period (or None) per axis
+    """
+    if period is None or np.isscalar(period):
+        return (period,)*dims
+    period = tuple(period)
+    if len(period) != dims:
+        raise ValueError("expected {0} periods, got {1}".format(dims, len(period)))
+    return period
+
+
+def _floats(values):
+    """
+    :param values: tuple of 0-d arrays from an array entry point
+    :return: tuple of Python floats
+    """
+    return tuple(float(v) for v in values)
+
+
+def _output(shape, dtype, out):
+    """
+    validate or allocate the result array of an array entry point
+    :param shape: expected shape
+    :param dtype: requested dtype, None for out's dtype or float64
+    :param out: caller's ndarray or None
+    :return: ndarray of the given shape
+    """
+    dtype = _result_dtype(dtype, out)
+    if out is None:
+        return np.empty(shape, dtype)
+    if out.shape != shape:
+        raise ValueError("out has shape {0}, expected {1}".format(out.shape, shape))
+    if out.dtype != dtype:
+        raise ValueError("out has dtype {0}, expected {1}".format(out.dtype, dtype))
+    return out
+
+
+def _result_dtype(dtype, out):
+    """
+    :param dtype: requested dtype or None
+    :param out: caller's ndarray or None
+    :return: np.float32 or np.float64 dtype
+    """
+    if dtype is None:
+        dtype = np.float64 if out is None else out.dtype
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("noise arrays are float32 or float64, not {0}".format(dtype))
+    return dtype
+
+
+def _coordinates(coords, dtype, out):
+    """
+    convert the coordinates of a raw_noise_*d_array() call to the compute dtype
+    :return: list of ndarrays
+    """
+    dtype = _result_dtype(dtype, out)
+    return [np.asarray(c, dtype=dtype) for c in coords]
+
+
+def _float_array(c):
+    """
+    :param c: array_like of coordinates
+    :return: c as a float32 or float64 ndarray, without copying if it already is one
+    """
+    c = np.asarray(c)
+    return c if c.dtype in (np.float32, np.float64) else c.astype(np.float64)
+
+
+def _rescale(values, loBound, hiBound):
+    """
+    in-place lo/hi remapping of the scaled_*_array() methods, with the same
+    arithmetic as the scalar scaled functions
+    :param values: ndarray (or NumPy scalar) of values in [-1, 1]
+    :return: values, now between loBound and hiBound
+    """
+    values *= (hiBound - loBound)
+    values /= 2
+    values += (hiBound + loBound)/2
+    return values
+
+
+@lru_cache(maxsize=256)
+def _octave_schedule(octaves, persistence, scale):
+    """
+    per-octave frequencies and amplitudes, and their normalisation
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :return: (frequencies, amplitudes, maxAmplitude), the first two as tuples
+    """
+    frequencies = []
+    amplitudes = []
+    frequency = scale
+    amplitude = 1.0
+
+    # We have to keep track of the largest possible amplitude,
+    # because each octave adds more, and we need a value in [-1, 1].
+    maxAmplitude = 0.0
+    for i in range(octaves):
+        frequencies.append(frequency)
+        amplitudes.append(amplitude)
+        frequency *= 2
+        maxAmplitude += amplitude
+        amplitude *= persistence
+
+    return tuple(frequencies), tuple(amplitudes), maxAmplitude
 
 """
 SimplexTables.py
@@ -597,6 +2017,42 @@ def dot4(gx, gy, gz, gw, x, y, z, w):
     """
     return gx*x + gy*y + gz*z + gw*w
 
+
+def _fastfloor_array(x):
+    """
+    array version of fastfloor(), including its treatment of x <= 0
+    :param x: ndarray of float
+    :return: ndarray of int
+    """
+    xi = x.astype(np.intp)
+    return np.where(x > 0, xi, xi - 1)
+
+
+def _corner_array(t, table, gi, d, grad=None):
+    """
+    falloff-weighted gradient contribution of one simplex corner, for whole arrays
+    :param t: ndarray, unsquared falloff term (0.5 or 0.6 minus squared distance)
+    :param table: _grad3_arrays or _grad4_arrays, one int8 array per gradient component
+    :param gi: ndarray of gradient indices of the corner
+    :param d: tuple of ndarrays, offsets from the corner in each dimension
+    :param grad: optional list of partial derivative accumulators, one per dimension;
+                 the corner's share of each derivative is added in place
+    :return: ndarray, zero wherever t < 0
+    """
+    # Only the components that are used are gathered: 2D noise ignores z of grad3
+    g = [c[gi] for c in table[:len(d)]]
+    dot = g[0]*d[0]
+    for n in range(1, len(d)):
+        dot = dot + g[n]*d[n]
+    t2 = t*t
+    t4 = t2*t2
+    if grad is not None:
+        # d/dx of t^4*(g.d), with t = r - |d|^2:  -8*t^3*(g.d)*d_x + t^4*g_x
+        t3dot = -8.0*t2*t*dot
+        for n in range(len(d)):
+            grad[n] = grad[n] + np.where(t < 0, 0.0, t3dot*d[n] + t4*g[n])
+    return np.where(t < 0, 0.0, t4*dot)
+
 # The gradients are the midpoints of the vertices of a cube.
 grad3 = [
     [1,1,0], [-1,1,0], [1,-1,0], [-1,-1,0],
@@ -656,3 +2112,100 @@ simplex = [
     [2,1,0,3],[0,0,0,0],[0,0,0,0],[0,0,0,0],[3,1,0,2],[0,0,0,0],[3,2,0,1],[3,2,1,0]
 ]
 
+# Corner offsets of the 4D simplex for each comparison index c, derived once from
+# the simplex table by the thresholding of the reference code: the second corner
+# steps along the largest coordinate (entry 3), the third along the two largest
+# (entries >= 2), the fourth along the three largest (entries >= 1).  Each entry is
+# (i1, j1, k1, l1, i2, j2, k2, l2, i3, j3, k3, l3); unreachable indices are all zero.
+simplex4_offsets = tuple(
+    tuple(1 if n >= threshold else 0 for threshold in (3, 2, 1) for n in order)
+    for order in simplex
+)
+
+# Flattened, typed copies of the tables above.  Each gradient component is its
+# own contiguous int8 array, so a lookup is one index per component instead of a
+# row of a nested list (or a strided column of a 2-D array).  The scalar
+# functions index tuple mirrors of the same columns, which CPython indexes
+# faster than NumPy scalars.  The 4D offsets are stored one row per offset, so
+# _simplex4_offsets_array[:, c] gathers the twelve offsets of every sample as
+# twelve contiguous arrays.
+_grad3_arrays = tuple(np.ascontiguousarray(c) for c in np.array(grad3, dtype=np.int8).T)
+_grad4_arrays = tuple(np.ascontiguousarray(c) for c in np.array(grad4, dtype=np.int8).T)
+_grad3_columns = tuple(tuple(int(v) for v in c) for c in _grad3_arrays)
+_grad4_columns = tuple(tuple(int(v) for v in c) for c in _grad4_arrays)
+_simplex4_offsets_array = np.ascontiguousarray(np.array(simplex4_offsets, dtype=np.int8).T)
+for _table in _grad3_arrays + _grad4_arrays + (_simplex4_offsets_array,):
+    _table.flags.writeable = False
+del _table
+
+# Gradient table and final scale of the kernel of each dimension, the arguments
+# of _shade() after the corners
+_kernel_shading = {2: (_grad3_arrays, 70.0), 3: (_grad3_arrays, 32.0), 4: (_grad4_arrays, 27.0)}
+
+
+@lru_cache(maxsize=512)
+def _build_tables(seed):
+    """
+    permutation and gradient-index tables for a seed, cached per seed.  Each table
+    is doubled (512 entries) so that perm[i + perm[j]] needs no wrap, and the
+    gradient-index tables have the % 12 and % 32 already applied.
+    :param seed: None for the classic perm table above, else a random.Random() seed
+    :return: (perm, permMod12, permMod32) as tuples for the scalar functions,
+             followed by the same three tables as read-only uint8 ndarrays
+    """
+    if seed is None:
+        p = perm[:256]
+    else:
+        p = list(range(256))
+        Random(seed).shuffle(p)
+    p = tuple(p + p)
+    tables = (p, tuple(v % 12 for v in p), tuple(v % 32 for v in p))
+    arrays = tuple(np.array(t, dtype=np.uint8) for t in tables)
+    for a in arrays:
+        a.flags.writeable = False
+    return tables + arrays
+
+
+# The module-level functions use the classic permutation table, exactly as before
+_default = SimplexNoise()
+
+octave_noise_2d = _default.octave_noise_2d
+octave_noise_3d = _default.octave_noise_3d
+octave_noise_4d = _default.octave_noise_4d
+scaled_octave_noise_2d = _default.scaled_octave_noise_2d
+scaled_octave_noise_3d = _default.scaled_octave_noise_3d
+scaled_octave_noise_4d = _default.scaled_octave_noise_4d
+scaled_raw_noise_2d = _default.scaled_raw_noise_2d
+scaled_raw_noise_3d = _default.scaled_raw_noise_3d
+scaled_raw_noise_4d = _default.scaled_raw_noise_4d
+raw_noise_2d = _default.raw_noise_2d
+raw_noise_3d = _default.raw_noise_3d
+raw_noise_4d = _default.raw_noise_4d
+raw_noise_2d_array = _default.raw_noise_2d_array
+raw_noise_3d_array = _default.raw_noise_3d_array
+raw_noise_4d_array = _default.raw_noise_4d_array
+octave_noise_2d_array = _default.octave_noise_2d_array
+octave_noise_3d_array = _default.octave_noise_3d_array
+octave_noise_4d_array = _default.octave_noise_4d_array
+scaled_octave_noise_2d_array = _default.scaled_octave_noise_2d_array
+scaled_octave_noise_3d_array = _default.scaled_octave_noise_3d_array
+scaled_octave_noise_4d_array = _default.scaled_octave_noise_4d_array
+scaled_raw_noise_2d_array = _default.scaled_raw_noise_2d_array
+scaled_raw_noise_3d_array = _default.scaled_raw_noise_3d_array
+scaled_raw_noise_4d_array = _default.scaled_raw_noise_4d_array
+octave_mask_2d_array = _default.octave_mask_2d_array
+octave_mask_3d_array = _default.octave_mask_3d_array
+octave_mask_4d_array = _default.octave_mask_4d_array
+noise_grid_2d = _default.noise_grid_2d
+noise_grid_3d = _default.noise_grid_3d
+noise_grid_4d = _default.noise_grid_4d
+raw_noise_2d_periodic = _default.raw_noise_2d_periodic
+raw_noise_3d_periodic = _default.raw_noise_3d_periodic
+octave_noise_2d_periodic = _default.octave_noise_2d_periodic
+octave_noise_3d_periodic = _default.octave_noise_3d_periodic
+raw_noise_2d_periodic_array = _default.raw_noise_2d_periodic_array
+raw_noise_3d_periodic_array = _default.raw_noise_3d_periodic_array
+octave_noise_2d_periodic_array = _default.octave_noise_2d_periodic_array
+octave_noise_3d_periodic_array = _default.octave_noise_3d_periodic_array
+noise_grid_2d_periodic = _default.noise_grid_2d_periodic
+noise_grid_3d_periodic = _default.noise_grid_3d_periodic
@@ -0,0 +1,136 @@
+"""
+SimplexParallel.py -- tiled, multi-core generation of large Simplex noise fields
+
+The requested region is cut into tiles, and each tile is evaluated with the
+noise_grid_2d/3d/4d() functions of SimplexNoise.py, either in a process pool
+or in a thread pool (NumPy releases the GIL inside the array kernels, so
+threads scale for large enough tiles).  Every tile is computed from global
+sample indices and written straight into one shared output array, so the
+result is identical to a serial noise_grid_*d() call whatever the worker
+count or tile size.
+"""
+
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import product
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+import SimplexNoise
+
+
+def noise_grid_parallel(origin, step, shape, octaves, persistence, scale,
+                        tile_shape=64, workers=None, threads=False, noise=None):
+    """
+    noise_grid_parallel() -- multi-octave Simplex noise on a regular grid, in parallel.
+    Same result as noise_grid_2d/3d/4d(origin, step, shape, ...), chosen by len(shape).
+    :param origin: coordinates of the first sample
+    :param step: spacing between samples, a scalar or one value per axis
+    :param shape: number of samples along each axis (2, 3 or 4 axes)
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param tile_shape: samples per tile along each axis (scalar or per axis); smaller
+                       tiles keep each worker's temporaries in cache, larger tiles
+                       amortise the per-tile overhead
+    :param workers: pool size, default os.cpu_count()
+    :param threads: use a thread pool instead of a process pool
+    :param noise: SimplexNoise instance to sample, default the module-level functions
+    :return: ndarray of the given shape.  With processes it is backed by a shared
+             memory block that is released when the array is garbage collected.
+    """
+    shape = tuple(int(n) for n in shape)
+    if noise is None:
+        noise = SimplexNoise._default
+    grid = _grid_function(noise, len(shape))
+    args = (origin, step, shape, octaves, persistence, scale)
+    tiles = _tiles(shape, tile_shape)
+
+    if threads:
+        out = np.empty(shape)
+        with ThreadPoolExecutor(workers) as pool:
+            for _ in pool.map(lambda tile: _fill_tile(out, grid, args, tile), tiles):
+                pass
+        return out
+
+    shm = SharedMemory(create=True, size=max(1, int(np.prod(shape))*8))
+    try:
+        with ProcessPoolExecutor(workers, initializer=_attach, initargs=(shm.name, shape)) as pool:
+            for _ in pool.map(_fill_shared_tile, [(noise, len(shape), args, tile) for tile in tiles]):
+                pass
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    # The name is no longer needed once the workers are done; the mapping
+    # stays valid until the returned array (and every view of it) is gone.
+    shm.unlink()
+    out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    weakref.finalize(out, shm.close)
+    return out
+
+
+def _grid_function(noise, dims):
+    """
+    noise_grid_*d() method for the given number of axes
+    :param noise: SimplexNoise instance
+    :param dims: int
+    :return: bound method
+    """
+    if dims not in (2, 3, 4):
+        raise ValueError("noise grids have 2, 3 or 4 axes, not {0}".format(dims))
+    return getattr(noise, "noise_grid_{0}d".format(dims))
+
+
+def _tiles(shape, tile_shape):
+    """
+    split a grid into tiles in row-major order
+    :param shape: samples per axis
+    :param tile_shape: samples per tile, scalar or per axis
+    :return: list of (start, size) tuples, one int per axis in each
+    """
+    tile_shape = np.broadcast_to(np.asarray(tile_shape, dtype=np.intp), (len(shape),))
+    if np.any(tile_shape < 1):
+        raise ValueError("tile_shape must be positive")
+    starts = [range(0, n, int(t)) for n, t in zip(shape, tile_shape)]
+    return [(start, tuple(min(int(t), n - a) for a, t, n in zip(start, tile_shape, shape)))
+            for start in product(*starts)]
+
+
+def _fill_tile(out, grid, args, tile):
+    """
+    compute one tile straight into its slot of out, with no temporary tile array
+    :param out: ndarray holding the whole grid
+    :param grid: noise_grid_*d() function
+    :param args: (origin, step, shape, octaves, persistence, scale) of the whole grid
+    :param tile: (start, size) from _tiles()
+    """
+    origin, step, shape, octaves, persistence, scale = args
+    start, size = tile
+    region = tuple(slice(a, a + n) for a, n in zip(start, size))
+    grid(origin, step, size, octaves, persistence, scale, start=start, out=out[region])
+
+
+# Output array of the current worker process, set up by _attach()
+_shared = None
+
+
+def _attach(name, shape):
+    """
+    process pool initializer: map the parent's shared output block
+    :param name: SharedMemory name
+    :param shape: shape of the whole grid
+    """
+    global _shared
+    shm = SharedMemory(name=name)
+    _shared = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+
+
+def _fill_shared_tile(job):
+    """
+    process pool task: compute one tile into the shared output
+    :param job: (noise, dims, args, tile), see _fill_tile()
+    """
+    noise, dims, args, tile = job
+    _fill_tile(_shared[1], _grid_function(noise, dims), args, tile)
@@ -0,0 +1,147 @@
+"""
+SimplexPoints.py -- Simplex noise at scattered points given as one (N, D) array
+
+For point clouds, particle positions, mesh vertices and the like:
+
+    heights = octave_noise_points(6, 0.5, 0.01, vertices)      # vertices.shape == (N, 3)
+
+The points are evaluated in chunks of at most chunk_size, so the temporaries
+stay bounded however large N is, and the coordinate columns are read straight
+from the (N, D) array without first being copied out whole.  With sort=True
+the points are evaluated in Morton order (Z-order of their position in the
+bounding box), so that each chunk covers a compact region; morton_order() can
+be computed once and passed as sort= to reuse it across calls.  Results are
+always returned in the original order of the points, and are identical to
+octave_noise_*d_array() on the coordinate columns.
+
+Sorting is off by default: the gradient and permutation tables are small enough
+to stay in cache for any point order, so for the NumPy kernels the sort (and
+the gather and scatter around each chunk) costs more than the locality saves.
+"""
+
+import numpy as np
+
+import SimplexNoise
+
+# Points per chunk: bounds the gathered coordinates and results of one chunk
+CHUNK_SIZE = 1 << 20
+
+
+def raw_noise_points(points, sort=False, chunk_size=CHUNK_SIZE, dtype=None, out=None, noise=None):
+    """
+    raw_noise_points() -- raw Simplex noise at each of a set of points.
+    :param points: array_like of shape (..., D) with D = 2, 3 or 4 coordinates per point
+    :param sort: evaluate the points in Morton order, or in the order of a permutation
+                 from morton_order() (see the module docstring)
+    :param chunk_size: most points evaluated at once
+    :param dtype: float64 (default) or float32
+    :param out: optional ndarray of shape points.shape[:-1] for the result
+    :param noise: SimplexNoise instance to sample, default the module-level functions
+    :return: ndarray of shape points.shape[:-1], values in [-1, 1]
+    """
+    # One octave at scale 1 adds nothing to the raw kernel's arithmetic
+    return octave_noise_points(1, 1.0, 1.0, points, sort, chunk_size, dtype, out, noise)
+
+
+def octave_noise_points(octaves, persistence, scale, points, sort=False, chunk_size=CHUNK_SIZE,
+                        dtype=None, out=None, noise=None):
+    """
+    octave_noise_points() -- multi-octave Simplex noise at each of a set of points.
+    :param octaves:
+    :param persistence:
+    :param scale:
+    :param points: array_like of shape (..., D) with D = 2, 3 or 4 coordinates per point
+    :param sort: evaluate the points in Morton order, or in the order of a permutation
+                 from morton_order() (see the module docstring)
+    :param chunk_size: most points evaluated at once
+    :param dtype: float64 (default) or float32
+    :param out: optional ndarray of shape points.shape[:-1] for the result
+    :param noise: SimplexNoise instance to sample, default the module-level functions
+    :return: ndarray of shape points.shape[:-1], values in [-1, 1]
+    """
+    points = SimplexNoise._float_array(points)
+    if points.ndim < 1 or points.shape[-1] not in (2, 3, 4):
+        raise ValueError("points need 2, 3 or 4 coordinates, got shape {0}".format(points.shape))
+    chunk_size = int(chunk_size)
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    dims = points.shape[-1]
+    shape = points.shape[:-1]
+    out = SimplexNoise._output(shape, dtype, out)
+    noise = SimplexNoise._default if noise is None else noise
+    kernel = getattr(SimplexNoise, "_noise_{0}d_array".format(dims))
+    corner_hash = getattr(noise, "_hash_{0}d".format(dims))
+
+    points = points.reshape(-1, dims)
+    size = points.shape[0]
+    result = out if out.flags.c_contiguous else np.empty(shape, out.dtype)
+    flat = result.reshape(-1)
+    if sort is True:
+        order = morton_order(points)
+    elif sort is False or sort is None:
+        order = None
+    else:
+        order = np.asarray(sort)
+        if order.shape != (size,):
+            raise ValueError("sort order has shape {0}, expected {1}".format(order.shape, (size,)))
+    columns = [points[:, d] for d in range(dims)]
+
+    for lo in range(0, size, chunk_size):
+        hi = min(lo + chunk_size, size)
+        if order is None:
+            coords = [c[lo:hi] for c in columns]
+            target = flat[lo:hi]
+        else:
+            index = order[lo:hi]
+            coords = [np.take(c, index) for c in columns]
+            target = np.empty(hi - lo, out.dtype)
+        SimplexNoise._octave_array(kernel, corner_hash, octaves, persistence, scale, coords, out=target)
+        if order is not None:
+            flat[index] = target
+
+    if result is not out:
+        out[...] = result
+    return out
+
+
+def morton_order(points, bits=None):
+    """
+    morton_order() -- permutation putting points in Z-order of their position
+    within the bounding box, so that points close in the order are close in space.
+    :param points: array_like of shape (N, D), D at most 4
+    :param bits: bits of resolution per axis, default about as many cells in the
+                 bounding box as there are points; at most 63 // D
+    :return: ndarray of N indices, points[order] being sorted
+    """
+    points = np.asarray(points, dtype=np.float64)
+    size, dims = points.shape
+    if size == 0:
+        return np.arange(0, dtype=np.intp)
+    if bits is None:
+        bits = int(np.ceil(np.log2(max(size, 2))/dims))
+    bits = max(1, min(int(bits), 63 // dims))
+
+    lo = points.min(axis=0)
+    extent = points.max(axis=0) - lo
+    # Cell coordinates in [0, 2**bits) along each axis; degenerate axes map to 0
+    levels = (1 << bits) - 1
+    scale = np.where(extent > 0, levels/np.where(extent > 0, extent, 1.0), 0.0)
+    codes = np.zeros(size, np.uint64)
+    for d in range(dims):
+        cell = ((points[:, d] - lo[d])*scale[d]).astype(np.uint64)
+        np.minimum(cell, levels, out=cell)
+        codes |= _spread(cell, bits, dims) << np.uint64(dims - 1 - d)
+    return np.argsort(codes, kind="stable")
+
+
+def _spread(cell, bits, dims):
+    """
+    move bit b of every value to bit b*dims, the other bits left zero
+    :param cell: ndarray of uint64
+    :return: ndarray of uint64
+    """
+    spread = np.zeros_like(cell)
+    one = np.uint64(1)
+    for b in range(bits):
+        spread |= ((cell >> np.uint64(b)) & one) << np.uint64(b*dims)
+    return spread
@@ -0,0 +1,172 @@
+"""
+SimplexStats.py -- opt-in call, sample and timing counters for SimplexNoise.py
+
+    import SimplexStats
+    SimplexStats.enable()
+    ... generate noise ...
+    print(SimplexStats.snapshot())
+    SimplexStats.export("noise-stats.json")
+    SimplexStats.disable()
+
+enable() replaces every public method of SimplexNoise.SimplexNoise, and the
+module-level functions bound to the default generator, with counting wrappers;
+disable() puts the originals back, so instrumentation costs nothing while it
+is off.  Names imported with "from SimplexNoise import ..." before enable()
+keep pointing at the uninstrumented functions.
+
+Each entry point records its calls, the samples it returned (1 per scalar
+call, the array size for array and grid calls) and its cumulative wall time.
+Only the outermost instrumented call is counted: the raw_noise_*() calls made
+inside octave_noise_*() are part of the octave call's time, not entries of
+their own.  The snapshot also holds the hit rates of the per-seed table cache
+and the octave schedule cache.  Counters are per process; work done in
+SimplexParallel's process pool is not seen.
+"""
+
+import atexit
+import functools
+import json
+import threading
+import time
+
+import SimplexNoise
+
+# (owner, name) -> attribute replaced by enable()
+_originals = {}
+# entry point name -> [calls, samples, seconds]
+_counters = {}
+# cache name -> cache_info() at the last reset
+_cache_base = {}
+
+_lock = threading.Lock()
+_local = threading.local()
+_export_path = None
+
+# lru_cache'd functions of SimplexNoise.py whose hit rates are reported
+_CACHES = {"tables": SimplexNoise._build_tables, "octave_schedule": SimplexNoise._octave_schedule}
+
+
+def enable(export_path=None):
+    """
+    enable() -- start counting; does nothing if already enabled.
+    :param export_path: optional file the snapshot is written to when the process exits
+    """
+    global _export_path
+    if _originals:
+        return
+    cls = SimplexNoise.SimplexNoise
+    for name, function in sorted(vars(cls).items()):
+        if name.startswith("_") or not callable(function):
+            continue
+        _replace(cls, name, _instrument(name, function))
+        if getattr(SimplexNoise, name, None) is not None:
+            # Module-level alias: rebind it to the default generator's wrapped method
+            _replace(SimplexNoise, name, getattr(SimplexNoise._default, name))
+    reset()
+    if export_path is not None and _export_path is None:
+        atexit.register(_export_at_exit)
+    _export_path = export_path
+
+
+def disable():
+    """
+    disable() -- restore the uninstrumented functions; counters are kept until reset()
+    """
+    for (owner, name), original in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+
+
+def is_enabled():
+    """
+    :return: True between enable() and disable()
+    """
+    return bool(_originals)
+
+
+def reset():
+    """
+    reset() -- zero every counter, and count cache hits from now on
+    """
+    with _lock:
+        for counter in _counters.values():
+            counter[:] = [0, 0, 0.0]
+        for name, cached in _CACHES.items():
+            _cache_base[name] = cached.cache_info()
+
+
+def snapshot():
+    """
+    snapshot() -- current counters.
+    :return: dict with "enabled", "entry_points" (per name: calls, samples, seconds,
+             samples_per_s; only entry points that were called) and "caches"
+             (per cache: hits, misses, hit_rate since the last reset)
+    """
+    with _lock:
+        entry_points = {}
+        for name, (calls, samples, seconds) in sorted(_counters.items()):
+            if calls:
+                entry_points[name] = {"calls": calls, "samples": samples, "seconds": seconds,
+                                      "samples_per_s": samples/seconds if seconds else 0.0}
+    caches = {}
+    for name, cached in _CACHES.items():
+        info = cached.cache_info()
+        base = _cache_base.get(name)
+        hits = info.hits - (base.hits if base else 0)
+        misses = info.misses - (base.misses if base else 0)
+        caches[name] = {"hits": hits, "misses": misses,
+                        "hit_rate": hits/float(hits + misses) if hits + misses else 0.0}
+    return {"enabled": is_enabled(), "entry_points": entry_points, "caches": caches}
+
+
+def export(path):
+    """
+    export() -- write snapshot() to a JSON file, with the time it was taken
+    :param path: file name
+    """
+    stats = snapshot()
+    stats["time"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path, "w") as f:
+        json.dump(stats, f, indent=2, sort_keys=True)
+
+
+def _export_at_exit():
+    if _export_path is not None:
+        export(_export_path)
+
+
+def _replace(owner, name, value):
+    """
+    set owner.name = value, remembering the original for disable()
+    """
+    _originals.setdefault((owner, name), getattr(owner, name))
+    setattr(owner, name, value)
+
+
+def _instrument(name, function):
+    """
+    :param name: entry point name the counts are recorded under
+    :param function: function to wrap
+    :return: counting wrapper of function
+    """
+    counter = _counters.setdefault(name, [0, 0, 0.0])
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, "active", False):
+            return function(*args, **kwargs)
+        _local.active = True
+        start = time.perf_counter()
+        try:
+            value = function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _local.active = False
+        # Python floats from the scalar functions have no size attribute
+        samples = getattr(value[0] if type(value) is tuple else value, "size", 1)
+        with _lock:
+            counter[0] += 1
+            counter[1] += samples
+            counter[2] += seconds
+        return value
+    return wrapper
@@ -0,0 +1,182 @@
+"""
+SimplexTileCache.py -- persistent on-disk cache of multi-octave noise tiles
+
+The world is cut into fixed-size tiles of samples taken at index*step, tile
+(a, b) covering sample indices [a*ta, (a+1)*ta) x [b*tb, (b+1)*tb).  Each
+computed tile is stored as a .npy file whose name is a hash of everything that
+determines its contents (seed, lattice mode, dimension, octaves, persistence, scale, bounds,
+step, tile shape, tile index and dtype).  Hits are opened with
+np.load(mmap_mode='r'), so they cost no copy and no compute.
+
+Several processes may share one cache directory: tiles are written to a
+temporary file and renamed into place, so readers never see a partial tile,
+and losing a race to another writer or evictor just counts as a miss.  When the
+directory grows past max_bytes the least recently used tiles are deleted.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+import SimplexNoise
+
+# Bump when the tile layout or the noise algorithm changes, so stale tiles are not reused
+_FORMAT = 4
+
+
+class TileCache(object):
+    """
+    TileCache -- LRU-evicted directory of memory-mapped noise tiles.
+    """
+
+    def __init__(self, directory, tile_shape, step=1.0, max_bytes=1 << 30):
+        """
+        :param directory: cache directory, created if missing
+        :param tile_shape: samples per tile along each axis; also fixes the dimension
+        :param step: spacing between samples, a scalar or one value per axis
+        :param max_bytes: size cap for all tiles in the directory
+        """
+        self.directory = directory
+        self.tile_shape = tuple(int(n) for n in tile_shape)
+        if len(self.tile_shape) not in (2, 3, 4):
+            raise ValueError("noise tiles have 2, 3 or 4 axes, not {0}".format(len(self.tile_shape)))
+        self.step = tuple(float(s) for s in np.broadcast_to(step, (len(self.tile_shape),)))
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def octave_tile(self, tile_index, octaves, persistence, scale, dtype=np.float64, noise=None):
+        """
+        octave_tile() -- one tile of octave_noise_*d(), from disk if cached.
+        :param tile_index: tuple of ints, one per axis
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param dtype: dtype of the stored tile
+        :param noise: SimplexNoise instance, default the module-level functions
+        :return: read-only ndarray (a memmap of the tile file) of shape tile_shape
+        """
+        return self._tile(tile_index, octaves, persistence, scale, None, dtype, noise)
+
+    def scaled_octave_tile(self, tile_index, octaves, persistence, scale, loBound, hiBound,
+                           dtype=np.float64, noise=None):
+        """
+        scaled_octave_tile() -- one tile of scaled_octave_noise_*d(), from disk if cached.
+        :param tile_index: tuple of ints, one per axis
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param loBound:
+        :param hiBound:
+        :param dtype: dtype of the stored tile
+        :param noise: SimplexNoise instance, default the module-level functions
+        :return: read-only ndarray of shape tile_shape, values between loBound and hiBound
+        """
+        return self._tile(tile_index, octaves, persistence, scale, (loBound, hiBound), dtype, noise)
+
+    def stats(self):
+        """
+        stats() -- counters for this cache object
+        :return: dict with hits, misses, evictions and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits/float(lookups) if lookups else 0.0}
+
+    def clear(self):
+        """
+        clear() -- delete every tile in the cache directory
+        """
+        for path, _, _ in self._entries():
+            _remove(path)
+
+    def _tile(self, tile_index, octaves, persistence, scale, bounds, dtype, noise):
+        if noise is None:
+            noise = SimplexNoise._default
+        tile_index = tuple(int(t) for t in tile_index)
+        if len(tile_index) != len(self.tile_shape):
+            raise ValueError("tile index {0} does not match tile shape {1}".format(tile_index, self.tile_shape))
+        dtype = np.dtype(dtype)
+        bounds = None if bounds is None else tuple(float(b) for b in bounds)
+        key = (_FORMAT, noise.seed, noise.lattice, len(self.tile_shape), int(octaves), float(persistence),
+               float(scale), bounds, self.step, self.tile_shape, tile_index, dtype.str)
+        path = os.path.join(self.directory, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".npy")
+
+        try:
+            tile = np.load(path, mmap_mode="r")
+            os.utime(path, None)   # mark as recently used
+            self.hits += 1
+            return tile
+        except (IOError, OSError, ValueError):
+            # missing, evicted under us, or (on some platforms) still being renamed into place
+            pass
+
+        self.misses += 1
+        grid = getattr(noise, "noise_grid_{0}d".format(len(self.tile_shape)))
+        start = [t*n for t, n in zip(tile_index, self.tile_shape)]
+        # float32 tiles are computed in float32 throughout; other dtypes are converted at the end
+        compute = dtype if dtype in (np.float32, np.float64) else np.float64
+        values = grid((0.0,)*len(self.tile_shape), self.step, self.tile_shape, octaves, persistence, scale,
+                      start=start, dtype=compute)
+        if bounds is not None:
+            values = SimplexNoise._rescale(values, bounds[0], bounds[1])
+        values = values.astype(dtype, copy=False)
+
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, values)
+            os.replace(tmp, path)
+        except BaseException:
+            _remove(tmp)
+            raise
+        self._evict()
+
+        values.flags.writeable = False
+        return values
+
+    def _entries(self):
+        """
+        :return: list of (path, size, last use) for the tiles in the directory
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self):
+        """
+        delete least recently used tiles until the directory fits in max_bytes
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            if _remove(path):
+                self.evictions += 1
+            total -= size
+
+
+def _remove(path):
+    """
+    delete a file, tolerating another process having deleted it first
+    :return: True if this call removed it
+    """
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
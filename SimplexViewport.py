@@ -0,0 +1,274 @@
+"""
+SimplexViewport.py -- a scrolling window onto an unbounded 2D octave noise field
+
+    view = Viewport((600, 800), 6, 0.5, 0.01)
+    frame = view.window()           # (600, 800) array, as noise_grid_2d() would give
+    view.pan(3, -10)                # computes only the 3 + 10 newly exposed strips
+    view.zoom(2)                    # reuses every sample that is still on the grid
+    frame = view.window()
+
+Samples lie on a global grid: sample (a, b) is taken at
+origin + (a, b)*step, and the window shows samples start .. start + shape - 1.
+They are kept in a ring buffer indexed by (a mod nx, b mod ny), so a pan leaves
+every sample that stays visible where it is and only fills in the strips that
+scrolled into view.  Values are identical to noise_grid_2d() over the window.
+
+Zooming by a power of two keeps the exact samples that the old and new grids
+share (a quarter of the window per factor 2 in, or the old window's samples
+per factor 2 out) and computes the rest; other factors recompute the window.
+With resample=True a zoom instead fills the window at once by interpolating the
+old one, for a quick preview, and refine() later replaces the interpolated
+samples with exact ones.
+"""
+
+from math import frexp
+
+import numpy as np
+
+import SimplexNoise
+
+
+class Viewport(object):
+    """
+    Viewport -- ring-buffered window of 2D multi-octave noise that pans and zooms incrementally.
+    """
+
+    def __init__(self, shape, octaves, persistence, scale, origin=(0.0, 0.0), step=1.0, start=(0, 0),
+                 dtype=np.float64, noise=None):
+        """
+        :param shape: (nx, ny) samples in the window
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param origin: (x, y) of global sample (0, 0)
+        :param step: spacing between samples, a scalar or one value per axis
+        :param start: global index of the window's first sample
+        :param dtype: float64 (default) or float32
+        :param noise: SimplexNoise instance to sample, default the module-level functions
+        """
+        self.shape = tuple(int(n) for n in shape)
+        if len(self.shape) != 2 or min(self.shape) < 1:
+            raise ValueError("viewport shape must be two positive sizes, not {0}".format(shape))
+        self.params = (int(octaves), float(persistence), float(scale))
+        self.origin = tuple(float(o) for o in np.broadcast_to(origin, (2,)))
+        self.step = tuple(float(s) for s in np.broadcast_to(step, (2,)))
+        self.start = tuple(int(a) for a in start)
+        self.dtype = np.dtype(dtype)
+        self.noise = SimplexNoise._default if noise is None else noise
+
+        self.computed = 0
+        self._ring = np.empty(self.shape, self.dtype)
+        # Ring-layout mask of interpolated samples, None when all are exact
+        self._stale = None
+        self._fill(self._indices(0), self._indices(1))
+
+    def window(self, out=None):
+        """
+        window() -- the visible samples in display order.
+        :param out: optional ndarray of shape self.shape to copy them into
+        :return: ndarray of shape self.shape, element [i, j] being global sample start + (i, j)
+        """
+        out = SimplexNoise._output(self.shape, self.dtype, out)
+        (r, c), (nx, ny) = self._offsets(), self.shape
+        out[:nx - r, :ny - c] = self._ring[r:, c:]
+        out[:nx - r, ny - c:] = self._ring[r:, :c]
+        out[nx - r:, :ny - c] = self._ring[:r, c:]
+        out[nx - r:, ny - c:] = self._ring[:r, :c]
+        return out
+
+    def coordinates(self):
+        """
+        coordinates() -- positions of the visible samples
+        :return: (xs, ys), the x of each row and the y of each column of window()
+        """
+        return tuple(o + self._indices(d)*s for d, (o, s) in enumerate(zip(self.origin, self.step)))
+
+    def pan(self, da, db):
+        """
+        pan() -- move the window by a whole number of samples, computing the exposed strips.
+        :param da: samples to move along the first axis, positive towards higher indices
+        :param db: samples to move along the second axis
+        """
+        da, db = int(da), int(db)
+        (a0, b0), (nx, ny) = self.start, self.shape
+        self.start = (a0 + da, b0 + db)
+        if abs(da) >= nx or abs(db) >= ny:
+            self._fill(self._indices(0), self._indices(1))
+            return
+        rows = np.arange(a0 + nx, a0 + nx + da) if da > 0 else np.arange(a0 + da, a0)
+        self._fill(rows, self._indices(1))
+        kept = np.arange(max(a0, a0 + da), min(a0, a0 + da) + nx)
+        cols = np.arange(b0 + ny, b0 + ny + db) if db > 0 else np.arange(b0 + db, b0)
+        self._fill(kept, cols)
+
+    def zoom(self, factor, center=None, resample=False):
+        """
+        zoom() -- scale the sample spacing by 1/factor, keeping one sample of the window in place.
+        :param factor: > 1 zooms in, < 1 zooms out; powers of two reuse the shared samples
+        :param center: (i, j) window position that stays put, default the middle of the window
+        :param resample: fill the window by interpolating the old one instead of computing
+                         it; the interpolated samples stay approximate until refine()
+        """
+        factor = float(factor)
+        if not factor > 0:
+            raise ValueError("zoom factor must be positive, not {0}".format(factor))
+        center = [n // 2 for n in self.shape] if center is None else [int(c) for c in center]
+        old_start, old_step = self.start, self.step
+        old = self.window()
+        old_stale = self._stale_window()
+
+        self.start = tuple(int(round((a + c)*factor)) - c for a, c in zip(old_start, center))
+        self.step = tuple(s/factor for s in old_step)
+        self._ring = np.empty(self.shape, self.dtype)
+        self._stale = None
+
+        # Per axis: window positions whose sample is also a sample of the old grid,
+        # and the old window positions they come from
+        mantissa, exponent = frexp(factor)
+        shared = []
+        for d in range(2):
+            a = self._indices(d)
+            if mantissa != 0.5:
+                keep = np.zeros(a.shape, bool)
+                previous = a
+            elif exponent >= 1:
+                scale = 1 << (exponent - 1)
+                keep = a % scale == 0
+                previous = a // scale
+            else:
+                previous = a << (1 - exponent)
+                keep = np.ones(a.shape, bool)
+            previous = previous - old_start[d]
+            keep &= (previous >= 0) & (previous < self.shape[d])
+            shared.append((keep, previous))
+
+        (rkeep, rprev), (ckeep, cprev) = shared
+        if resample:
+            u, v = [(self._indices(d)/factor - old_start[d]) for d in range(2)]
+            values = _interpolate(old, u, v).astype(self.dtype, copy=False)
+            exact = np.zeros(self.shape, bool)
+            exact[np.ix_(rkeep, ckeep)] = True
+            if old_stale is not None:
+                exact[np.ix_(rkeep, ckeep)] = ~old_stale[np.ix_(rprev[rkeep], cprev[ckeep])]
+            values[np.ix_(rkeep, ckeep)] = old[np.ix_(rprev[rkeep], cprev[ckeep])]
+            self._store(self._indices(0), self._indices(1), values)
+            self._stale = np.empty(self.shape, bool)
+            self._store(self._indices(0), self._indices(1), ~exact, self._stale)
+            if not self._stale.any():
+                self._stale = None
+            return
+
+        rows, cols = self._indices(0), self._indices(1)
+        if rkeep.any() and ckeep.any():
+            self._store(rows[rkeep], cols[ckeep], old[np.ix_(rprev[rkeep], cprev[ckeep])])
+            if old_stale is not None:
+                stale = np.zeros(self.shape, bool)
+                self._store(rows[rkeep], cols[ckeep], old_stale[np.ix_(rprev[rkeep], cprev[ckeep])], stale)
+                self._stale = stale if stale.any() else None
+        self._fill(rows[~rkeep], cols)
+        self._fill(rows[rkeep], cols[~ckeep])
+
+    def refine(self):
+        """
+        refine() -- replace interpolated samples left by zoom(resample=True) with exact ones
+        :return: number of samples computed
+        """
+        stale = self._stale_window()
+        if stale is None:
+            return 0
+        before = self.computed
+        rows, cols = self._indices(0), self._indices(1)
+        # Rows with the same stale columns form one block, so only stale samples are
+        # computed; after a zoom that is the new rows, then the new columns of the old rows
+        patterns, groups = np.unique(stale, axis=0, return_inverse=True)
+        groups = groups.reshape(-1)
+        for p, pattern in enumerate(patterns):
+            if pattern.any():
+                self._fill(rows[groups == p], cols[pattern])
+        return self.computed - before
+
+    def is_exact(self):
+        """
+        :return: True when no interpolated samples are left in the window
+        """
+        return self._stale is None
+
+    def _indices(self, d):
+        """
+        :return: global indices of the window's samples along axis d
+        """
+        return np.arange(self.start[d], self.start[d] + self.shape[d])
+
+    def _offsets(self):
+        """
+        :return: ring position of the window's first sample
+        """
+        return tuple(a % n for a, n in zip(self.start, self.shape))
+
+    def _stale_window(self):
+        """
+        :return: the stale mask in display order, or None
+        """
+        if self._stale is None:
+            return None
+        (r, c), ring = self._offsets(), self._stale
+        return np.roll(np.roll(ring, -r, axis=0), -c, axis=1)
+
+    def _store(self, rows, cols, values, ring=None):
+        """
+        write a block of samples, given by global row and column indices, into a ring buffer
+        """
+        ring = self._ring if ring is None else ring
+        ring[np.ix_(rows % self.shape[0], cols % self.shape[1])] = values
+
+    def _fill(self, rows, cols):
+        """
+        compute the samples at global rows x cols and store them, clearing their stale marks
+        :param rows: ndarray of global indices along the first axis
+        :param cols: ndarray of global indices along the second axis
+        """
+        if not len(rows) or not len(cols):
+            return
+        if _contiguous(rows) and _contiguous(cols):
+            values = self.noise.noise_grid_2d(self.origin, self.step, (len(rows), len(cols)), *self.params,
+                                              start=(int(rows[0]), int(cols[0])), dtype=self.dtype)
+        else:
+            # Same coordinate arithmetic as noise_grid_2d(), so the values match it
+            xs = self.origin[0] + rows*self.step[0]
+            ys = self.origin[1] + cols*self.step[1]
+            values = self.noise.octave_noise_2d_array(*self.params, xs[:, None], ys[None, :], dtype=self.dtype)
+        self._store(rows, cols, values)
+        self.computed += values.size
+        if self._stale is not None:
+            self._store(rows, cols, False, self._stale)
+            if not self._stale.any():
+                self._stale = None
+
+
+def _contiguous(indices):
+    """
+    :return: True if indices are consecutive increasing integers
+    """
+    if indices[-1] - indices[0] != len(indices) - 1:
+        return False
+    return len(indices) < 2 or bool(np.all(np.diff(indices) == 1))
+
+
+def _interpolate(values, u, v):
+    """
+    bilinear interpolation of a 2D array at fractional positions, clamped at the edges
+    :param values: 2D ndarray
+    :param u: fractional row positions
+    :param v: fractional column positions
+    :return: ndarray of shape (len(u), len(v))
+    """
+    for axis, p in ((0, u), (1, v)):
+        n = values.shape[axis]
+        p = np.clip(p, 0, n - 1)
+        i = np.minimum(np.floor(p).astype(np.intp), max(n - 2, 0))
+        f = p - i
+        j = np.minimum(i + 1, n - 1)
+        shape = (-1, 1) if axis == 0 else (1, -1)
+        f = f.reshape(shape)
+        values = np.take(values, i, axis=axis)*(1 - f) + np.take(values, j, axis=axis)*f
+    return values
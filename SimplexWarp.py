@@ -0,0 +1,209 @@
+"""
+SimplexWarp.py -- domain-warped Simplex noise, evaluated as a graph of layers
+
+A Layer is multi-octave noise sampled at coordinates that may be displaced by
+other layers, one per axis:
+
+    layer(p) = octave_noise(octaves, persistence, scale, p + offset + strength*(q0(p), q1(p), ...))
+
+where q0, q1, ... are the layers in its warp tuple (None for an axis that is not
+displaced).  Warp chains of any depth are built by nesting layers:
+
+    qx = Layer(4, 0.5, 0.005)
+    qy = Layer(4, 0.5, 0.005, offset=(5.2, 1.3))
+    rx = Layer(4, 0.5, 0.005, warp=(qx, qy), strength=80.0, offset=(1.7, 9.2))
+    ry = Layer(4, 0.5, 0.005, warp=(qx, qy), strength=80.0, offset=(8.3, 2.8))
+    terrain = Pipeline(Layer(6, 0.5, 0.005, warp=(rx, ry), strength=80.0))
+    heights = terrain.grid((0.0, 0.0), 1.0, (4096, 4096))
+
+A Pipeline evaluates each distinct layer once per point, however many layers
+consume it (layers with equal parameters and inputs count as one), works
+through the points in fixed-size blocks, and hands each intermediate buffer on
+to a later layer as soon as its last consumer has run, so memory use depends on
+the block size and the width of the graph, not on the number of points.
+"""
+
+import numpy as np
+
+import SimplexNoise
+
+
+class Layer(object):
+    """
+    Layer -- one noise field of a warp graph.
+    """
+
+    def __init__(self, octaves, persistence, scale, warp=None, strength=1.0, offset=0.0, noise=None):
+        """
+        :param octaves:
+        :param persistence:
+        :param scale:
+        :param warp: optional tuple with one Layer (or None) per axis; its values, times
+                     strength, are added to the coordinates along that axis
+        :param strength: displacement per unit of warp value, a scalar or one value per axis
+        :param offset: constant added to the coordinates, a scalar or one value per axis;
+                       different offsets decorrelate layers that are otherwise equal
+        :param noise: SimplexNoise instance to sample, default the module-level functions
+        """
+        self.octaves = int(octaves)
+        self.persistence = float(persistence)
+        self.scale = float(scale)
+        self.warp = None if warp is None else tuple(warp)
+        self.strength = strength
+        self.offset = offset
+        self.noise = SimplexNoise._default if noise is None else noise
+
+
+class Pipeline(object):
+    """
+    Pipeline -- compiled evaluation plan for a warp graph.
+    """
+
+    def __init__(self, root, dims=2, block=1 << 16):
+        """
+        :param root: Layer whose values are returned
+        :param dims: number of coordinate axes, 2, 3 or 4
+        :param block: points per evaluation block; each intermediate buffer holds this many values
+        """
+        if dims not in (2, 3, 4):
+            raise ValueError("noise layers have 2, 3 or 4 axes, not {0}".format(dims))
+        self.dims = dims
+        self.block = int(block)
+
+        # Distinct layers in evaluation order, each step being
+        # (layer, offset, strength, input step per axis or None)
+        self._steps = []
+        self._compile(root, {}, set())
+        self.layers = tuple(step[0] for step in self._steps)
+
+        # Assign every step but the last (the root, written straight into the
+        # result) a buffer slot, reusing slots whose values are no longer needed
+        last_use = {}
+        for n, (_, _, _, inputs) in enumerate(self._steps):
+            for i in inputs:
+                if i is not None:
+                    last_use[i] = n
+        self._slots = []
+        free = []
+        count = 0
+        for n, (_, _, _, inputs) in enumerate(self._steps):
+            if n == len(self._steps) - 1:
+                slot = None
+            elif free:
+                slot = free.pop()
+            else:
+                slot = count
+                count += 1
+            self._slots.append(slot)
+            for i in set(inputs):
+                if i is not None and last_use[i] == n:
+                    free.append(self._slots[i])
+        self.buffers = count
+
+    def __call__(self, *coords, **kwargs):
+        return self.evaluate(*coords, **kwargs)
+
+    def evaluate(self, *coords, **kwargs):
+        """
+        evaluate() -- the root layer at arbitrary points.
+        :param coords: one array_like of coordinates per axis, broadcastable together
+        :param dtype: keyword, float64 (default) or float32
+        :param out: keyword, optional ndarray of the broadcast shape for the result
+        :return: ndarray with the broadcast shape of coords
+        """
+        dtype = kwargs.pop("dtype", None)
+        out = kwargs.pop("out", None)
+        if kwargs:
+            raise TypeError("unexpected keyword arguments {0}".format(sorted(kwargs)))
+        if len(coords) != self.dims:
+            raise ValueError("expected {0} coordinate arrays, got {1}".format(self.dims, len(coords)))
+        coords = np.broadcast_arrays(*[np.asarray(c, dtype=np.float64) for c in coords])
+        shape = coords[0].shape
+        coords = [c.ravel() for c in coords]
+
+        def blocks(lo, hi):
+            return [c[lo:hi] for c in coords]
+        return self._run(blocks, shape, dtype, out)
+
+    def grid(self, origin, step, shape, dtype=None, out=None):
+        """
+        grid() -- the root layer on a regular grid, element [a, b, ...] taken at
+        origin + (a, b, ...)*step.  Coordinates are generated block by block, so no
+        full-size coordinate arrays are built.
+        :param origin: coordinates of the first sample
+        :param step: spacing between samples, a scalar or one value per axis
+        :param shape: number of samples along each axis
+        :param dtype: float64 (default) or float32
+        :param out: optional ndarray of the given shape for the result
+        :return: ndarray of the given shape
+        """
+        shape = tuple(int(n) for n in shape)
+        if len(shape) != self.dims:
+            raise ValueError("expected a {0}-axis grid, got shape {1}".format(self.dims, shape))
+        origin = np.broadcast_to(np.asarray(origin, dtype=np.float64), (self.dims,))
+        step = np.broadcast_to(np.asarray(step, dtype=np.float64), (self.dims,))
+
+        def blocks(lo, hi):
+            index = np.unravel_index(np.arange(lo, hi), shape)
+            return [o + i*s for o, i, s in zip(origin, index, step)]
+        return self._run(blocks, shape, dtype, out)
+
+    def _compile(self, layer, seen, active):
+        """
+        append the steps for layer and its inputs, depth first, sharing equal layers
+        :param seen: dict from layer key to step index
+        :param active: ids of the layers being compiled, to reject cycles
+        :return: step index of layer
+        """
+        if id(layer) in active:
+            raise ValueError("warp graph has a cycle")
+        warp = layer.warp if layer.warp is not None else (None,)*self.dims
+        if len(warp) != self.dims:
+            raise ValueError("warp has {0} entries for {1} axes".format(len(warp), self.dims))
+
+        active.add(id(layer))
+        inputs = tuple(None if w is None else self._compile(w, seen, active) for w in warp)
+        active.discard(id(layer))
+
+        offset = tuple(float(o) for o in np.broadcast_to(layer.offset, (self.dims,)))
+        strength = tuple(float(s) for s in np.broadcast_to(layer.strength, (self.dims,)))
+        key = (layer.noise.seed, layer.noise.lattice, layer.octaves, layer.persistence, layer.scale, offset,
+               tuple(s if i is not None else None for s, i in zip(strength, inputs)), inputs)
+        if key not in seen:
+            seen[key] = len(self._steps)
+            self._steps.append((layer, offset, strength, inputs))
+        return seen[key]
+
+    def _run(self, blocks, shape, dtype, out):
+        """
+        evaluate every step over the points, one block at a time
+        :param blocks: blocks(lo, hi) gives the coordinate arrays of points lo..hi-1
+        :return: the result array
+        """
+        out = SimplexNoise._output(shape, dtype, out)
+        result = out if out.flags.c_contiguous else np.empty(shape, out.dtype)
+        flat = result.reshape(-1)
+        size = flat.size
+
+        n = min(size, self.block)
+        slots = [np.empty(n, out.dtype) for _ in range(self.buffers)]
+        warped = [np.empty(n, out.dtype) for _ in range(self.dims)]
+        scratch = np.empty(n, out.dtype)
+        octave = "octave_noise_{0}d_array".format(self.dims)
+
+        for lo in range(0, size, self.block):
+            hi = min(lo + self.block, size)
+            m = hi - lo
+            base = blocks(lo, hi)
+            for (layer, offset, strength, inputs), slot in zip(self._steps, self._slots):
+                xs = [w[:m] for w in warped]
+                for x, c, o, s, i in zip(xs, base, offset, strength, inputs):
+                    np.add(c, o, out=x)
+                    if i is not None:
+                        x += np.multiply(slots[self._slots[i]][:m], s, out=scratch[:m])
+                target = flat[lo:hi] if slot is None else slots[slot][:m]
+                getattr(layer.noise, octave)(layer.octaves, layer.persistence, layer.scale, *xs, out=target)
+
+        if result is not out:
+            out[...] = result
+        return out
@@ -0,0 +1,25 @@
+import asyncio
+
+import numpy as np
+
+import SimplexAsync
+import SimplexNoise
+
+
+def test_backpressure_with_service_built_outside_the_loop():
+    service = SimplexAsync.NoiseService((32, 32), workers=2, max_pending=2)
+
+    async def main():
+        # Six distinct tiles with two slots: the later requests wait for a slot
+        tiles = [(a, -a) for a in range(6)]
+        results = await asyncio.gather(*[service.agenerate_tile(t, 4, 0.5, 0.05) for t in tiles])
+        return tiles, results
+
+    try:
+        tiles, results = asyncio.run(main())
+    finally:
+        service.close()
+    for (a, b), values in zip(tiles, results):
+        expected = SimplexNoise.noise_grid_2d((0.0, 0.0), 1.0, (32, 32), 4, 0.5, 0.05, start=(a*32, b*32))
+        np.testing.assert_array_equal(values, expected)
+    assert service.stats() == {"requests": 6, "merged": 0, "computed": 6, "rejected": 0, "pending": 0}
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import SimplexChunks
+import SimplexNoise
+
+
+def _assemble(chunks, shape, chunk_shape):
+    values = np.full(shape, np.nan)
+    for index, chunk in chunks:
+        region = tuple(slice(i*c, i*c + n) for i, c, n in zip(index, chunk_shape, chunk.shape))
+        assert np.isnan(values[region]).all()   # every chunk is yielded once
+        values[region] = chunk
+    return values
+
+
+@pytest.mark.parametrize("order", ["row", "z"])
+@pytest.mark.parametrize("shape, chunk_shape", [((23, 17), (5, 4)), ((9, 6, 7), (4, 4, 3)),
+                                                ((5, 3, 4, 6), (2, 3, 3, 4))])
+def test_chunks_match_serial(order, shape, chunk_shape):
+    args = ((1.5,) + (-2.0,)*(len(shape) - 1), 0.6, shape)
+    serial = getattr(SimplexNoise, "noise_grid_{0}d".format(len(shape)))(*args, 4, 0.5, 0.1)
+    chunks = list(SimplexChunks.iter_chunks(*args, chunk_shape, 4, 0.5, 0.1, order=order))
+    np.testing.assert_array_equal(_assemble(chunks, shape, chunk_shape), serial)
+
+    indices = [index for index, _ in chunks]
+    assert indices == list(SimplexChunks.chunk_indices(shape, chunk_shape, order))
+    for k in (0, 1, len(indices)//2, len(indices) - 1):
+        resumed = list(SimplexChunks.iter_chunks(*args, chunk_shape, 4, 0.5, 0.1, order=order,
+                                                 resume_from=indices[k]))
+        assert [index for index, _ in resumed] == indices[k:]
+        for (_, chunk), (_, expected) in zip(resumed, chunks[k:]):
+            np.testing.assert_array_equal(chunk, expected)
@@ -0,0 +1,298 @@
+"""
+test_SimplexNoise.py -- regression tests for SimplexNoise.py (run with pytest)
+"""
+
+from math import sqrt
+
+import numpy as np
+import pytest
+
+import SimplexNoise
+
+
+def _scalar_points(dims):
+    points = np.random.default_rng(20 + dims).uniform(-50.0, 50.0, (300, dims))
+    # Integer coordinates, negative ones included: fastfloor() maps -2.0 to -3, not -2
+    points[:60] = np.random.default_rng(dims).integers(-20, 20, (60, dims))
+    points[60:80] = -np.abs(np.round(points[60:80]))
+    # Integer points whose coordinates sum to 0 are not moved by the skew, so the
+    # negative ones reach the floor as exact integers
+    points[80:120] = np.random.default_rng(dims).integers(-20, 20, (40, dims))
+    points[80:120, -1] = -points[80:120, :-1].sum(axis=1)
+    return points
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_arrays_match_scalar(dims):
+    points = _scalar_points(dims)
+    raw = getattr(SimplexNoise, "raw_noise_{0}d".format(dims))
+    octave = getattr(SimplexNoise, "octave_noise_{0}d".format(dims))
+    raw_array = getattr(SimplexNoise, "raw_noise_{0}d_array".format(dims))
+    octave_array = getattr(SimplexNoise, "octave_noise_{0}d_array".format(dims))
+
+    assert np.array_equal(raw_array(*points.T), [raw(*p) for p in points])
+    for octaves, persistence, scale in ((1, 0.5, 1.0), (5, 0.5, 0.1), (3, 1.5, 0.37)):
+        expected = [octave(octaves, persistence, scale, *p) for p in points]
+        assert np.array_equal(octave_array(octaves, persistence, scale, *points.T), expected)
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_grid_matches_scalar(dims):
+    grid = getattr(SimplexNoise, "noise_grid_{0}d".format(dims))
+    octave = getattr(SimplexNoise, "octave_noise_{0}d".format(dims))
+    shape = (7, 5, 4, 3)[:dims]
+    origin = (-3.0, 2.5, -1.0, 0.0)[:dims]
+    step = (0.5, 1.0, 0.75, 2.0)[:dims]
+    values = grid(origin, step, shape, 4, 0.5, 0.3)
+    for index in np.ndindex(*shape):
+        point = [o + i*s for o, i, s in zip(origin, index, step)]
+        assert values[index] == octave(4, 0.5, 0.3, *point)
+
+
+def test_grid_many_octaves():
+    # At high octave frequencies a grid block spans far more lattice cells than it
+    # has samples; this once made the grid try to tabulate every one of them
+    values = SimplexNoise.noise_grid_2d((0, 0), 1.0, (256, 256), 30, 0.5, 1.0)
+    xs, ys = np.meshgrid(np.arange(256.0), np.arange(256.0), indexing="ij")
+    assert np.array_equal(values, SimplexNoise.octave_noise_2d_array(30, 0.5, 1.0, xs, ys))
+
+    values = SimplexNoise.noise_grid_3d((0, 0, 0), 1.0, (40, 40, 40), 18, 0.5, 1.0)
+    assert values.shape == (40, 40, 40)
+    assert np.array_equal(values[3, 5], SimplexNoise.octave_noise_3d_array(18, 0.5, 1.0, 3.0, 5.0, np.arange(40.0)))
+
+
+def _assert_float32_close(reference, single, dims):
+    # See "Precision" in the SimplexNoise docstring.  For coordinates of order 10
+    # float32 is within a few 1e-6 of float64.  The 3D/4D kernels jump across
+    # simplex faces, so there a few percent of grid samples may differ by up to
+    # a few 1e-3; the bulk must still be close.
+    assert single.dtype == np.float32
+    error = np.abs(reference - single.astype(np.float64))
+    if dims == 2:
+        assert error.max() < 5e-5
+    else:
+        assert np.quantile(error, 0.9) < 2e-5
+        assert error.max() < 1e-2
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_float32_arrays(dims):
+    coords = np.random.default_rng(dims).uniform(-10.0, 10.0, (dims, 20000))
+    raw = getattr(SimplexNoise, "raw_noise_{0}d_array".format(dims))
+    _assert_float32_close(raw(*coords), raw(*coords, dtype=np.float32), dims)
+    octave = getattr(SimplexNoise, "octave_noise_{0}d_array".format(dims))
+    _assert_float32_close(octave(6, 0.5, 0.5, *coords), octave(6, 0.5, 0.5, *coords, dtype=np.float32), dims)
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+@pytest.mark.parametrize("origin, step", [(-3.1, 0.13), (0.0, 0.25)])
+def test_float32_grids(dims, origin, step):
+    grid = getattr(SimplexNoise, "noise_grid_{0}d".format(dims))
+    shape = {2: (128, 128), 3: (32, 32, 32), 4: (12, 12, 12, 12)}[dims]
+    args = ((origin,)*dims, step, shape, 6, 0.5, 0.5)
+    reference = grid(*args)
+    _assert_float32_close(reference, grid(*args, dtype=np.float32), dims)
+    out = np.empty(shape, np.float32)
+    assert grid(*args, out=out) is out
+    _assert_float32_close(reference, out, dims)
+
+
+def _java_raw_noise_4d(x, y, z, w):
+    # Line-by-line transcription of raw_noise_4d() in SimplexNoise.java, in double
+    # precision, with its comparison weights 32, 16, 8, 4, 2, 1 and simplex table
+    F4 = (sqrt(5.0) - 1.0)/4.0
+    G4 = (5.0 - sqrt(5.0))/20.0
+    fastfloor = lambda v: int(v) if v > 0 else int(v) - 1
+    perm, grad4, simplex = SimplexNoise.perm, SimplexNoise.grad4, SimplexNoise.simplex
+    s = (x + y + z + w)*F4
+    i = fastfloor(x + s)
+    j = fastfloor(y + s)
+    k = fastfloor(z + s)
+    l = fastfloor(w + s)
+    t = (i + j + k + l)*G4
+    x0 = x - (i - t)
+    y0 = y - (j - t)
+    z0 = z - (k - t)
+    w0 = w - (l - t)
+    c = ((32 if x0 > y0 else 0) + (16 if x0 > z0 else 0) + (8 if y0 > z0 else 0) +
+         (4 if x0 > w0 else 0) + (2 if y0 > w0 else 0) + (1 if z0 > w0 else 0))
+    corners = [(0, 0, 0, 0)]
+    for threshold in (3, 2, 1):
+        corners.append(tuple(1 if simplex[c][n] >= threshold else 0 for n in range(4)))
+    corners.append((1, 1, 1, 1))
+    ii, jj, kk, ll = i & 255, j & 255, k & 255, l & 255
+    total = 0.0
+    for n, (a, b, d, e) in enumerate(corners):
+        dx = x0 - a + n*G4
+        dy = y0 - b + n*G4
+        dz = z0 - d + n*G4
+        dw = w0 - e + n*G4
+        gi = perm[ii + a + perm[jj + b + perm[kk + d + perm[ll + e]]]] % 32
+        t0 = 0.6 - dx*dx - dy*dy - dz*dz - dw*dw
+        if t0 >= 0:
+            t0 *= t0
+            g = grad4[gi]
+            total += t0*t0*(g[0]*dx + g[1]*dy + g[2]*dz + g[3]*dw)
+    return 27.0*total
+
+
+# raw_noise_4d() values of the Java reference (through the transcription above).
+# The third and fifth points pick a different simplex with the old x0 > y0 weight
+# of 23, which gave -0.00235... and 0.00081... there.
+_RAW_4D_REFERENCE = [
+    ((0.3, -0.2, 0.1, 0.05), -0.07349538457526937),
+    ((1.7, 2.9, -3.4, 0.6), -0.11603784501561364),
+    ((12.5, -7.25, 3.125, 9.0), -0.0264158775251945),
+    ((-0.8, 0.45, 2.2, -1.1), 0.1566370590897714),
+    ((101.3, 57.9, -33.3, 7.7), -0.0024119499862832864),
+    ((3.0, 1.0, 4.0, 1.0), 0.2585936199255993),
+]
+
+
+@pytest.mark.parametrize("point, value", _RAW_4D_REFERENCE)
+def test_raw_noise_4d_reference_values(point, value):
+    assert SimplexNoise.raw_noise_4d(*point) == pytest.approx(value, rel=0, abs=1e-12)
+    assert _java_raw_noise_4d(*point) == pytest.approx(value, rel=0, abs=1e-12)
+    assert float(SimplexNoise.raw_noise_4d_array(*point)) == pytest.approx(value, rel=0, abs=1e-12)
+
+
+def test_raw_noise_4d_matches_reference():
+    points = np.random.default_rng(4).uniform(-20.0, 20.0, (2000, 4))
+    points[:200] = np.round(points[:200])     # integer coordinates sit on cell boundaries
+    expected = np.array([_java_raw_noise_4d(*p) for p in points])
+    np.testing.assert_allclose(SimplexNoise.raw_noise_4d_array(*points.T), expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose([SimplexNoise.raw_noise_4d(*p) for p in points], expected, rtol=0, atol=1e-12)
+
+
+# Offset along the diagonal by which lattice="table" noise repeats: 256 lattice
+# cells on every axis, unskewed
+_TABLE_PERIODS = {2: 256*(1 - 2*SimplexNoise.G2), 3: 256*(1 - 3*SimplexNoise.G3), 4: 256*(1 - 4*SimplexNoise.G4)}
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_hash_lattice_does_not_repeat(dims):
+    points = np.random.default_rng(dims).uniform(-300.0, 300.0, (dims, 20000))
+    for lattice, repeats in (("table", True), ("hash", False)):
+        raw = getattr(SimplexNoise.SimplexNoise(9, lattice=lattice), "raw_noise_{0}d_array".format(dims))
+        values = raw(*points)
+        for multiple in (1, 2, 3):
+            shifted = raw(*(points + multiple*_TABLE_PERIODS[dims]))
+            if repeats:
+                np.testing.assert_allclose(shifted, values, rtol=0, atol=1e-9)
+            else:
+                assert abs(np.corrcoef(values, shifted)[0, 1]) < 0.05
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_hash_lattice_statistics(dims):
+    points = np.random.default_rng(10 + dims).uniform(-1000.0, 1000.0, (dims, 50000))
+    name = "raw_noise_{0}d_array".format(dims)
+    table, hashed = [getattr(SimplexNoise.SimplexNoise(5, lattice=lattice), name)(*points)
+                     for lattice in ("table", "hash")]
+    assert abs(hashed.mean() - table.mean()) < 0.02
+    assert 0.9 < hashed.var()/table.var() < 1.1
+    assert np.abs(hashed).max() <= 1.0
+
+
+@pytest.mark.parametrize("dims", [2, 3])
+@pytest.mark.parametrize("period, samples", [(256.0, 32), (90.0, 30), (100.0, 48)])
+def test_periodic_grid_tiles_exactly(dims, period, samples):
+    grid = getattr(SimplexNoise, "noise_grid_{0}d_periodic".format(dims))
+    shape = (samples,)*dims
+    args = ((0.0,)*dims, period/samples, shape, period, 4, 0.5, 0.01)
+    tile = grid(*args)
+    for tiles in (1, -1, 3):
+        start = (tiles*samples,) + (0,)*(dims - 1)
+        np.testing.assert_array_equal(grid(*args, start=start), tile)
+
+
+def test_periodic_array_wraps_exactly():
+    # Quarter-unit samples sit on simplex faces, where the 3D kernel jumps
+    xs, ys, zs = np.meshgrid(*[np.arange(48)*0.25]*3, indexing="ij")
+    values = SimplexNoise.raw_noise_3d_periodic_array(xs, ys, zs, 48.0, 12.0, 24.0)
+    shifted = SimplexNoise.raw_noise_3d_periodic_array(xs + 48.0, ys - 12.0, zs + 48.0, 48.0, 12.0, 24.0)
+    np.testing.assert_array_equal(shifted, values)
+    octaves = SimplexNoise.octave_noise_2d_periodic_array(4, 0.5, 0.05, xs[..., 0] - 96.0, ys[..., 0], 48.0, 12.0)
+    np.testing.assert_array_equal(octaves, SimplexNoise.octave_noise_2d_periodic_array(
+        4, 0.5, 0.05, xs[..., 0], ys[..., 0], 48.0, 12.0))
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("octaves, persistence", [(6, 0.5), (4, 1.0), (5, 1.7)])
+def test_octave_mask_matches_noise(dims, dtype, octaves, persistence):
+    points = np.random.default_rng(30 + dims).uniform(-200.0, 200.0, (dims, 5000))
+    mask = getattr(SimplexNoise, "octave_mask_{0}d_array".format(dims))
+    noise = getattr(SimplexNoise, "octave_noise_{0}d_array".format(dims))
+    values = noise(octaves, persistence, 0.05, *points, dtype=dtype)
+    for threshold in (0.0, 1e-7, -1e-7, 0.3, -0.5, 0.9, -0.9, 0.999, -0.999, 1.0, -1.0):
+        above, evaluated = mask(octaves, persistence, 0.05, threshold, *points, dtype=dtype)
+        assert np.array_equal(above, values > threshold)
+        assert evaluated.min() >= 1 and evaluated.max() <= octaves
+        if threshold == 0.3:
+            assert (evaluated < octaves).any()   # the early exit is exercised
+    # Thresholds at the values themselves are only settled by the last octave
+    above, evaluated = mask(octaves, persistence, 0.05, float(values[0]), *points[:, :1], dtype=dtype)
+    assert not above[0] and evaluated[0] == octaves
+
+
+# Skew factor of the simplex lattice per dimension
+_SKEW = {2: SimplexNoise.F2, 3: SimplexNoise.F3, 4: SimplexNoise.F4}
+
+
+def _off_faces(points, dims, frequencies, margin=1e-3):
+    # The 3D/4D kernels jump across simplex faces, where a skewed coordinate is an
+    # integer or two of them have equal fractional parts; keep the points whose
+    # fractional parts stay margin apart, and from 0 and 1, at every frequency
+    keep = np.ones(len(points), bool)
+    for f in frequencies:
+        scaled = points*f
+        skewed = scaled + scaled.sum(axis=1, keepdims=True)*_SKEW[dims]
+        fractions = np.sort(np.concatenate([skewed - np.floor(skewed), np.zeros((len(points), 1)),
+                                            np.ones((len(points), 1))], axis=1), axis=1)
+        keep &= np.diff(fractions, axis=1).min(axis=1) > margin
+    return points[keep]
+
+
+def _central_differences(function, points, h=1e-6):
+    return np.array([(function(*(points + h*e).T) - function(*(points - h*e).T))/(2*h)
+                     for e in np.eye(points.shape[1])])
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_raw_derivatives(dims):
+    points = _off_faces(np.random.default_rng(40 + dims).uniform(-20.0, 20.0, (3000, dims)), dims, [1.0])
+    assert len(points) > 1000
+    raw = getattr(SimplexNoise, "raw_noise_{0}d_array".format(dims))
+    values = raw(*points.T, derivatives=True)
+    assert len(values) == dims + 1
+    np.testing.assert_array_equal(values[0], raw(*points.T))
+    np.testing.assert_allclose(values[1:], _central_differences(raw, points), rtol=1e-5, atol=1e-6)
+
+    scalar = getattr(SimplexNoise, "raw_noise_{0}d".format(dims))
+    for p, *expected in zip(points[:20], *values):
+        assert scalar(*p, derivatives=True) == tuple(expected)
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_octave_derivatives(dims):
+    octaves, persistence, scale = 4, 0.5, 0.3
+    frequencies = [scale*2**n for n in range(octaves)]
+    points = _off_faces(np.random.default_rng(50 + dims).uniform(-20.0, 20.0, (4000, dims)), dims, frequencies)
+    assert len(points) > 500
+    octave = getattr(SimplexNoise, "octave_noise_{0}d_array".format(dims))
+    values = octave(octaves, persistence, scale, *points.T, derivatives=True)
+    expected = _central_differences(lambda *c: octave(octaves, persistence, scale, *c), points)
+    np.testing.assert_allclose(values[1:], expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("dims", [2, 3, 4])
+def test_grid_derivatives(dims):
+    grid = getattr(SimplexNoise, "noise_grid_{0}d".format(dims))
+    octave = getattr(SimplexNoise, "octave_noise_{0}d_array".format(dims))
+    shape, origin, step = (6,)*dims, (0.123,)*dims, 0.37
+    values = grid(origin, step, shape, 3, 0.5, 0.7, derivatives=True)
+    coords = np.meshgrid(*[origin[d] + np.arange(n)*step for d, n in enumerate(shape)], indexing="ij")
+    expected = octave(3, 0.5, 0.7, *coords, derivatives=True)
+    for v, e in zip(values, expected):
+        np.testing.assert_array_equal(v, e)
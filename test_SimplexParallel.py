@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+import SimplexNoise
+import SimplexParallel
+
+
+@pytest.mark.parametrize("threads", [True, False])
+@pytest.mark.parametrize("shape, tile_shape", [((37, 29), 8), ((9, 11, 7), (4, 5, 3)), ((5, 4, 6, 3), 2)])
+def test_parallel_matches_serial(threads, shape, tile_shape):
+    args = ((-3.5,) + (1.25,)*(len(shape) - 1), 0.7, shape, 5, 0.5, 0.05)
+    serial = getattr(SimplexNoise, "noise_grid_{0}d".format(len(shape)))(*args)
+    values = SimplexParallel.noise_grid_parallel(*args, tile_shape=tile_shape, workers=2, threads=threads)
+    np.testing.assert_array_equal(values, serial)
+
+
+def test_parallel_generator():
+    noise = SimplexNoise.SimplexNoise(7, lattice="hash")
+    args = ((0.0, 0.0), 1.0, (20, 30), 4, 0.5, 0.1)
+    values = SimplexParallel.noise_grid_parallel(*args, tile_shape=(6, 7), workers=2, noise=noise)
+    np.testing.assert_array_equal(values, noise.noise_grid_2d(*args))
@@ -0,0 +1,16 @@
+import numpy as np
+
+import SimplexNoise
+import SimplexTileCache
+
+
+def test_bounds_of_any_numeric_type_share_a_tile(tmp_path):
+    cache = SimplexTileCache.TileCache(str(tmp_path), (16, 16))
+    first = cache.scaled_octave_tile((1, -2), 4, 0.5, 0.05, 0, 255)
+    for loBound, hiBound in ((0.0, 255.0), (np.int64(0), np.float32(255.0)), (0, 255)):
+        np.testing.assert_array_equal(cache.scaled_octave_tile((1, -2), 4, 0.5, 0.05, loBound, hiBound), first)
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    expected = SimplexNoise.noise_grid_2d((0.0, 0.0), 1.0, (16, 16), 4, 0.5, 0.05, start=(16, -32))
+    np.testing.assert_array_equal(first, SimplexNoise._rescale(expected, 0.0, 255.0))